@@ -0,0 +1,202 @@
+"""Headless HTTP API for document generation, refinement and export.
+
+Other university systems POST a DocumentRequest and get a DocumentResponse back,
+without going through the Streamlit UI. All requests share one pooled LLMService
+per process, configured from the same environment variables as the app:
+
+    python api_server.py --host 0.0.0.0 --port 8000
+
+Streaming endpoints return newline-delimited JSON events in the shape of
+LLMService.agenerate_document_stream, or of LLMService.agenerate_variants for
+several tones and languages at once.
+"""
+from typing import AsyncIterator, Dict, Optional
+import argparse
+import json
+import logging
+
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+
+from document_models import (
+    DocumentRefinementRequest, DocumentRequest, DocumentResponse, DocumentType, DocumentVariantsRequest, ExportRequest
+)
+from export_service import cached_export
+from llm_service import LLMService, get_llm_service, llm_options_from_env
+from resilience import UpstreamUnavailableError
+from telemetry import get_telemetry
+
+EXPORT_MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "txt": "text/plain; charset=utf-8",
+}
+# Longer than the 60 s idle timeout of common load balancers, so they never reuse a closed connection
+KEEP_ALIVE_SECONDS = 75
+
+
+def _http_error(e: Exception) -> HTTPException:
+    """Map a service error to an HTTP status: 503 while Gemini is unavailable, 422 for invalid input"""
+    if isinstance(e, UpstreamUnavailableError):
+        headers = {"Retry-After": str(max(1, round(e.retry_after)))} if e.retry_after else None
+        return HTTPException(status_code=503, detail=str(e), headers=headers)
+    if isinstance(e, ValueError):
+        return HTTPException(status_code=422, detail=str(e))
+    return HTTPException(status_code=502, detail=str(e))
+
+
+def _export_filename(metadata: Dict[str, str], fmt: str) -> str:
+    """Download name from the metadata's doc_type; only known document types are used, so
+    client-supplied text never reaches the header"""
+    try:
+        doc_type = DocumentType(metadata.get("doc_type", "")).value.lower().replace(" ", "_")
+    except ValueError:
+        doc_type = "document"
+    return f"TUM_{doc_type}.{fmt}"
+
+
+def _ndjson(event: Dict) -> str:
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+async def _stream_response(events: AsyncIterator[Dict]) -> StreamingResponse:
+    """Stream events as NDJSON; the first event is awaited up front so validation and
+    upstream errors still get a proper status code"""
+    try:
+        first = await events.__anext__()
+    except Exception as e:
+        raise _http_error(e)
+
+    async def body():
+        yield _ndjson(first)
+        try:
+            async for event in events:
+                yield _ndjson(event)
+        except Exception as e:
+            # Headers are already sent; report the failure as the last event
+            logging.error(f"Streaming error: {str(e)}")
+            yield _ndjson({"error": str(e), "is_final": True})
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+def create_app(service: Optional[LLMService] = None) -> FastAPI:
+    """The API app; without a service, the pooled LLMService is created on the first request"""
+    app = FastAPI(title="TUM Admin API")
+    app.state.service = service
+
+    def get_service() -> LLMService:
+        if app.state.service is None:
+            try:
+                app.state.service = get_llm_service(**llm_options_from_env())
+            except Exception as e:
+                raise HTTPException(status_code=503, detail=f"LLM service unavailable: {str(e)}")
+        return app.state.service
+
+    @app.get("/healthz")
+    async def healthz() -> Dict:
+        if app.state.service is None:
+            return {"status": "ok"}
+        return {
+            "status": "ok",
+            "circuit": app.state.service.resilience_metrics()["circuit_state"],
+            "concurrency": app.state.service.concurrency.stats(),
+        }
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics() -> PlainTextResponse:
+        telemetry = app.state.service.telemetry if app.state.service is not None else get_telemetry()
+        return PlainTextResponse(telemetry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    @app.post("/v1/documents", response_model=DocumentResponse)
+    async def generate(request: DocumentRequest, force_fresh: bool = False) -> DocumentResponse:
+        service = get_service()
+        try:
+            result = await service.agenerate_document(
+                request.doc_type, request.tone, request.prompt, request.additional_context or "",
+                request.sender_name or "", request.sender_profession or "", request.language or "English",
+                force_fresh=force_fresh
+            )
+        except Exception as e:
+            raise _http_error(e)
+        return DocumentResponse(**result)
+
+    @app.post("/v1/documents/stream")
+    async def generate_stream(request: DocumentRequest, force_fresh: bool = False) -> StreamingResponse:
+        return await _stream_response(get_service().agenerate_document_stream(
+            request.doc_type, request.tone, request.prompt, request.additional_context or "",
+            request.sender_name or "", request.sender_profession or "", request.language or "English",
+            force_fresh=force_fresh
+        ))
+
+    @app.post("/v1/documents/variants/stream")
+    async def generate_variants(request: DocumentVariantsRequest, force_fresh: bool = False) -> StreamingResponse:
+        return await _stream_response(get_service().agenerate_variants(
+            request.doc_type, request.tones, request.prompt, request.additional_context or "",
+            request.sender_name or "", request.sender_profession or "", request.languages or ["English"],
+            force_fresh=force_fresh
+        ))
+
+    @app.post("/v1/refinements", response_model=DocumentResponse)
+    async def refine(request: DocumentRefinementRequest) -> DocumentResponse:
+        service = get_service()
+        try:
+            result = await service.arefine_document(
+                request.current_document, request.refinement_prompt, request.doc_type, request.tone,
+                request.history, mode=request.mode, language=request.language
+            )
+        except Exception as e:
+            raise _http_error(e)
+        return DocumentResponse(**result)
+
+    @app.post("/v1/refinements/stream")
+    async def refine_stream(request: DocumentRefinementRequest) -> StreamingResponse:
+        return await _stream_response(get_service().arefine_document_stream(
+            request.current_document, request.refinement_prompt, request.doc_type, request.tone,
+            request.history, language=request.language, mode=request.mode
+        ))
+
+    @app.post("/v1/exports")
+    async def export(request: ExportRequest) -> Response:
+        fmt = request.format.value
+        try:
+            # Rendering is CPU-bound; keep it off the event loop
+            data = await run_in_threadpool(cached_export, request.document_content, request.metadata, fmt)
+        except Exception as e:
+            logging.error(f"Export error: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error exporting document: {str(e)}")
+        return Response(
+            content=data,
+            media_type=EXPORT_MEDIA_TYPES[fmt],
+            headers={"Content-Disposition": f'attachment; filename="{_export_filename(request.metadata, fmt)}"'}
+        )
+
+    return app
+
+
+app = create_app()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the TUM Admin HTTP API")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes, each with its own service pool")
+    args = parser.parse_args()
+
+    import uvicorn
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    uvicorn.run(
+        "api_server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_keep_alive=KEEP_ALIVE_SECONDS,
+    )
+
+
+if __name__ == "__main__":
+    main()
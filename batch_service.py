@@ -0,0 +1,212 @@
+"""Batch document generation.
+
+Reads DocumentRequest rows from JSONL or CSV, generates them concurrently and
+streams one JSON result per line to the output file as items finish:
+
+    python batch_service.py requests.jsonl -o results.jsonl --workers 4 --rps 2 \
+        --zip exports.zip --formats pdf,docx
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+import argparse
+import csv
+import json
+import logging
+import time
+import zipfile
+
+from document_models import DocumentRequest
+from export_service import DocumentExporter
+from resilience import TokenBucket
+
+
+class InvalidRequestRow(ValueError):
+    """A row of the input file that is not a valid DocumentRequest; it fails on its own
+    in the results instead of aborting the batch"""
+
+    def __init__(self, line: int, error: str):
+        super().__init__(f"Line {line}: {error}")
+        self.line = line
+
+
+def _parse_row(line: int, row) -> Union[DocumentRequest, InvalidRequestRow]:
+    try:
+        return DocumentRequest(**row)
+    except (TypeError, ValueError) as e:
+        return InvalidRequestRow(line, str(e))
+
+
+def load_requests(path: str) -> List[Union[DocumentRequest, InvalidRequestRow]]:
+    """Load DocumentRequest rows from a .jsonl or .csv file; a malformed row is returned
+    as an InvalidRequestRow carrying its line number, so the other rows still run"""
+    requests: List[Union[DocumentRequest, InvalidRequestRow]] = []
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                row = {key: value for key, value in row.items() if value not in (None, "")}
+                requests.append(_parse_row(reader.line_num, row))
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line, text in enumerate(f, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    row = json.loads(text)
+                except ValueError as e:
+                    requests.append(InvalidRequestRow(line, f"Invalid JSON: {str(e)}"))
+                    continue
+                requests.append(_parse_row(line, row))
+    return requests
+
+
+def _percentile(values: Sequence[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class BatchGenerator:
+    """Runs DocumentRequests through an LLMService with a bounded worker pool and
+    rate limiting; transient errors are retried by the service's own retry policy."""
+
+    def __init__(
+        self,
+        service,
+        workers: int = 4,
+        requests_per_second: Optional[float] = None,
+        exporter: Optional[DocumentExporter] = None,
+    ):
+        self.service = service
+        self.workers = workers
+        self.rate_limiter = TokenBucket(requests_per_second, capacity=1) if requests_per_second else None
+        self.exporter = exporter or DocumentExporter()
+
+    def _generate(self, request: DocumentRequest) -> Dict:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        result = self.service.generate_document(
+            doc_type=request.doc_type,
+            tone=request.tone,
+            prompt=request.prompt,
+            additional_context=request.additional_context or "",
+            sender_name=request.sender_name or "",
+            sender_profession=request.sender_profession or "",
+            language=request.language or "English",
+        )
+        result["attempts"] = int(result["metadata"].get("retries", 0)) + 1
+        return result
+
+    def _process(
+        self, index: int, request: Union[DocumentRequest, InvalidRequestRow], export_formats: Sequence[str]
+    ) -> Dict:
+        if isinstance(request, InvalidRequestRow):
+            logging.error(f"Batch item {index} is invalid: {str(request)}")
+            return {"index": index, "line": request.line, "status": "error", "error": str(request)}
+        started = time.perf_counter()
+        item = {"index": index, "doc_type": request.doc_type.value, "tone": request.tone.value}
+        try:
+            result = self._generate(request)
+            item.update(
+                status="ok",
+                document=result["document"],
+                metadata=result["metadata"],
+                attempts=result["attempts"],
+            )
+            item["exports"] = {
+                fmt: self.exporter.export_document(result["document"], result["metadata"], fmt)
+                for fmt in export_formats
+            }
+        except Exception as e:
+            logging.error(f"Batch item {index} failed: {str(e)}")
+            item.update(status="error", error=str(e))
+        item["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return item
+
+    def run(
+        self,
+        requests: Iterable[Union[DocumentRequest, InvalidRequestRow]],
+        output_path: str,
+        export_zip: Optional[str] = None,
+        export_formats: Sequence[str] = ("pdf",),
+    ) -> Dict:
+        """Generate all requests, streaming results to output_path; returns a run report.
+        Invalid rows from load_requests are written as failed items without a model call."""
+        requests = list(requests)
+        formats = list(export_formats) if export_zip else []
+        latencies = []
+        failed = 0
+        started = time.perf_counter()
+
+        archive = zipfile.ZipFile(export_zip, "w", zipfile.ZIP_DEFLATED) if export_zip else None
+        try:
+            with open(output_path, "w", encoding="utf-8") as out, \
+                    ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = [
+                    pool.submit(self._process, index, request, formats)
+                    for index, request in enumerate(requests)
+                ]
+                for future in as_completed(futures):
+                    item = future.result()
+                    exports = item.pop("exports", {})
+                    if archive is not None:
+                        for fmt, data in exports.items():
+                            safe_doc_type = item["doc_type"].lower().replace(" ", "_")
+                            archive.writestr(f"TUM_{safe_doc_type}_{item['index']:04d}.{fmt}", data)
+                    out.write(json.dumps(item, ensure_ascii=False) + "\n")
+                    out.flush()
+                    if "latency_ms" in item:
+                        latencies.append(item["latency_ms"])
+                    if item["status"] != "ok":
+                        failed += 1
+        finally:
+            if archive is not None:
+                archive.close()
+
+        elapsed = time.perf_counter() - started
+        return {
+            "items": len(requests),
+            "succeeded": len(requests) - failed,
+            "failed": failed,
+            "elapsed_seconds": round(elapsed, 2),
+            "throughput_per_second": round(len(requests) / elapsed, 2) if elapsed else 0.0,
+            "latency_ms_p50": _percentile(latencies, 50),
+            "latency_ms_p95": _percentile(latencies, 95),
+            "latency_ms_max": max(latencies) if latencies else 0.0,
+        }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate TUM documents in bulk")
+    parser.add_argument("input", help="JSONL or CSV file of DocumentRequest rows")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="Output JSONL file")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent requests")
+    parser.add_argument("--rps", type=float, default=None, help="Maximum requests per second")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per item on transient errors")
+    parser.add_argument("--zip", dest="export_zip", default=None, help="Also export every result into this zip")
+    parser.add_argument("--formats", default="pdf", help="Comma-separated export formats (pdf,docx,txt)")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    from llm_service import get_llm_service
+
+    load_dotenv()
+    generator = BatchGenerator(
+        get_llm_service(max_retries=args.retries),
+        workers=args.workers,
+        requests_per_second=args.rps,
+    )
+    report = generator.run(
+        load_requests(args.input),
+        args.output,
+        export_zip=args.export_zip,
+        export_formats=[fmt.strip() for fmt in args.formats.split(",") if fmt.strip()],
+    )
+    print(json.dumps(report, indent=2))
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
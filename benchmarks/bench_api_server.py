@@ -0,0 +1,179 @@
+"""Load test: the HTTP API at a fixed request rate against the fake Gemini backend.
+
+Starts api_server in a separate process with an LLMService backed by
+FakeModelClient (recorded responses, about 0.6 s to the first token and 1-2 s
+per document, 1% transient 503s) and sends an open-loop stream of requests at
+--rps for --duration seconds to each endpoint: requests are fired on schedule
+whether or not earlier ones have finished, as independent callers would.
+Connections are reused (HTTP keep-alive) unless --no-keepalive is given. An
+endpoint passes when it sustains at least 95% of the target rate with under 1%
+errors and a p95 latency within --p95-budget seconds. The load generator needs
+httpx. Run from the repository root:
+
+    python benchmarks/bench_api_server.py --rps 200 --duration 20
+"""
+from multiprocessing import Process
+from pathlib import Path
+import argparse
+import asyncio
+import socket
+import sys
+import time
+import warnings
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+warnings.simplefilter("ignore")
+
+import httpx  # noqa: E402
+
+RECORDINGS = ROOT / "benchmarks" / "recorded_responses.jsonl"
+CLIENT_POOLS = 32
+
+
+def serve(port):
+    """Run the API with a fake-backed service; called in the server process"""
+    import logging
+    import uvicorn
+    from api_server import KEEP_ALIVE_SECONDS, create_app
+    from llm_service import LLMService
+    from model_client import FakeModelClient
+    from telemetry import Telemetry
+
+    logging.disable(logging.WARNING)
+    client = FakeModelClient.from_jsonl(
+        str(RECORDINGS), first_token_latency=0.6, chunk_latency=0.04, latency_jitter=0.3,
+        chunk_size=60, failure_rate=0.01, seed=3,
+    )
+    # The concurrency limit normally sized to the Gemini quota is lifted: the fake has no quota
+    service = LLMService(client=client, telemetry=Telemetry(), max_concurrency=4096)
+    uvicorn.run(
+        create_app(service), host="127.0.0.1", port=port, log_level="error",
+        access_log=False, timeout_keep_alive=KEEP_ALIVE_SECONDS,
+    )
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def payloads(index):
+    """Request bodies per endpoint; the index keeps prompts distinct so nothing is coalesced"""
+    document = {
+        "prompt": f"Announce that the GenAI lecture moves to lecture hall 1200 (request {index}).",
+        "doc_type": ["Announcement", "Student Communication", "Meeting Summary"][index % 3],
+        "tone": ["Neutral", "Friendly", "Firm but polite", "Formal"][index % 4],
+        "sender_name": "Prof. Dr. Anna Müller",
+        "sender_profession": "Professor",
+        "language": "English",
+    }
+    current = "Subject: Lecture change\n\nDear Students,\n\nThe lecture moves to hall 1200.\n\nBest regards,\nProf. Dr. Anna Müller"
+    return {
+        "/v1/documents": document,
+        "/v1/documents/stream": document,
+        "/v1/refinements": {
+            "current_document": current,
+            "refinement_prompt": f"Use 'Kind regards' as the closing line ({index})",
+            "doc_type": document["doc_type"],
+            "tone": document["tone"],
+            "mode": "patch",
+            "language": "English",
+        },
+        "/v1/exports": {
+            "format": "docx",
+            "document_content": current + f"\n\nReference {index}",
+            "metadata": {"doc_type": "Announcement", "tone": "Formal"},
+        },
+    }
+
+
+async def load(base_url, endpoint, rps, duration, keepalive):
+    """Fire requests at rps for duration seconds; returns sorted latencies of successes, the error
+    count and how long dispatching took (longer than duration if the load generator fell behind)"""
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None if keepalive else 0)
+    latencies, errors = [], 0
+    # httpx scans its whole pool on every request, which costs more CPU than the server under
+    # test once hundreds of connections are open; several small pools keep the client cheap
+    clients = [httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) for _ in range(CLIENT_POOLS)]
+    try:
+        async def one(index):
+            nonlocal errors
+            started = time.perf_counter()
+            try:
+                client = clients[index % len(clients)]
+                async with client.stream("POST", endpoint, json=payloads(index)[endpoint]) as response:
+                    async for _ in response.aiter_bytes():
+                        pass
+                    if response.status_code != 200:
+                        errors += 1
+                        return
+            except httpx.HTTPError:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        tasks = []
+        for index in range(int(rps * duration)):
+            delay = started + index / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(index)))
+        dispatched = time.perf_counter() - started
+        await asyncio.gather(*tasks)
+    finally:
+        for client in clients:
+            await client.aclose()
+    return sorted(latencies), errors, dispatched
+
+
+def percentile(values, q):
+    return values[max(0, min(len(values) - 1, int(len(values) * q + 0.5) - 1))] if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the HTTP API with the fake backend")
+    parser.add_argument("--rps", type=float, default=200, help="Target requests per second per endpoint")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load per endpoint")
+    parser.add_argument("--p95-budget", type=float, default=3.0, help="Maximum acceptable p95 latency in seconds")
+    parser.add_argument("--no-keepalive", action="store_true", help="Open a new connection per request")
+    parser.add_argument("--endpoints", default="/v1/documents,/v1/documents/stream,/v1/refinements,/v1/exports")
+    args = parser.parse_args()
+
+    port = free_port()
+    server = Process(target=serve, args=(port,), daemon=True)
+    server.start()
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{base_url}/healthz")
+            break
+        except httpx.HTTPError:
+            time.sleep(0.1)
+
+    total = int(args.rps * args.duration)
+    print(f"target {args.rps:g} req/s for {args.duration:g}s ({total} requests per endpoint), "
+          f"keep-alive {'off' if args.no_keepalive else 'on'}\n")
+    print(f"{'endpoint':<22} {'req/s':>7} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  result")
+    failed = False
+    try:
+        for endpoint in args.endpoints.split(","):
+            latencies, errors, dispatched = asyncio.run(
+                load(base_url, endpoint, args.rps, args.duration, not args.no_keepalive)
+            )
+            achieved = len(latencies) / max(args.duration, dispatched)
+            p95 = percentile(latencies, 0.95)
+            passed = achieved >= 0.95 * args.rps and errors <= 0.01 * total and p95 <= args.p95_budget
+            failed = failed or not passed
+            print(f"{endpoint:<22} {achieved:>7.1f} {errors:>7} {percentile(latencies, 0.5) * 1000:>8.0f} "
+                  f"{p95 * 1000:>8.0f} {percentile(latencies, 0.99) * 1000:>8.0f}  {'PASS' if passed else 'FAIL'}")
+    finally:
+        server.terminate()
+        server.join()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
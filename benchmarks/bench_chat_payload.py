@@ -0,0 +1,164 @@
+"""Benchmark: bytes sent to the browser per rerun for the chat, inline-styled bubbles vs. shared stylesheet.
+
+Renders a conversation of alternating prompts and generated documents with
+Streamlit's AppTest, once with the previous render_chat() (style blocks inlined
+into every bubble, cleaning on every rerun) and once with the cached fragments
+from chat_fragments plus the stylesheet they share. Reported bytes are the
+serialized element protos of the chat, which Streamlit sends on every rerun.
+Run from the repository root:
+
+    python benchmarks/bench_chat_payload.py --messages 10,50
+"""
+from pathlib import Path
+import argparse
+import statistics
+import sys
+import time
+import warnings
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+warnings.simplefilter("ignore")
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from chat_fragments import with_fragment  # noqa: E402
+
+PROMPT = "Please write an announcement about a change in lecture schedule for the GenAI course."
+DOCUMENT = (
+    "Dear Students,\n\nPlease note that the lecture **Generative AI** on Tuesday, 14 May, moves from "
+    "14:00 to 16:00 in lecture hall 1200. The tutorial on Wednesday is not affected.\n\n"
+    "- Slides will be uploaded to Moodle beforehand.\n- Questions can be sent to the course team.\n\n"
+    "Best regards,\nProf. Dr. Müller"
+)
+
+
+def legacy_chat(messages, root):
+    """render_chat() before cached fragments: inline styles in every bubble, cleaned on each rerun"""
+    import sys
+    import streamlit as st
+    sys.path.insert(0, root)
+    from text_cleaner import clean_response_text
+
+    for message in messages:
+        content = clean_response_text(message['content'])
+        if message['role'] == 'user':
+            st.markdown(f"""
+            <div style="display: flex; justify-content: flex-end; margin: 15px 0; align-items: flex-start;">
+                <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                            color: white;
+                            padding: 15px 18px;
+                            border-radius: 18px 18px 4px 18px;
+                            max-width: 70%;
+                            margin-right: 10px;
+                            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+                            font-size: 14px;
+                            line-height: 1.5;
+                            white-space: pre-line;
+                            word-wrap: break-word;">
+                    {content}
+                </div>
+                <div style="background: #667eea;
+                            color: white;
+                            border-radius: 50%;
+                            width: 35px;
+                            height: 35px;
+                            display: flex;
+                            align-items: center;
+                            justify-content: center;
+                            font-size: 16px;
+                            flex-shrink: 0;">
+                    👤
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
+        else:
+            st.markdown(f"""
+            <div style="display: flex; justify-content: flex-start; margin: 15px 0; align-items: flex-start;">
+                <div style="background: #28a745;
+                            color: white;
+                            border-radius: 50%;
+                            width: 35px;
+                            height: 35px;
+                            display: flex;
+                            align-items: center;
+                            justify-content: center;
+                            font-size: 16px;
+                            flex-shrink: 0;
+                            margin-right: 10px;">
+                    <img src="assets/robot-icon.svg" width="24" />
+                </div>
+                <div style="background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
+                            color: #333;
+                            padding: 15px 18px;
+                            border-radius: 18px 18px 18px 4px;
+                            max-width: 70%;
+                            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+                            font-size: 14px;
+                            line-height: 1.5;
+                            border: 1px solid #dee2e6;
+                            white-space: pre-line;
+                            word-wrap: break-word;">
+                    {content}
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
+
+
+def fragment_chat(messages, root):
+    """render_chat() with fragments built once per message and the shared stylesheet"""
+    import sys
+    import streamlit as st
+    sys.path.insert(0, root)
+    from chat_fragments import CHAT_CSS
+
+    st.markdown(f"<style>{CHAT_CSS}</style>", unsafe_allow_html=True)
+    for message in messages:
+        st.markdown(message['html'], unsafe_allow_html=True)
+
+
+def payload_bytes(node):
+    """Serialized size of every element proto below node"""
+    children = getattr(node, "children", None)
+    if children:
+        return sum(payload_bytes(child) for child in children.values())
+    proto = getattr(node, "proto", None)
+    return proto.ByteSize() if proto is not None else 0
+
+
+def measure(script, messages, repeat):
+    # AppTest runs the function's source as its own script, so the repository path is an argument
+    app = AppTest.from_function(script, args=(messages, str(ROOT)), default_timeout=120)
+    app.run()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        app.run()
+        samples.append((time.perf_counter() - started) * 1000)
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return payload_bytes(app.main), statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure chat bytes sent per rerun")
+    parser.add_argument("--messages", default="10,50", help="Comma-separated conversation lengths")
+    parser.add_argument("--repeat", type=int, default=5, help="Measured reruns per variant")
+    args = parser.parse_args()
+
+    print(f"{'messages':>8} {'legacy bytes':>13} {'fragment bytes':>15} {'saved':>6} {'legacy ms':>10} {'fragment ms':>12}")
+    for count in (int(value) for value in args.messages.split(",")):
+        messages = [
+            {"role": "user" if index % 2 == 0 else "assistant", "content": PROMPT if index % 2 == 0 else DOCUMENT}
+            for index in range(count)
+        ]
+        legacy_size, legacy_ms = measure(legacy_chat, messages, args.repeat)
+        cached = [with_fragment(dict(message)) for message in messages]
+        fragment_size, fragment_ms = measure(fragment_chat, cached, args.repeat)
+        saved = 1 - fragment_size / legacy_size
+        print(f"{count:>8} {legacy_size:>13} {fragment_size:>15} {saved:>6.0%} {legacy_ms:>10.1f} {fragment_ms:>12.1f}")
+    print("\nfragment bytes include the shared stylesheet, sent once per rerun")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Micro-benchmark: precompiled text_cleaner vs. the original clean_response_text.
+
+Run from the repository root:
+
+    python benchmarks/bench_clean_response_text.py
+"""
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from text_cleaner import _clean, clean_response_text  # noqa: E402
+
+
+def legacy_clean_response_text(text):
+    """The original implementation from streamlit_app.py, kept as the reference"""
+    text = re.sub(r'<[^>]+>', '', text)
+    text = text.replace('&nbsp;', ' ').replace('&amp;', '&').replace('&lt;', '<').replace('&gt;', '>')
+    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
+    text = re.sub(r'\*(.*?)\*', r'\1', text)
+    text = re.sub(r'__(.*?)__', r'\1', text)
+    text = re.sub(r'_(.*?)_', r'\1', text)
+    text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^\s*[-*+]\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^\s*\d+\.\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^-{3,}$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^\*{3,}$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'``````', '', text, flags=re.DOTALL)
+    text = re.sub(r'`([^`]+)`', r'\1', text)
+    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
+    text = re.sub(r'^-+\s*', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\s*-+$', '', text, flags=re.MULTILINE)
+    lines = text.split('\n')
+    cleaned_lines = []
+    for line in lines:
+        cleaned_line = line.strip()
+        if cleaned_line and not re.match(r'^[-=*_]+$', cleaned_line):
+            cleaned_lines.append(cleaned_line)
+        elif not cleaned_line:
+            cleaned_lines.append('')
+    result = '\n'.join(cleaned_lines)
+    result = re.sub(r'\n{3,}', '\n\n', result)
+    return result.strip()
+
+
+SAMPLE_EMAIL = """**Subject: Important Update: Change in Lecture Schedule**
+
+Dear Students,
+
+We would like to inform you about a change in the lecture schedule for the *GenAI* course.
+
+- The lecture on __26 March 2025__ will take place at 14:30.
+- Room: `HN 1.02` &amp; online via [Moodle](https://www.moodle.tum.de).
+1. Please bring your laptop.
+2. Registration closes on 15 October.
+
+---
+
+### Additional Information
+<b>Contact</b>: genai_course@tum.de
+
+Kind regards,
+Dr. Müller
+Professor
+Technical University of Munich Campus Heilbronn
+"""
+
+PLAIN_EMAIL = """Subject: Registration Deadline Extended
+
+Dear Students,
+
+We are pleased to inform you that the registration deadline has been extended until 15 October.
+
+Kind regards,
+Dr. Müller
+Professor
+Technical University of Munich Campus Heilbronn
+"""
+
+
+def random_document(rng, lines=400):
+    tokens = ["word", "**bold**", "*it*", "__u__", "_i_", "`code`", "[l](http://x)", "<b>", "&amp;",
+              "-", "---", "***", "#", "## h", "1.", "+", "=", " ", "\t", "ä", "ß", "``````"]
+    return "\n".join(" ".join(rng.choice(tokens) for _ in range(rng.randint(0, 8))) for _ in range(lines))
+
+
+def check_identical(rng, cases=500):
+    samples = [SAMPLE_EMAIL, PLAIN_EMAIL, SAMPLE_EMAIL * 50, ""]
+    samples += [random_document(rng, rng.randint(1, 60)) for _ in range(cases)]
+    for text in samples:
+        expected = legacy_clean_response_text(text)
+        actual = _clean(text)
+        if actual != expected:
+            raise AssertionError(f"Output mismatch for input {text[:120]!r}")
+    return len(samples)
+
+
+def timeit(fn, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    rng = random.Random(42)
+    checked = check_identical(rng)
+    print(f"Output identical to legacy implementation on {checked} inputs\n")
+
+    documents = {
+        "email (markdown, 1x)": SAMPLE_EMAIL,
+        "email (plain, 1x)": PLAIN_EMAIL,
+        "large (markdown, 200x)": SAMPLE_EMAIL * 200,
+        "large (plain, 200x)": PLAIN_EMAIL * 200,
+    }
+    print(f"{'document':<26}{'legacy ms':>12}{'precompiled ms':>16}{'memoized ms':>14}{'speedup':>10}")
+    for name, text in documents.items():
+        repeat = 200 if len(text) < 10_000 else 10
+        legacy_ms = timeit(legacy_clean_response_text, text, repeat)
+        compiled_ms = timeit(_clean, text, repeat)
+        clean_response_text(text)
+        memo_ms = timeit(clean_response_text, text, repeat)
+        print(f"{name:<26}{legacy_ms:>12.3f}{compiled_ms:>16.3f}{memo_ms:>14.4f}{legacy_ms / compiled_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
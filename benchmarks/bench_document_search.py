@@ -0,0 +1,107 @@
+"""Benchmark: full-text search latency over 100,000 generated documents.
+
+Fills a temporary SQLiteDocumentStore with synthetic English and German
+announcements, student communications and meeting summaries for one user (the
+worst case, since filters by user then narrow nothing) and reports the median
+latency of typical sidebar searches. Run from the repository root:
+
+    python benchmarks/bench_document_search.py --documents 100000
+"""
+from pathlib import Path
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from document_models import DocumentType, ToneType  # noqa: E402
+from document_store import SQLiteDocumentStore  # noqa: E402
+
+COURSES = [
+    "GenAI", "Machine Learning", "Datenbanken", "Analysis 2", "Computer Vision", "Robotics",
+    "Software Engineering", "Diskrete Strukturen", "Numerical Methods", "Quantum Computing",
+]
+ROOMS = ["Hörsaal 1200", "MI HS 1", "Interims I", "room 0.001", "Audimax", "N1179"]
+ENGLISH = [
+    "Dear students, the {course} lecture on {day} is moved to {room}. Please check Moodle for updated slides.",
+    "Reminder: the {course} exam takes place on {day} in {room}. Bring your student ID.",
+    "The {course} tutorial is cancelled this week due to unforeseen circumstances.",
+    "Summary of the faculty meeting: budget for {course}, new office hours and the schedule change on {day}.",
+    "Registration for {course} closes on {day}. Late registrations cannot be accepted.",
+]
+GERMAN = [
+    "Liebe Studierende, die Vorlesung {course} am {day} findet im {room} statt. Die Folien sind auf Moodle.",
+    "Die Prüfung im Modul {course} wird auf {day} verschoben. Bitte bringen Sie Ihren Studierendenausweis mit.",
+    "Die Übung zu {course} entfällt diese Woche wegen Krankheit.",
+    "Protokoll der Fakultätssitzung: Haushalt für {course}, neue Sprechstunden und Raumänderung am {day}.",
+    "Die Anmeldung für {course} endet am {day}. Verspätete Anmeldungen werden nicht berücksichtigt.",
+]
+DAYS_EN = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+DAYS_DE = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag"]
+SENDERS = [("Prof. Dr. Müller", "Professor"), ("Anna Schmidt", "Administrator"), ("Dr. Lee", "Dean")]
+
+QUERIES = [
+    ("selective", "GenAI lecture Tuesday", {}),
+    ("common words", "students exam", {}),
+    ("German, umlaut folded", "Pruefung verschoben", {}),
+    ("prefix while typing", "quant", {}),
+    ("filtered type+tone", "registration", {"doc_type": DocumentType.ANNOUNCEMENT, "tone": ToneType.FORMAL}),
+    ("sender", "müller robotics", {}),
+    ("question, any-word fallback", "find the announcement we sent about the GenAI lecture change", {}),
+    ("no match", "zebra", {}),
+]
+
+
+def document(rng):
+    german = rng.random() < 0.4
+    template = rng.choice(GERMAN if german else ENGLISH)
+    body = template.format(
+        course=rng.choice(COURSES),
+        day=rng.choice(DAYS_DE if german else DAYS_EN),
+        room=rng.choice(ROOMS),
+    )
+    return body, "German" if german else "English"
+
+
+def median_ms(fn, repeat=30):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure full-text search latency")
+    parser.add_argument("--documents", type=int, default=100000, help="Documents in the store")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    types, tones = list(DocumentType), list(ToneType)
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteDocumentStore(str(Path(directory) / "documents.db"))
+        started = time.perf_counter()
+        for _ in range(args.documents):
+            body, language = document(rng)
+            sender_name, sender_profession = rng.choice(SENDERS)
+            store.add_document(
+                "bench-user", rng.choice(types), rng.choice(tones), body,
+                sender_name, sender_profession, language=language,
+            )
+        elapsed = time.perf_counter() - started
+        print(f"Stored and indexed {args.documents} documents in {elapsed:.1f}s "
+              f"({elapsed / args.documents * 1000:.2f} ms each)\n")
+
+        print(f"{'query':<30} {'results':>7} {'median ms':>10}")
+        for name, query, filters in QUERIES:
+            def search():
+                return store.search_documents("bench-user", query, limit=20, **filters)
+            print(f"{name:<30} {len(search()):>7} {median_ms(search):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
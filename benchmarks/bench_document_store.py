@@ -0,0 +1,96 @@
+"""Benchmark: SQLiteDocumentStore history queries with 10,000+ documents per user.
+
+Fills a temporary store with several users' documents (a third of them
+refinements of an earlier one) and reports the median latency of the queries
+the app issues: the first and a deep history page, filtered pages, counts and
+a refinement chain. Run from the repository root:
+
+    python benchmarks/bench_document_store.py --documents 10000
+"""
+from pathlib import Path
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from document_models import DocumentType, ToneType  # noqa: E402
+from document_store import SQLiteDocumentStore  # noqa: E402
+
+CONTENT = (
+    "Dear Students,\n\nThe exam of the module Introduction to Machine Learning takes place on "
+    "March 14 at 14:30 in lecture hall 1200. Please bring your student ID.\n\nBest regards"
+)
+
+
+def populate(store, user_id, documents, rng):
+    conversation_id = store.start_conversation(user_id)
+    ids = []
+    for _ in range(documents):
+        parent_id = rng.choice(ids) if ids and rng.random() < 0.33 else None
+        document = store.add_document(
+            user_id,
+            rng.choice(list(DocumentType)),
+            rng.choice(list(ToneType)),
+            CONTENT,
+            sender_name="Prof. Dr. Müller",
+            sender_profession="Professor",
+            language=rng.choice(["English", "German"]),
+            conversation_id=conversation_id,
+            parent_id=parent_id,
+        )
+        ids.append(document["id"])
+    return ids
+
+
+def median_ms(fn, repeat=50):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure document store query latency")
+    parser.add_argument("--documents", type=int, default=10000, help="Documents for the measured user")
+    parser.add_argument("--other-users", type=int, default=3, help="Users with the same number of documents")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteDocumentStore(str(Path(directory) / "documents.db"))
+        started = time.perf_counter()
+        for other in range(args.other_users):
+            populate(store, f"user-{other}", args.documents, rng)
+        ids = populate(store, "bench-user", args.documents, rng)
+        total = args.documents * (args.other_users + 1)
+        print(f"Inserted {total} documents in {time.perf_counter() - started:.1f}s\n")
+
+        deep_cursor = store.list_documents("bench-user", limit=1, before_id=ids[len(ids) // 10])[0]["id"]
+        queries = {
+            "first page (50)": lambda: store.list_documents("bench-user", limit=50),
+            "page at 90% depth": lambda: store.list_documents("bench-user", limit=50, before_id=deep_cursor),
+            "filter type": lambda: store.list_documents("bench-user", doc_type=DocumentType.ANNOUNCEMENT),
+            "filter type+tone": lambda: store.list_documents(
+                "bench-user", doc_type=DocumentType.MEETING_SUMMARY, tone=ToneType.FORMAL
+            ),
+            "filter tone+language": lambda: store.list_documents("bench-user", tone=ToneType.FRIENDLY, language="German"),
+            "count all": lambda: store.count_documents("bench-user"),
+            "count type+tone": lambda: store.count_documents(
+                "bench-user", doc_type=DocumentType.ANNOUNCEMENT, tone=ToneType.NEUTRAL
+            ),
+            "refinement chain": lambda: store.refinement_chain(ids[-1]),
+            "insert": lambda: store.add_document("bench-user", DocumentType.ANNOUNCEMENT, ToneType.NEUTRAL, CONTENT),
+        }
+        print(f"{'query':<24} {'median ms':>10}")
+        for name, query in queries.items():
+            print(f"{name:<24} {median_ms(query):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
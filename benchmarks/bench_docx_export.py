@@ -0,0 +1,75 @@
+"""Benchmark: template-based DOCX export vs. building the document with python-docx.
+
+Reports exports per second for a typical one-page document and checks that the
+template engine produces byte-identical output for identical input. Run from
+the repository root:
+
+    python benchmarks/bench_docx_export.py
+"""
+from datetime import datetime
+from pathlib import Path
+import io
+import sys
+import time
+import warnings
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+warnings.simplefilter("ignore")
+
+from docx_renderer import DocxRenderer  # noqa: E402
+
+CONTENT = "\n\n".join([
+    "Subject: Change of Exam Date for Grundlagen der Künstlichen Intelligenz",
+    "Dear Students,",
+    "the written exam will take place on 14 March at 14:30 in lecture hall 1200 instead of the date\n"
+    "announced in the syllabus. Please bring your student ID and a valid photo ID.",
+    "Registration via TUMonline remains open until 1 March. If you cannot attend, please deregister\n"
+    "in time so that another student can take your seat.",
+    "Best regards,\nDr. Anna Müller\nLecturer",
+] * 3)
+METADATA = {"doc_type": "Announcement", "tone": "Formal", "timestamp": "2026-03-01 09:00:00"}
+
+
+def legacy_export_to_docx(content, metadata):
+    """The previous DocumentExporter.export_to_docx"""
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    doc = Document()
+    header = doc.add_heading(f"TUM {metadata.get('doc_type', 'Document')}", level=1)
+    header.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    doc.add_paragraph(f"Tone: {metadata.get('tone', 'Standard')}")
+    doc.add_paragraph("=" * 50)
+    for paragraph in content.split("\n\n"):
+        if paragraph.strip():
+            doc.add_paragraph(paragraph.strip())
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    buffer.seek(0)
+    return buffer.getvalue()
+
+
+def throughput(fn, seconds=2.0):
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        fn(CONTENT, METADATA)
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    renderer = DocxRenderer()
+    first = renderer.render_bytes(CONTENT, METADATA)  # loads and precompresses the template once
+    print(f"Byte-identical repeat export: {first == renderer.render_bytes(CONTENT, METADATA)}")
+
+    legacy = throughput(legacy_export_to_docx)
+    template = throughput(renderer.render_bytes)
+    print(f"\n{'engine':<12} {'exports/s':>10} {'ms/export':>10} {'bytes':>8}")
+    print(f"{'python-docx':<12} {legacy:>10.1f} {1000 / legacy:>10.2f} {len(legacy_export_to_docx(CONTENT, METADATA)):>8}")
+    print(f"{'template':<12} {template:>10.1f} {1000 / template:>10.2f} {len(first):>8}")
+    print(f"\nspeedup: {template / legacy:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Cold import time of the application modules, tracked across releases.
+
+Every module is imported in a fresh interpreter several times and the median
+wall time is reported. With --record the run is appended as one JSON line to
+benchmarks/import_times.jsonl (git revision, Python version, medians), so
+startup regressions show up when comparing releases:
+
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --record --label v1.4
+"""
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+
+ROOT = Path(__file__).resolve().parent.parent
+HISTORY_FILE = Path(__file__).resolve().parent / "import_times.jsonl"
+
+MODULES = [
+    "document_models",
+    "text_cleaner",
+    "export_service",
+    "llm_service",
+    "batch_service",
+    "streamlit_app",
+]
+
+_PROBE = (
+    "import sys, time, warnings; warnings.simplefilter('ignore'); "
+    "started = time.perf_counter(); __import__(sys.argv[1]); "
+    "print(time.perf_counter() - started)"
+)
+
+
+def measure(module: str, repeat: int) -> float:
+    """Median seconds to import module in a new interpreter; NaN if the import fails"""
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _PROBE, module],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            return float("nan")
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time of the app modules")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--record", action="store_true", help=f"Append the results to {HISTORY_FILE.name}")
+    parser.add_argument("--label", default="", help="Release or branch name stored with the record")
+    parser.add_argument("modules", nargs="*", default=MODULES, help="Modules to measure")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'module':<20} {'median ms':>10}")
+    for module in args.modules:
+        seconds = measure(module, args.repeat)
+        results[module] = None if seconds != seconds else round(seconds * 1000, 1)
+        shown = "import failed" if results[module] is None else f"{results[module]:.1f}"
+        print(f"{module:<20} {shown:>10}")
+
+    if args.record:
+        record = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "label": args.label,
+            "python": platform.python_version(),
+            "repeat": args.repeat,
+            "import_ms": results,
+        }
+        with open(HISTORY_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"\nRecorded in {HISTORY_FILE}")
+
+
+if __name__ == "__main__":
+    main()
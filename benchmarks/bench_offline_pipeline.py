@@ -0,0 +1,198 @@
+"""Benchmark: end-to-end throughput of the document pipeline against a fake Gemini backend.
+
+Runs generation (blocking, streamed, async, and all four tones at once with
+generate_variants), refinement (full rewrite and patch), clean_response_text
+and the PDF, DOCX and TXT exporters at several concurrency levels. LLMService
+talks to a FakeModelClient that replays benchmarks/recorded_responses.jsonl
+with simulated time to first token, per-chunk streaming delay, jitter and
+transient 503s, so no API key or network is needed and runs are repeatable.
+--time-scale shrinks every simulated delay (and the retry backoff) to keep the
+run short. Run from the repository root:
+
+    python benchmarks/bench_offline_pipeline.py --requests 32 --concurrency 1,4,16
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import warnings
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+warnings.simplefilter("ignore")
+
+from document_models import DocumentType, ToneType  # noqa: E402
+from export_service import DocumentExporter  # noqa: E402
+from llm_service import LLMService  # noqa: E402
+from model_client import FakeModelClient  # noqa: E402
+from telemetry import Telemetry  # noqa: E402
+from text_cleaner import clean_response_text  # noqa: E402
+
+RECORDINGS = ROOT / "benchmarks" / "recorded_responses.jsonl"
+PROMPTS = [
+    "Announce that the GenAI lecture on Tuesday moves from 14:00 to 16:00 in lecture hall 1200.",
+    "Remind students that exam registration closes on 31 May at 23:59 via TUMonline.",
+    "Summarize the faculty board meeting: lab budget approved, office hours extended, next meeting 23 April.",
+    "Die Prüfung Analysis 2 wird vom 14. Juli auf den 21. Juli verschoben, gleiche Uhrzeit, Hörsaal 1200.",
+    "Welcome new students to the winter semester; orientation week starts 13 October with campus tours.",
+    "All lab users must attend the safety briefing before 30 April; register on Moodle.",
+]
+REFINEMENTS = ["Use 'Kind regards' as the closing", "Address the students more formally", "Make the subject shorter"]
+
+
+def requests(count):
+    """Deterministic mix of document types, tones, languages and prompts"""
+    types, tones = list(DocumentType), list(ToneType)
+    for index in range(count):
+        prompt = PROMPTS[index % len(PROMPTS)]
+        yield {
+            "doc_type": types[index % len(types)],
+            "tone": tones[(index // len(types)) % len(tones)],
+            # A per-request suffix keeps prompts distinct, like real traffic
+            "prompt": f"{prompt} (request {index})",
+            "sender_name": "Prof. Dr. Anna Müller",
+            "sender_profession": "Professor",
+            "language": "German" if "Prüfung" in prompt else "English",
+        }
+
+
+def run_threaded(job, items, concurrency):
+    """Run job over items with a thread pool; returns wall time and per-item latencies"""
+    def timed(item):
+        started = time.perf_counter()
+        job(item)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, items))
+    return time.perf_counter() - started, latencies
+
+
+def run_async(job, items, concurrency):
+    """Run an async job over items with at most concurrency in flight"""
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed(item):
+            async with semaphore:
+                started = time.perf_counter()
+                await job(item)
+                return time.perf_counter() - started
+
+        return await asyncio.gather(*(timed(item) for item in items))
+
+    started = time.perf_counter()
+    latencies = asyncio.run(main())
+    return time.perf_counter() - started, latencies
+
+
+def build_service(args):
+    client = FakeModelClient.from_jsonl(
+        str(RECORDINGS),
+        first_token_latency=0.6 * args.time_scale,
+        chunk_latency=0.04 * args.time_scale,
+        latency_jitter=0.3,
+        chunk_size=60,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    )
+    # The service's own Telemetry, so the report covers this run only
+    service = LLMService(client=client, telemetry=Telemetry(), max_concurrency=max(args.concurrency))
+    service.resilience.retry_policy.base_delay *= args.time_scale
+    return service
+
+
+def scenarios(service, documents):
+    exporter = DocumentExporter()
+    metadata = {"doc_type": "Announcement", "tone": "Formal"}
+
+    def generate(request):
+        service.generate_document(**request)
+
+    def generate_stream(request):
+        for _ in service.generate_document_stream(**request):
+            pass
+
+    async def agenerate(request):
+        await service.agenerate_document(**request)
+
+    def generate_variants(request):
+        options = {key: value for key, value in request.items() if key not in ("tone", "language")}
+        for _ in service.generate_variants(tones=list(ToneType), languages=[request["language"]], **options):
+            pass
+
+    def refine(mode):
+        def job(index):
+            request = documents[index % len(documents)]
+            service.refine_document(
+                request["document"], REFINEMENTS[index % len(REFINEMENTS)],
+                request["doc_type"], request["tone"], mode=mode, language=request["language"],
+            )
+        return job
+
+    def export(fmt):
+        def job(index):
+            exporter.export_document(documents[index % len(documents)]["document"], metadata, fmt)
+        return job
+
+    def clean(index):
+        clean_response_text(documents[index % len(documents)]["document"])
+
+    return [
+        ("generate", generate, "requests", False),
+        ("generate (stream)", generate_stream, "requests", False),
+        ("generate (async)", agenerate, "requests", True),
+        ("generate 4 tones", generate_variants, "requests", False),
+        ("refine (full)", refine("full"), "indexes", False),
+        ("refine (patch)", refine("patch"), "indexes", False),
+        ("clean_response_text", clean, "indexes", False),
+        ("export pdf", export("pdf"), "indexes", False),
+        ("export docx", export("docx"), "indexes", False),
+        ("export txt", export("txt"), "indexes", False),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure offline pipeline throughput")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per scenario and concurrency level")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--time-scale", type=float, default=0.1, help="Multiplier for simulated model latency")
+    parser.add_argument("--failure-rate", type=float, default=0.02, help="Share of model calls failing with a 503")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for latency jitter and failures")
+    args = parser.parse_args()
+    args.concurrency = [int(value) for value in args.concurrency.split(",")]
+
+    service = build_service(args)
+    items = {"requests": list(requests(args.requests)), "indexes": list(range(args.requests))}
+    documents = [
+        {**request, "document": service.generate_document(**request)["document"]}
+        for request in items["requests"][:len(PROMPTS)]
+    ]
+    service.telemetry = Telemetry()
+
+    print(f"{'scenario':<22} {'conc':>4} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, job, kind, is_async in scenarios(service, documents):
+        for concurrency in args.concurrency:
+            runner = run_async if is_async else run_threaded
+            elapsed, latencies = runner(job, items[kind], concurrency)
+            latencies = sorted(latency * 1000 for latency in latencies)
+            p95 = latencies[max(0, int(len(latencies) * 0.95 + 0.5) - 1)]
+            print(f"{name:<22} {concurrency:>4} {len(latencies) / elapsed:>9.1f} "
+                  f"{statistics.median(latencies):>9.1f} {p95:>9.1f}")
+
+    client = service.client
+    print(f"\nfake model: {client.calls} calls, {client.failures} simulated failures, "
+          f"{service.resilience_metrics()['retries']} retries")
+    stream = [row for row in service.telemetry.percentiles("time_to_first_token_seconds")
+              if row["operation"] == "generate_stream"]
+    if stream:
+        ttft = statistics.median(row["p50"] for row in stream) * 1000
+        print(f"streamed generation: median time to first token {ttft:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
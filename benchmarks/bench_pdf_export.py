@@ -0,0 +1,106 @@
+"""Benchmark: PDF export with the shared PDFLayout vs. the previous per-line multi_cell path.
+
+Renders a 1-page and a 50-page German document with both implementations and
+reports the median time per export. Run from the repository root:
+
+    python benchmarks/bench_pdf_export.py
+"""
+from datetime import datetime
+from pathlib import Path
+import io
+import statistics
+import sys
+import time
+import warnings
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+warnings.simplefilter("ignore")
+
+from pdf_renderer import PDFRenderer, get_pdf_layout  # noqa: E402
+
+PARAGRAPH = (
+    "Liebe Studierende, die Prüfung im Modul Grundlagen der Künstlichen Intelligenz findet am "
+    "14. März um 14:30 Uhr im Hörsaal 1200 statt. Bitte bringen Sie Ihren Studierendenausweis "
+    "und einen gültigen Lichtbildausweis mit; Hilfsmittel sind nicht zugelassen."
+)
+METADATA = {"doc_type": "Announcement", "tone": "Formal"}
+
+
+def legacy_export_to_pdf(content, metadata, font_file=None):
+    """The previous DocumentExporter.export_to_pdf, on the fpdf2 API; with font_file the
+    same per-line multi_cell path embeds that TTF, i.e. Unicode without a shared layout"""
+    from fpdf import FPDF
+    pdf = FPDF()
+    family = "Helvetica"
+    if font_file:
+        family = "Unicode"
+        for style in ("", "B", "I"):
+            pdf.add_font(family, style, font_file)
+    pdf.add_page()
+    pdf.set_font(family, "B", 16)
+    pdf.set_text_color(0, 101, 189)
+    pdf.cell(0, 10, f"TUM {metadata.get('doc_type', 'Document')}", align="C", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font(family, "I", 10)
+    pdf.set_text_color(128, 128, 128)
+    pdf.cell(0, 10, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}", new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(0, 10, f"Tone: {metadata.get('tone', 'Standard')}", new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(5)
+    pdf.set_font(family, "", 12)
+    pdf.set_text_color(0, 0, 0)
+    for line in content.split("\n"):
+        if not font_file:
+            line = line.encode("latin-1", "replace").decode("latin-1")
+        pdf.multi_cell(0, 6, line, new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(2)
+    return bytes(pdf.output())
+
+
+def document(pages):
+    # About 7.8 paragraphs with blank lines between them fill an A4 page at 12pt
+    return "\n\n".join(PARAGRAPH for _ in range(max(1, int(7.8 * pages))))
+
+
+def median_ms(fn, content, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(content, METADATA)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def page_count(data):
+    return data.count(b"/Type /Page\n") or data.count(b"/Type /Page")
+
+
+def main():
+    layout = get_pdf_layout()
+    renderer = PDFRenderer(layout)
+    font = layout.font_files[0] if layout.unicode else "built-in Helvetica (latin-1)"
+    print(f"PDFLayout font: {font}\n")
+
+    def render_to_sink(content, metadata):
+        renderer.render(content, metadata, io.BytesIO())
+
+    renderer.render_bytes(document(1), METADATA)  # prepare fonts and widths once, as a running app would
+    ttf = layout.font_files[0] if layout.unicode else None
+
+    def legacy_ttf(content, metadata):
+        return legacy_export_to_pdf(content, metadata, ttf)
+
+    header = f"{'document':<10} {'pages':>6} {'legacy ms':>10}"
+    if ttf:
+        header += f" {'legacy+TTF ms':>14}"
+    print(header + f" {'layout ms':>10}")
+    for pages, repeat in ((1, 20), (50, 3)):
+        content = document(pages)
+        row = f"{pages:>2}-page    {page_count(renderer.render_bytes(content, METADATA)):>6}"
+        row += f" {median_ms(legacy_export_to_pdf, content, repeat):>10.1f}"
+        if ttf:
+            row += f" {median_ms(legacy_ttf, content, repeat):>14.1f}"
+        print(row + f" {median_ms(render_to_sink, content, repeat):>10.1f}")
+    print("\nlegacy: core Helvetica, latin-1 only; legacy+TTF and layout embed the Unicode font")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark: sidebar render time against history size, windowed index vs. one expander per entry.
+
+Runs the app headless with Streamlit's AppTest against a temporary document
+store holding 10, 100 and 1,000 responses for one user each, with one entry
+selected, and reports the median rerun time. For comparison the previous
+history panel (an expander, a preview text_area and two download buttons per
+entry) is rendered from the same entries; at 1,000 entries that part alone takes
+a few minutes. Run from the repository root:
+
+    python benchmarks/bench_sidebar_render.py
+"""
+from pathlib import Path
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+warnings.simplefilter("ignore")
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from document_models import DocumentType, ToneType  # noqa: E402
+from document_store import create_document_store  # noqa: E402
+
+CONTENT = (
+    "Dear Students,\n\nThe exam of the module Introduction to Machine Learning takes place on "
+    "March 14 at 14:30 in lecture hall 1200. Please bring your student ID and a photo ID; no "
+    "aids are permitted. Registration closes one week before the exam.\n\nBest regards"
+) * 3
+
+
+def legacy_history_panel(entries):
+    """The history panel before the windowed index: every entry rendered on every rerun"""
+    import functools
+    import streamlit as st
+
+    def export(content, fmt):
+        return content.encode("utf-8")
+
+    with st.sidebar:
+        for idx, response in enumerate(entries):
+            with st.expander(f"📄 {response['name']}", expanded=False):
+                st.markdown(f"**Type:** {response['type']}")
+                st.markdown(f"**Tone:** {response['tone']}")
+                st.markdown(f"**Created:** {response['timestamp']}")
+                st.markdown("---")
+                st.text_area(
+                    "Content Preview:",
+                    value=response['content'][:300] + "..." if len(response['content']) > 300 else response['content'],
+                    height=100,
+                    disabled=True,
+                    key=f"all_preview_text_{idx}"
+                )
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.button("👁️ View Full", key=f"all_preview_btn_{idx}")
+                with col2:
+                    st.download_button("📑 PDF", data=functools.partial(export, response['content'], "pdf"),
+                                       file_name="a.pdf", key=f"all_download_pdf_{idx}")
+                with col3:
+                    st.download_button("📘 DOCX", data=functools.partial(export, response['content'], "docx"),
+                                       file_name="a.docx", key=f"all_download_docx_{idx}")
+
+
+def median_rerun_ms(app, repeat):
+    app.run()  # first run builds the session and warms caches
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        app.run()
+        samples.append((time.perf_counter() - started) * 1000)
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure sidebar render time against history size")
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma-separated history sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="Measured reruns per size")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    with tempfile.TemporaryDirectory() as directory:
+        spec = f"sqlite:{Path(directory) / 'documents.db'}"
+        os.environ["TUM_ADMIN_DOCUMENT_STORE"] = spec
+        store = create_document_store(spec)
+        types, tones = list(DocumentType), list(ToneType)
+        for size in sizes:
+            conversation_id = store.start_conversation(f"bench-{size}")
+            for index in range(size):
+                store.add_document(
+                    f"bench-{size}", types[index % len(types)], tones[index % len(tones)], CONTENT,
+                    "Prof. Dr. Müller", "Professor", conversation_id=conversation_id,
+                )
+
+        print(f"{'entries':>8} {'legacy ms':>10} {'windowed ms':>12}")
+        for size in sizes:
+            entries = list(reversed(list(store.iter_documents(f"bench-{size}"))))
+            legacy = AppTest.from_function(legacy_history_panel, args=(entries,), default_timeout=600)
+            legacy_ms = median_rerun_ms(legacy, args.repeat)
+
+            app = AppTest.from_file(str(ROOT / "streamlit_app.py"), default_timeout=600)
+            app.secrets["GOOGLE_API_KEY"] = "benchmark"
+            app.query_params["user"] = f"bench-{size}"
+            app.run()
+            app.session_state[app.sidebar.dataframe[0].key] = {"selection": {"rows": [0], "columns": [], "cells": []}}
+            windowed_ms = median_rerun_ms(app, args.repeat)
+            print(f"{size:>8} {legacy_ms:>10.1f} {windowed_ms:>12.1f}")
+        print("\nwindowed: the full app, including chat and settings; legacy: the history panel alone")
+
+
+if __name__ == "__main__":
+    main()
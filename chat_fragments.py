@@ -0,0 +1,89 @@
+from html import escape
+from typing import Dict
+
+from text_cleaner import clean_response_text
+
+# Shared by every chat bubble; rendered once per page instead of inlined into each message
+CHAT_CSS = """
+.chat-row {
+    display: flex;
+    margin: 15px 0;
+    align-items: flex-start;
+}
+.chat-row-user {
+    justify-content: flex-end;
+}
+.chat-row-assistant {
+    justify-content: flex-start;
+}
+.chat-bubble {
+    padding: 15px 18px;
+    max-width: 70%;
+    box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+    font-size: 14px;
+    line-height: 1.5;
+    white-space: pre-line;
+    word-wrap: break-word;
+}
+.chat-bubble-user {
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    color: white;
+    border-radius: 18px 18px 4px 18px;
+    margin-right: 10px;
+}
+.chat-bubble-assistant {
+    background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
+    color: #333;
+    border-radius: 18px 18px 18px 4px;
+    border: 1px solid #dee2e6;
+}
+.chat-avatar {
+    color: white;
+    border-radius: 50%;
+    width: 35px;
+    height: 35px;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    font-size: 16px;
+    flex-shrink: 0;
+}
+.chat-avatar-user {
+    background: #667eea;
+}
+.chat-avatar-assistant {
+    background: #28a745;
+    margin-right: 10px;
+}
+"""
+
+
+def message_fragment(role: str, display_content: str) -> str:
+    """The chat bubble for one message as a single-line HTML fragment styled by CHAT_CSS.
+
+    The text is escaped and line breaks become <br>, so the fragment stays one
+    HTML block for the markdown renderer whatever the message contains.
+    """
+    text = escape(display_content).replace("\n", "<br>")
+    if role == "user":
+        return (
+            '<div class="chat-row chat-row-user">'
+            f'<div class="chat-bubble chat-bubble-user">{text}</div>'
+            '<div class="chat-avatar chat-avatar-user">👤</div>'
+            '</div>'
+        )
+    return (
+        '<div class="chat-row chat-row-assistant">'
+        '<div class="chat-avatar chat-avatar-assistant"><img src="assets/robot-icon.svg" width="24" /></div>'
+        f'<div class="chat-bubble chat-bubble-assistant">{text}</div>'
+        '</div>'
+    )
+
+
+def with_fragment(message: Dict) -> Dict:
+    """Fill in a message's display_content and rendered html if they are not stored yet"""
+    if not message.get("display_content"):
+        message["display_content"] = clean_response_text(message["content"])
+    if not message.get("html"):
+        message["html"] = message_fragment(message["role"], message["display_content"])
+    return message
@@ -0,0 +1,128 @@
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Tuple
+import asyncio
+import threading
+import weakref
+
+
+class GlobalAsyncSemaphore:
+    """Async semaphore shared by every event loop and thread in the process.
+
+    asyncio.Semaphore is bound to one loop, but Streamlit sessions, the HTTP
+    server and batch workers may each run their own loop. Waiters park on a
+    future in their own loop and released slots are handed over directly.
+    """
+
+    def __init__(self, limit: int):
+        if limit < 1:
+            raise ValueError("Concurrency limit must be at least 1")
+        self.limit = limit
+        self.in_use = 0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_use < self.limit and not self._waiters:
+                self.in_use += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = waiter in self._waiters
+                if queued:
+                    self._waiters.remove(waiter)
+            # A slot granted just before the cancellation landed is ours; give it back, as
+            # asyncio.Semaphore does. One handed over after it is passed on by _grant
+            if not queued and waiter[1].done() and not waiter[1].cancelled():
+                self.release()
+            raise
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if future.done():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self) -> None:
+        with self._lock:
+            if self._waiters:
+                loop, future = self._waiters.popleft()
+            else:
+                self.in_use -= 1
+                return
+        try:
+            loop.call_soon_threadsafe(self._grant, future)
+        except RuntimeError:
+            # The waiter's loop has closed; offer the slot to the next waiter
+            self.release()
+
+    async def __aenter__(self) -> "GlobalAsyncSemaphore":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"limit": self.limit, "in_use": self.in_use, "waiting": len(self._waiters)}
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces identical in-flight coroutines within an event loop.
+
+    The first caller for a key starts the work as a task; later callers with
+    the same key await that task instead of starting their own. A caller that
+    is cancelled stops waiting, and the shared task is cancelled once no
+    caller is left waiting for it.
+    """
+
+    def __init__(self):
+        self._calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _Call]]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._calls.setdefault(loop, {})
+            call = calls.get(key)
+            if call is None:
+                call = _Call(loop.create_task(factory()))
+                calls[key] = call
+
+                def _forget(_task, key=key, call=call, calls=calls):
+                    if calls.get(key) is call:
+                        del calls[key]
+
+                call.task.add_done_callback(_forget)
+                self.started += 1
+            else:
+                self.coalesced += 1
+            call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if not call.task.done() and call.waiters == 1:
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            in_flight = sum(len(calls) for calls in self._calls.values())
+        return {"started": self.started, "coalesced": self.coalesced, "in_flight": in_flight}
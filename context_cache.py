@@ -0,0 +1,167 @@
+from contextlib import nullcontext
+from datetime import timedelta
+from typing import Any, ContextManager, Dict, Optional
+import hashlib
+import logging
+import threading
+import time
+
+
+class GenaiCacheBackend:
+    """Creates server-side cached contents through google.generativeai.
+
+    ``clients`` is the GeminiClient's GeminiClients, so cached contents are created
+    with the same API key as the calls that use them; None uses the process-wide default.
+    Any object with the same ``create``/``model_for``/``delete`` methods can be
+    passed to ContextCacheManager instead, e.g. a local stub in tests.
+    """
+
+    def __init__(self, clients: Optional[Any] = None):
+        self.clients = clients
+
+    def _configured(self) -> ContextManager:
+        return self.clients.configured() if self.clients is not None else nullcontext()
+
+    def create(self, model_name: str, prefix: str, ttl_seconds: int) -> Any:
+        from google.generativeai import caching
+        with self._configured():
+            return caching.CachedContent.create(
+                model=model_name,
+                display_name="tum-admin-prompt-prefix",
+                contents=[prefix],
+                ttl=timedelta(seconds=ttl_seconds),
+            )
+
+    def model_for(self, cached: Any) -> Any:
+        from model_client import GeminiClient
+        return GeminiClient.from_cached_content(cached, clients=self.clients)
+
+    def delete(self, cached: Any) -> None:
+        with self._configured():
+            cached.delete()
+
+
+class _CachedPrefix:
+    def __init__(self, cached: Any, model: Any, expires_at: float):
+        self.cached = cached
+        self.model = model
+        self.expires_at = expires_at
+
+
+class ContextCacheManager:
+    """Uploads static prompt prefixes once as cached content and hands out models bound to them.
+
+    A prefix whose upload fails (caching unsupported for the model, prefix below
+    the minimum token count, quota, ...) is not retried until ``failure_cooldown_seconds``
+    have passed; callers get ``None`` and send the full prompt instead.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        ttl_seconds: int = 3600,
+        backend: Optional[Any] = None,
+        refresh_margin_seconds: int = 60,
+        failure_cooldown_seconds: int = 300,
+    ):
+        self.model_name = model_name
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend or GenaiCacheBackend()
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.failure_cooldown_seconds = failure_cooldown_seconds
+        self._entries: Dict[str, _CachedPrefix] = {}
+        self._failed_until: Dict[str, float] = {}
+        self._pending: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.creations = 0
+        self.failures = 0
+        self.fallbacks = 0
+
+    @staticmethod
+    def _key(prefix: str) -> str:
+        return hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+    def _live_model(self, key: str, now: float) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > now:
+            self.hits += 1
+            return entry.model
+        return None
+
+    def cached_model(self, prefix: str) -> Optional[Any]:
+        """Model bound to the prefix if its cache is live, without uploading it; safe on the event loop"""
+        with self._lock:
+            return self._live_model(self._key(prefix), time.monotonic())
+
+    def model_for_prefix(self, prefix: str) -> Optional[Any]:
+        """Return a model bound to the cached prefix, or None to fall back to the full prompt.
+
+        The upload runs outside the lock, once per prefix: concurrent callers for the
+        same prefix wait for it, callers for other prefixes are not held up.
+        """
+        key = self._key(prefix)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                model = self._live_model(key, now)
+                if model is not None:
+                    return model
+                if self._failed_until.get(key, 0.0) > now:
+                    self.fallbacks += 1
+                    return None
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    break
+            pending.wait()
+        try:
+            try:
+                cached = self.backend.create(self.model_name, prefix, self.ttl_seconds)
+                model = self.backend.model_for(cached)
+            except Exception as e:
+                logging.warning(f"Context caching unavailable, sending full prompt: {str(e)}")
+                with self._lock:
+                    self.failures += 1
+                    self.fallbacks += 1
+                    self._failed_until[key] = time.monotonic() + self.failure_cooldown_seconds
+                return None
+            with self._lock:
+                # Refresh a little before the server-side TTL so requests never hit an expired cache
+                self._entries[key] = _CachedPrefix(
+                    cached, model, time.monotonic() + max(self.ttl_seconds - self.refresh_margin_seconds, 0)
+                )
+                self._failed_until.pop(key, None)
+                self.creations += 1
+            return model
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.set()
+
+    def invalidate(self, prefix: str) -> None:
+        """Forget a prefix, e.g. after the server reports its cached content as missing"""
+        with self._lock:
+            self._entries.pop(self._key(prefix), None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "cached_prefixes": len(self._entries),
+                "hits": self.hits,
+                "creations": self.creations,
+                "failures": self.failures,
+                "fallbacks": self.fallbacks,
+            }
+
+    def clear(self) -> None:
+        """Delete every cached content created by this manager"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._failed_until.clear()
+        for entry in entries:
+            try:
+                self.backend.delete(entry.cached)
+            except Exception as e:
+                logging.warning(f"Failed to delete cached content: {str(e)}")
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Dict, List, Optional
 from enum import Enum
+from datetime import datetime
 
 class DocumentType(str, Enum):
     ANNOUNCEMENT = "Announcement"
@@ -27,9 +28,26 @@ class DocumentRequest(BaseModel):
     sender_profession: Optional[str] = None
     language: Optional[str] = 'English'
 
+class DocumentVariantsRequest(BaseModel):
+    prompt: str
+    doc_type: DocumentType
+    tones: List[ToneType] = Field(..., min_length=1, description="Tones to generate the document in")
+    languages: List[str] = Field(default_factory=lambda: ['English'], description="Languages to generate it in")
+    additional_context: Optional[str] = None
+    sender_name: Optional[str] = None
+    sender_profession: Optional[str] = None
+
 class RefinementRequest(BaseModel):
     refinement_prompt: str = Field(..., min_length=10, description="The refinement instructions")
 
+class DocumentRefinementRequest(RefinementRequest):
+    current_document: str = Field(..., description="The document to refine")
+    doc_type: DocumentType
+    tone: ToneType
+    history: Optional[List[str]] = None
+    mode: str = Field("full", description="'full' rewrites the document, 'patch' edits spans only")
+    language: Optional[str] = None
+
 class ExportRequest(BaseModel):
     format: ExportFormat = Field(..., description="The desired export format")
     document_content: str = Field(..., description="The document content to export")
@@ -38,4 +56,26 @@ class ExportRequest(BaseModel):
 class DocumentResponse(BaseModel):
     document: str
     metadata: Dict[str, str]
-    history: Optional[List[Dict[str, str]]] = None 
\ No newline at end of file
+    history: Optional[List[Dict[str, str]]] = None 
+
+class PreparedExport(BaseModel):
+    """Format-independent export input, computed once and shared by every renderer"""
+    title: str
+    tone_line: str
+    generated_on: str
+    content: str
+    lines: List[str]
+    paragraphs: List[str]
+
+    @classmethod
+    def from_content(cls, content: str, metadata: Dict[str, str]) -> "PreparedExport":
+        # The document's own timestamp, when known, keeps exports of one document identical
+        generated_on = (metadata.get("timestamp") or datetime.now().strftime("%Y-%m-%d %H:%M"))[:16]
+        return cls(
+            title=f"TUM {metadata.get('doc_type', 'Document')}",
+            tone_line=f"Tone: {metadata.get('tone', 'Standard')}",
+            generated_on=generated_on,
+            content=content,
+            lines=content.split("\n"),
+            paragraphs=[paragraph.strip() for paragraph in content.split("\n\n") if paragraph.strip()]
+        )
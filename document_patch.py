@@ -0,0 +1,57 @@
+from typing import Dict, List
+import json
+import re
+
+
+class PatchError(ValueError):
+    """A model-proposed patch could not be parsed or applied to the document"""
+
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def parse_patch(text: str) -> List[Dict[str, str]]:
+    """Parse the model's patch output into a list of {"find", "replace"} edits"""
+    cleaned = _CODE_FENCE.sub("", text.strip())
+    try:
+        payload = json.loads(cleaned)
+    except ValueError as e:
+        raise PatchError(f"Patch is not valid JSON: {str(e)}")
+
+    if isinstance(payload, dict):
+        if payload.get("rewrite"):
+            raise PatchError("Model requested a full rewrite")
+        edits = payload.get("edits")
+    else:
+        edits = payload
+    if not isinstance(edits, list) or not edits:
+        raise PatchError("Patch contains no edits")
+
+    parsed = []
+    for edit in edits:
+        if not isinstance(edit, dict):
+            raise PatchError("Patch edit is not an object")
+        find = edit.get("find")
+        replace = edit.get("replace", "")
+        if not isinstance(find, str) or not find:
+            raise PatchError("Patch edit has an empty 'find' span")
+        if not isinstance(replace, str):
+            raise PatchError("Patch edit has a non-text 'replace' value")
+        parsed.append({"find": find, "replace": replace})
+    return parsed
+
+
+def apply_patch(document: str, edits: List[Dict[str, str]]) -> str:
+    """Apply span replacements in order. Every span must occur exactly once in the
+    document as it stands when that edit is applied."""
+    result = document
+    for edit in edits:
+        find = edit["find"]
+        count = result.count(find)
+        if count != 1:
+            problem = "not found" if count == 0 else f"ambiguous ({count} matches)"
+            raise PatchError(f"Patch span {problem}: {find[:60]!r}")
+        result = result.replace(find, edit["replace"], 1)
+    if not result.strip():
+        raise PatchError("Patch would leave the document empty")
+    return result
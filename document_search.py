@@ -0,0 +1,124 @@
+from functools import lru_cache
+from typing import List, Optional
+import hashlib
+import re
+
+# Documents are indexed as normalized terms rather than raw text: words are case-folded,
+# German umlauts and ß are folded (so "Prüfung", "Pruefung" and "prufung" meet) and each
+# word is reduced by a light stemmer for the document's language. A query word is looked
+# up under both its English and its German stem, since the language of a query is not
+# known. Filters are indexed as tag terms, so user, type, tone and language narrow the
+# match inside the inverted index instead of after it.
+
+_WORD = re.compile(r"\w+")
+_UMLAUTS = str.maketrans({"ä": "a", "ö": "o", "ü": "u"})
+_GERMAN_DIGRAPHS = (("ae", "a"), ("oe", "o"), ("ue", "u"))
+_MAX_TERM_LENGTH = 40
+_MAX_QUERY_TERMS = 12
+
+# Left out of queries only; documents keep every word so the index never needs rebuilding
+_STOPWORDS = frozenset("""
+a about an and are as at be by can do for from has have i in is it me of on or our please
+send sent that the their there this to us was we were what when where which who with you your
+aber als am an auf aus bei bitte das dass dem den der des die ein eine einen einer für hat
+haben ich im in ist mit nach oder sie sind über um und uns von vor war wir zu zum zur
+""".split())
+
+
+def _stem_english(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("sses"):
+        return word[:-2]
+    for suffix in ("ing", "ed", "ly"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+    if len(word) > 4 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def _stem_german(word: str) -> str:
+    """Suffix stripping after CISTEM: -em, -er, -nd from longer words, then -e, -s, -n"""
+    for digraph, vowel in _GERMAN_DIGRAPHS:
+        word = word.replace(digraph, vowel)
+    while len(word) > 3:
+        if len(word) > 5 and word[-2:] in ("em", "er", "nd"):
+            word = word[:-2]
+        elif word[-1] in "esn":
+            word = word[:-1]
+        else:
+            break
+    return word
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str, language: str) -> str:
+    """Index term for a case-folded word in the given language"""
+    word = word.translate(_UMLAUTS)
+    if word.isdigit():
+        return word
+    return _stem_german(word) if language == "German" else _stem_english(word)
+
+
+def _words(text: str) -> List[str]:
+    return [word for word in _WORD.findall(text.casefold()) if len(word) <= _MAX_TERM_LENGTH]
+
+
+def index_terms(text: str, language: str) -> str:
+    """The normalized terms stored in the index for text written in language"""
+    return " ".join(stem(word, language) for word in _words(text))
+
+
+def _tag(prefix: str, value: str) -> str:
+    return prefix + re.sub(r"\W+", "", value.casefold())
+
+
+def user_tag(user_id: str) -> str:
+    return "u" + hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:16]
+
+
+def index_tags(user_id: str, doc_type: str, tone: str, language: str) -> str:
+    return " ".join((user_tag(user_id), _tag("t", doc_type), _tag("o", tone), _tag("l", language)))
+
+
+def index_meta(doc_type: str, tone: str, sender_name: str, sender_profession: str, language: str) -> str:
+    """Searchable words describing a document, so "announcement from Müller" finds it by type and sender"""
+    return index_terms(f"{doc_type} {tone} {sender_name} {sender_profession}", language)
+
+
+def match_expression(
+    query: str,
+    user_id: str,
+    doc_type: Optional[str] = None,
+    tone: Optional[str] = None,
+    language: Optional[str] = None,
+    require_all: bool = True,
+) -> Optional[str]:
+    """FTS5 MATCH expression for a free-text query within one user's documents; None if the
+    query has no searchable words. Every word must match unless require_all is False; the
+    last one also matches as a prefix, so results follow the query while it is being typed."""
+    words = _words(query)
+    words = [word for word in words if word not in _STOPWORDS][:_MAX_QUERY_TERMS] or words[-1:]
+    if not words:
+        return None
+    tags = [user_tag(user_id)]
+    if doc_type:
+        tags.append(_tag("t", doc_type))
+    if tone:
+        tags.append(_tag("o", tone))
+    if language:
+        tags.append(_tag("l", language))
+
+    groups = []
+    for position, word in enumerate(words):
+        variants = dict.fromkeys((stem(word, "English"), stem(word, "German")))
+        suffix = "*" if position == len(words) - 1 else ""
+        terms = [f'"{variant}"{suffix}' for variant in variants]
+        groups.append("(" + " OR ".join(terms) + ")")
+    tag_filter = " AND ".join(f'tags : "{tag}"' for tag in tags)
+    operator = " AND " if require_all else " OR "
+    return f"{tag_filter} AND {{meta body}} : ({operator.join(groups)})"
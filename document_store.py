@@ -0,0 +1,453 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+import sqlite3
+import threading
+import time
+import uuid
+
+from document_models import DocumentType, ToneType
+from document_search import index_meta, index_tags, index_terms, match_expression
+
+PREVIEW_CHARS = 300
+
+
+class DocumentStore(ABC):
+    """Persistent history of generated documents, their refinement chains and chat messages.
+
+    Documents are returned as dicts in the history entry shape used by the app
+    (id, name, type, tone, language, content, preview, sender_name,
+    sender_profession, timestamp) plus conversation_id, parent_id, root_id and
+    version. The preview is computed once when a document is added. A refinement
+    is a new document whose parent is the refined one; all versions of a document
+    share the root_id of the first.
+    """
+
+    @abstractmethod
+    def start_conversation(self, user_id: str) -> str:
+        """Create a conversation for user_id and return its id"""
+
+    @abstractmethod
+    def latest_conversation(self, user_id: str) -> Optional[str]:
+        """Id of the user's most recently started conversation, or None"""
+
+    @abstractmethod
+    def add_document(
+        self,
+        user_id: str,
+        doc_type: Union[DocumentType, str],
+        tone: Union[ToneType, str],
+        content: str,
+        sender_name: str = "",
+        sender_profession: str = "",
+        language: str = "English",
+        conversation_id: Optional[str] = None,
+        parent_id: Optional[int] = None,
+    ) -> Dict:
+        """Store a document, named <type>_<tone>_response_<n> per user; with parent_id it
+        becomes the next version in that document's refinement chain"""
+
+    @abstractmethod
+    def get_document(self, document_id: int) -> Optional[Dict]:
+        pass
+
+    @abstractmethod
+    def list_documents(
+        self,
+        user_id: str,
+        doc_type: Optional[Union[DocumentType, str]] = None,
+        tone: Optional[Union[ToneType, str]] = None,
+        language: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        limit: int = 50,
+        before_id: Optional[int] = None,
+        include_content: bool = True,
+        after_id: Optional[int] = None,
+        oldest_first: bool = False,
+    ) -> List[Dict]:
+        """One page of the user's documents, newest first. Pass the id of the last
+        document of a page as before_id to get the next page, or with oldest_first as
+        after_id. Without content only the preview is loaded, which keeps history
+        indexes cheap."""
+
+    @abstractmethod
+    def count_documents(
+        self,
+        user_id: str,
+        doc_type: Optional[Union[DocumentType, str]] = None,
+        tone: Optional[Union[ToneType, str]] = None,
+        language: Optional[str] = None,
+    ) -> int:
+        pass
+
+    @abstractmethod
+    def search_documents(
+        self,
+        user_id: str,
+        query: str,
+        doc_type: Optional[Union[DocumentType, str]] = None,
+        tone: Optional[Union[ToneType, str]] = None,
+        language: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[Dict]:
+        """The user's documents matching every word of query, best match first, without
+        their content; each carries a "score" where lower is better"""
+
+    @abstractmethod
+    def refinement_chain(self, document_id: int) -> List[Dict]:
+        """All versions of the document's chain, from the original to the latest refinement"""
+
+    @abstractmethod
+    def add_message(
+        self,
+        conversation_id: str,
+        role: str,
+        content: str,
+        display_content: Optional[str] = None,
+        document_id: Optional[int] = None,
+    ) -> Dict:
+        pass
+
+    @abstractmethod
+    def list_messages(self, conversation_id: str) -> List[Dict]:
+        """Messages of a conversation in the order they were added"""
+
+    def iter_documents(
+        self, user_id: str, page_size: int = 200, oldest_first: bool = False, **filters
+    ) -> Iterator[Dict]:
+        """All matching documents, newest (or oldest) first, fetched one page at a time"""
+        cursor = None
+        while True:
+            if oldest_first:
+                page = self.list_documents(user_id, limit=page_size, after_id=cursor, oldest_first=True, **filters)
+            else:
+                page = self.list_documents(user_id, limit=page_size, before_id=cursor, **filters)
+            yield from page
+            if len(page) < page_size:
+                return
+            cursor = page[-1]["id"]
+
+
+def _enum_value(value, enum_type) -> Optional[str]:
+    """Validated enum value for a member or its string value; None stays None"""
+    if value is None:
+        return None
+    return enum_type(getattr(value, "value", value)).value
+
+
+def _format_timestamp(created_at: float) -> str:
+    return datetime.fromtimestamp(created_at).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def make_preview(content: str) -> str:
+    return content[:PREVIEW_CHARS] + "..." if len(content) > PREVIEW_CHARS else content
+
+
+_SUMMARY_COLUMNS = (
+    "id, conversation_id, name, doc_type, tone, language, sender_name, sender_profession, "
+    "preview, parent_id, root_id, version, created_at"
+)
+_DOCUMENT_COLUMNS = _SUMMARY_COLUMNS + ", content"
+
+
+def _document_from_row(row: sqlite3.Row) -> Dict:
+    document = {
+        "id": row["id"],
+        "name": row["name"],
+        "type": row["doc_type"],
+        "tone": row["tone"],
+        "language": row["language"],
+        "preview": row["preview"],
+        "sender_name": row["sender_name"],
+        "sender_profession": row["sender_profession"],
+        "conversation_id": row["conversation_id"],
+        "parent_id": row["parent_id"],
+        "root_id": row["root_id"],
+        "version": row["version"],
+        "timestamp": _format_timestamp(row["created_at"]),
+    }
+    if "content" in row.keys():
+        document["content"] = row["content"]
+    return document
+
+
+class SQLiteDocumentStore(DocumentStore):
+    """Document store in a single SQLite file (or ":memory:"), safe to share between sessions.
+
+    Every history query is served by an index that ends in the document id, so
+    filtered pages are index range scans in id order and keyset pagination with
+    before_id costs the same on the first page as on the hundredth. Full-text
+    search uses a contentless FTS5 index of normalized terms (see document_search),
+    updated in the same transaction that adds a document and ranked with BM25.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "id TEXT PRIMARY KEY, user_id TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, conversation_id TEXT, "
+                "name TEXT NOT NULL, doc_type TEXT NOT NULL, tone TEXT NOT NULL, language TEXT NOT NULL, "
+                "sender_name TEXT NOT NULL, sender_profession TEXT NOT NULL, content TEXT NOT NULL, "
+                "preview TEXT NOT NULL, parent_id INTEGER REFERENCES documents (id), "
+                "root_id INTEGER, version INTEGER NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, conversation_id TEXT NOT NULL, role TEXT NOT NULL, "
+                "content TEXT NOT NULL, display_content TEXT, document_id INTEGER, created_at REAL NOT NULL)"
+            )
+            for statement in (
+                "CREATE INDEX IF NOT EXISTS idx_conversations_user ON conversations (user_id, created_at)",
+                "CREATE INDEX IF NOT EXISTS idx_documents_user ON documents (user_id, id)",
+                "CREATE INDEX IF NOT EXISTS idx_documents_type ON documents (user_id, doc_type, id)",
+                "CREATE INDEX IF NOT EXISTS idx_documents_type_tone ON documents (user_id, doc_type, tone, id)",
+                "CREATE INDEX IF NOT EXISTS idx_documents_tone ON documents (user_id, tone, id)",
+                "CREATE INDEX IF NOT EXISTS idx_documents_language ON documents (user_id, language, id)",
+                "CREATE INDEX IF NOT EXISTS idx_documents_conversation ON documents (conversation_id, id)",
+                "CREATE INDEX IF NOT EXISTS idx_documents_chain ON documents (root_id, version)",
+                "CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (conversation_id, id)",
+            ):
+                self._conn.execute(statement)
+            has_search_index = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents_fts'"
+            ).fetchone()
+            if not has_search_index:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE documents_fts USING fts5("
+                    "tags, meta, body, content='', tokenize='unicode61 remove_diacritics 2')"
+                )
+                # Tags are weighted 0 so filters do not affect the ranking; the body counts most
+                self._conn.execute(
+                    "INSERT INTO documents_fts (documents_fts, rank) VALUES ('rank', 'bm25(0.0, 0.5, 1.0)')"
+                )
+
+    def _index_document(self, row) -> None:
+        self._conn.execute(
+            "INSERT INTO documents_fts (rowid, tags, meta, body) VALUES (?, ?, ?, ?)",
+            (
+                row["id"],
+                index_tags(row["user_id"], row["doc_type"], row["tone"], row["language"]),
+                index_meta(row["doc_type"], row["tone"], row["sender_name"], row["sender_profession"], row["language"]),
+                index_terms(row["content"], row["language"]),
+            ),
+        )
+
+    def start_conversation(self, user_id: str) -> str:
+        conversation_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO conversations (id, user_id, created_at) VALUES (?, ?, ?)",
+                (conversation_id, user_id, time.time()),
+            )
+        return conversation_id
+
+    def latest_conversation(self, user_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM conversations WHERE user_id = ? ORDER BY created_at DESC LIMIT 1", (user_id,)
+            ).fetchone()
+        return row["id"] if row else None
+
+    def add_document(
+        self,
+        user_id: str,
+        doc_type: Union[DocumentType, str],
+        tone: Union[ToneType, str],
+        content: str,
+        sender_name: str = "",
+        sender_profession: str = "",
+        language: str = "English",
+        conversation_id: Optional[str] = None,
+        parent_id: Optional[int] = None,
+    ) -> Dict:
+        doc_type = _enum_value(doc_type, DocumentType)
+        tone = _enum_value(tone, ToneType)
+        with self._lock, self._conn:
+            root_id, version = None, 1
+            if parent_id is not None:
+                parent = self._conn.execute(
+                    "SELECT root_id, version FROM documents WHERE id = ? AND user_id = ?", (parent_id, user_id)
+                ).fetchone()
+                if parent is None:
+                    raise ValueError(f"Unknown parent document: {parent_id}")
+                root_id, version = parent["root_id"], parent["version"] + 1
+            number = self._conn.execute(
+                "SELECT COUNT(*) FROM documents WHERE user_id = ? AND doc_type = ? AND tone = ?",
+                (user_id, doc_type, tone),
+            ).fetchone()[0] + 1
+            cursor = self._conn.execute(
+                "INSERT INTO documents (user_id, conversation_id, name, doc_type, tone, language, "
+                "sender_name, sender_profession, content, preview, parent_id, root_id, version, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    user_id, conversation_id, f"{doc_type}_{tone}_response_{number}", doc_type, tone,
+                    language or "English", sender_name or "", sender_profession or "", content,
+                    make_preview(content), parent_id, root_id, version, time.time(),
+                ),
+            )
+            document_id = cursor.lastrowid
+            if root_id is None:
+                self._conn.execute("UPDATE documents SET root_id = id WHERE id = ?", (document_id,))
+            row = self._conn.execute(
+                f"SELECT {_DOCUMENT_COLUMNS}, user_id FROM documents WHERE id = ?", (document_id,)
+            ).fetchone()
+            self._index_document(row)
+        return _document_from_row(row)
+
+    def get_document(self, document_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_DOCUMENT_COLUMNS} FROM documents WHERE id = ?", (document_id,)
+            ).fetchone()
+        return _document_from_row(row) if row else None
+
+    @staticmethod
+    def _where(
+        user_id: str,
+        doc_type=None,
+        tone=None,
+        language: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+    ) -> Tuple[str, List]:
+        clauses, params = ["user_id = ?"], [user_id]
+        for column, value in (
+            ("doc_type", _enum_value(doc_type, DocumentType)),
+            ("tone", _enum_value(tone, ToneType)),
+            ("language", language),
+            ("conversation_id", conversation_id),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return " AND ".join(clauses), params
+
+    def list_documents(
+        self,
+        user_id: str,
+        doc_type: Optional[Union[DocumentType, str]] = None,
+        tone: Optional[Union[ToneType, str]] = None,
+        language: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        limit: int = 50,
+        before_id: Optional[int] = None,
+        include_content: bool = True,
+        after_id: Optional[int] = None,
+        oldest_first: bool = False,
+    ) -> List[Dict]:
+        where, params = self._where(user_id, doc_type, tone, language, conversation_id)
+        if before_id is not None:
+            where += " AND id < ?"
+            params.append(before_id)
+        if after_id is not None:
+            where += " AND id > ?"
+            params.append(after_id)
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_DOCUMENT_COLUMNS if include_content else _SUMMARY_COLUMNS} FROM documents "
+                f"WHERE {where} ORDER BY id {'ASC' if oldest_first else 'DESC'} LIMIT ?",
+                params,
+            ).fetchall()
+        return [_document_from_row(row) for row in rows]
+
+    def count_documents(
+        self,
+        user_id: str,
+        doc_type: Optional[Union[DocumentType, str]] = None,
+        tone: Optional[Union[ToneType, str]] = None,
+        language: Optional[str] = None,
+    ) -> int:
+        where, params = self._where(user_id, doc_type, tone, language)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM documents WHERE {where}", params).fetchone()[0]
+
+    def search_documents(
+        self,
+        user_id: str,
+        query: str,
+        doc_type: Optional[Union[DocumentType, str]] = None,
+        tone: Optional[Union[ToneType, str]] = None,
+        language: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[Dict]:
+        doc_type, tone = _enum_value(doc_type, DocumentType), _enum_value(tone, ToneType)
+        columns = ", ".join(f"d.{column.strip()}" for column in _SUMMARY_COLUMNS.split(","))
+        rows = []
+        # Documents with every word come first; a question phrased in full sentences that no
+        # document fully matches falls back to ranking the documents with any of its words
+        for require_all in (True, False):
+            expression = match_expression(query, user_id, doc_type, tone, language, require_all)
+            if expression is None:
+                return []
+            with self._lock:
+                # Ranked inside the index first, so only the best rows are looked up in documents
+                rows = self._conn.execute(
+                    f"SELECT {columns}, m.score FROM ("
+                    "SELECT rowid, rank AS score FROM documents_fts WHERE documents_fts MATCH ? "
+                    "ORDER BY rank LIMIT ?) m JOIN documents d ON d.id = m.rowid ORDER BY m.score",
+                    (expression, limit),
+                ).fetchall()
+            if rows:
+                break
+        results = []
+        for row in rows:
+            document = _document_from_row(row)
+            document["score"] = row["score"]
+            results.append(document)
+        return results
+
+    def refinement_chain(self, document_id: int) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_DOCUMENT_COLUMNS} FROM documents "
+                "WHERE root_id = (SELECT root_id FROM documents WHERE id = ?) ORDER BY version",
+                (document_id,),
+            ).fetchall()
+        return [_document_from_row(row) for row in rows]
+
+    def add_message(
+        self,
+        conversation_id: str,
+        role: str,
+        content: str,
+        display_content: Optional[str] = None,
+        document_id: Optional[int] = None,
+    ) -> Dict:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO messages (conversation_id, role, content, display_content, document_id, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (conversation_id, role, content, display_content, document_id, time.time()),
+            )
+        return {"role": role, "content": content, "display_content": display_content, "document_id": document_id}
+
+    def list_messages(self, conversation_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content, display_content, document_id FROM messages "
+                "WHERE conversation_id = ? ORDER BY id",
+                (conversation_id,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def create_document_store(spec: str) -> DocumentStore:
+    """Build a store from a spec string: "sqlite:<path>" or "memory" (SQLite in memory,
+    lost when the process exits)"""
+    spec = (spec or "").strip()
+    kind, _, location = spec.partition(":")
+    if kind == "memory":
+        return SQLiteDocumentStore(":memory:")
+    if kind == "sqlite" and location:
+        return SQLiteDocumentStore(location)
+    raise ValueError(f"Unsupported document store spec: {spec}")
@@ -0,0 +1,203 @@
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+import io
+import os
+import re
+import struct
+import threading
+import zipfile
+import zlib
+
+from document_models import PreparedExport
+
+BODY_PART = "word/document.xml"
+TUM_BLUE_HEX = "0065BD"  # TUM Corporate Blue
+
+# Every entry carries the same DOS timestamp (1980-01-01 00:00) so identical inputs give identical bytes
+_DOS_TIME = 0
+_DOS_DATE = (0 << 9) | (1 << 5) | 1
+_ZIP_VERSION = 20
+_DEFLATED = 8
+_COMPRESS_LEVEL = 6
+
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+def _deflate(data: bytes) -> bytes:
+    compressor = zlib.compressobj(_COMPRESS_LEVEL, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+class _ZipEntry:
+    """A zip member compressed once; its local header and data are written verbatim"""
+
+    def __init__(self, name: str, data: bytes):
+        self.name = name.encode("utf-8")
+        self.crc = zlib.crc32(data)
+        self.size = len(data)
+        self.payload = _deflate(data)
+        self.local_header = struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, _ZIP_VERSION, 0, _DEFLATED, _DOS_TIME, _DOS_DATE,
+            self.crc, len(self.payload), self.size, len(self.name), 0,
+        ) + self.name
+
+    def central_header(self, offset: int) -> bytes:
+        return struct.pack(
+            "<IHHHHHHIIIHHHHHII", 0x02014B50, _ZIP_VERSION, _ZIP_VERSION, 0, _DEFLATED, _DOS_TIME, _DOS_DATE,
+            self.crc, len(self.payload), self.size, len(self.name), 0, 0, 0, 0, 0, offset,
+        ) + self.name
+
+
+def _default_template() -> bytes:
+    """python-docx's default package with TUM branding applied to the heading style"""
+    from docx import Document
+    from docx.shared import RGBColor
+
+    doc = Document()
+    doc.styles["Heading 1"].font.color.rgb = RGBColor.from_string(TUM_BLUE_HEX)
+    doc.core_properties.author = "TUM Admin"
+    doc.core_properties.comments = ""
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _load_template(base_dir: Path) -> bytes:
+    configured = os.getenv("TUM_ADMIN_DOCX_TEMPLATE")
+    candidates = [Path(configured)] if configured else []
+    candidates.append(base_dir / "assets" / "tum_template.docx")
+    for path in candidates:
+        if path.is_file():
+            return path.read_bytes()
+    return _default_template()
+
+
+class DocxTemplate:
+    """A TUM .docx package held in memory with every part except the body precompressed.
+
+    Exports only build word/document.xml; the other parts' headers and deflated
+    data are copied as they are. Entries use a fixed timestamp and compression
+    level, so identical inputs produce byte-identical files that can be cached.
+    """
+
+    def __init__(self, package: bytes):
+        # None marks the position of the body part, which is rebuilt per export
+        self.entries: List[Optional[_ZipEntry]] = []
+        self.body_prefix = self.body_suffix = None
+        with zipfile.ZipFile(io.BytesIO(package)) as archive:
+            for info in archive.infolist():
+                data = archive.read(info)
+                if info.filename == BODY_PART:
+                    self.body_prefix, self.body_suffix = self._split_body(data.decode("utf-8"))
+                    self.entries.append(None)
+                else:
+                    self.entries.append(_ZipEntry(info.filename, data))
+        if self.body_prefix is None:
+            raise ValueError(f"DOCX template has no {BODY_PART}")
+
+    @staticmethod
+    def _split_body(xml: str) -> Tuple[str, str]:
+        """Text up to and including <w:body>, and from the section properties to the end"""
+        body_start = xml.index("<w:body>") + len("<w:body>")
+        section = xml.rfind("<w:sectPr", body_start)
+        body_end = section if section != -1 else xml.rindex("</w:body>")
+        return xml[:body_start], xml[body_end:]
+
+    def write(self, body_xml: str, sink: BinaryIO) -> int:
+        """Zip the package with the given body paragraphs into sink; returns bytes written"""
+        body = _ZipEntry(BODY_PART, (self.body_prefix + body_xml + self.body_suffix).encode("utf-8"))
+        offset = 0
+        central = []
+        for entry in self.entries:
+            entry = entry or body
+            central.append(entry.central_header(offset))
+            sink.write(entry.local_header)
+            sink.write(entry.payload)
+            offset += len(entry.local_header) + len(entry.payload)
+        directory = b"".join(central)
+        sink.write(directory)
+        sink.write(struct.pack(
+            "<IHHHHIIH", 0x06054B50, 0, 0, len(central), len(central), len(directory), offset, 0
+        ))
+        return offset + len(directory) + 22
+
+
+def _text_runs(text: str) -> str:
+    """Run content for text, turning line breaks and tabs into Word elements"""
+    parts = []
+    for index, line in enumerate(_INVALID_XML_CHARS.sub("", text).split("\n")):
+        if index:
+            parts.append("<w:br/>")
+        for tab_index, chunk in enumerate(line.split("\t")):
+            if tab_index:
+                parts.append("<w:tab/>")
+            if chunk:
+                parts.append(f'<w:t xml:space="preserve">{escape(chunk)}</w:t>')
+    return "".join(parts)
+
+
+def _paragraph(text: str, style: Optional[str] = None, align: Optional[str] = None) -> str:
+    properties = ""
+    if style or align:
+        properties = "<w:pPr>"
+        if style:
+            properties += f'<w:pStyle w:val="{style}"/>'
+        if align:
+            properties += f'<w:jc w:val="{align}"/>'
+        properties += "</w:pPr>"
+    return f"<w:p>{properties}<w:r>{_text_runs(text)}</w:r></w:p>"
+
+
+class DocxRenderer:
+    """Renders TUM documents into the shared DocxTemplate"""
+
+    def __init__(self, template: Optional[DocxTemplate] = None):
+        self._template = template
+
+    @property
+    def template(self) -> DocxTemplate:
+        if self._template is None:
+            self._template = get_docx_template()
+        return self._template
+
+    @staticmethod
+    def body_xml(prepared: PreparedExport) -> str:
+        parts = [
+            _paragraph(prepared.title, style="Heading1", align="center"),
+            _paragraph(f"Generated on: {prepared.generated_on}"),
+            _paragraph(prepared.tone_line),
+            _paragraph("=" * 50),
+        ]
+        parts.extend(_paragraph(paragraph) for paragraph in prepared.paragraphs)
+        return "".join(parts)
+
+    def render_prepared(self, prepared: PreparedExport, sink: BinaryIO) -> int:
+        return self.template.write(self.body_xml(prepared), sink)
+
+    def render(self, content: str, metadata: Dict[str, str], sink: BinaryIO) -> int:
+        """Write the .docx to a binary file-like sink; returns bytes written"""
+        return self.render_prepared(PreparedExport.from_content(content, metadata), sink)
+
+    def render_bytes(self, content: str, metadata: Dict[str, str]) -> bytes:
+        return self.prepared_bytes(PreparedExport.from_content(content, metadata))
+
+    def prepared_bytes(self, prepared: PreparedExport) -> bytes:
+        sink = io.BytesIO()
+        self.render_prepared(prepared, sink)
+        return sink.getvalue()
+
+
+_docx_template: Optional[DocxTemplate] = None
+_docx_template_lock = threading.Lock()
+
+
+def get_docx_template() -> DocxTemplate:
+    """Process-wide DocxTemplate, loaded from TUM_ADMIN_DOCX_TEMPLATE, assets/tum_template.docx
+    or python-docx's default package on first use"""
+    global _docx_template
+    if _docx_template is None:
+        with _docx_template_lock:
+            if _docx_template is None:
+                _docx_template = DocxTemplate(_load_template(Path(__file__).resolve().parent))
+    return _docx_template
@@ -1,16 +1,31 @@
-from fpdf import FPDF
-from docx import Document
-from docx.shared import Pt, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
 import tempfile
 import os
 from datetime import datetime
-from typing import Dict
-import io
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+import hashlib
+import json
+import logging
+import multiprocessing
+import re
+import threading
+import time
+import zipfile
+
+from document_models import PreparedExport
+from docx_renderer import DocxRenderer
+from pdf_renderer import TUM_BLUE, PDFRenderer
+
+EXPORT_FORMATS = ("pdf", "docx", "txt")
+
 
 class DocumentExporter:
     def __init__(self):
-        self.tum_blue = (0, 101, 189)  # TUM Corporate Blue
+        self.tum_blue = TUM_BLUE
+        # Fonts and page layout are shared by every exporter in the process
+        self.pdf_renderer = PDFRenderer()
+        self.docx_renderer = DocxRenderer()
 
     def _create_filename(self, doc_type: str, extension: str) -> str:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -19,91 +34,361 @@ class DocumentExporter:
 
     def export_to_pdf(self, content: str, metadata: Dict[str, str]) -> bytes:
         """Export content to PDF and return bytes"""
-        pdf = FPDF()
-        pdf.add_page()
-        
-        # Header
-        pdf.set_font("Arial", "B", 16)
-        pdf.set_text_color(*self.tum_blue)
-        pdf.cell(0, 10, f"TUM {metadata.get('doc_type', 'Document')}", ln=True, align="C")
-        
-        # Metadata
-        pdf.set_font("Arial", "I", 10)
-        pdf.set_text_color(128, 128, 128)
-        pdf.cell(0, 10, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}", ln=True)
-        pdf.cell(0, 10, f"Tone: {metadata.get('tone', 'Standard')}", ln=True)
-        pdf.ln(5)
-        
-        # Content
-        pdf.set_font("Arial", "", 12)
-        pdf.set_text_color(0, 0, 0)
-        
-        # Handle text encoding properly
-        try:
-            # Split content into lines and handle encoding
-            lines = content.split('\n')
-            for line in lines:
-                # Encode to latin-1 for FPDF compatibility
-                try:
-                    encoded_line = line.encode('latin-1', 'replace').decode('latin-1')
-                    pdf.multi_cell(0, 6, encoded_line)
-                except:
-                    # Fallback for problematic characters
-                    safe_line = line.encode('ascii', 'replace').decode('ascii')
-                    pdf.multi_cell(0, 6, safe_line)
-                pdf.ln(2)
-        except Exception as e:
-            pdf.multi_cell(0, 6, f"Error displaying content: {str(e)}")
-        
-        # Return PDF as bytes
-        return pdf.output(dest='S').encode('latin-1')
+        return self.export_document(content, metadata, "pdf")
+
+    def write_pdf(self, content: str, metadata: Dict[str, str], sink: BinaryIO) -> None:
+        """Export content to PDF, writing into a binary file-like sink"""
+        self.pdf_renderer.render(content, metadata, sink)
 
     def export_to_docx(self, content: str, metadata: Dict[str, str]) -> bytes:
         """Export content to DOCX and return bytes"""
-        doc = Document()
-        
-        # Header
-        header = doc.add_heading(f"TUM {metadata.get('doc_type', 'Document')}", level=1)
-        header.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        
-        # Metadata
-        doc.add_paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-        doc.add_paragraph(f"Tone: {metadata.get('tone', 'Standard')}")
-        doc.add_paragraph("=" * 50)
-        
-        # Content
-        # Split content into paragraphs and add them properly
-        paragraphs = content.split('\n\n')
-        for paragraph in paragraphs:
-            if paragraph.strip():
-                doc.add_paragraph(paragraph.strip())
-        
-        # Save to bytes buffer
-        buffer = io.BytesIO()
-        doc.save(buffer)
-        buffer.seek(0)
-        return buffer.getvalue()
+        return self.export_document(content, metadata, "docx")
+
+    def write_docx(self, content: str, metadata: Dict[str, str], sink: BinaryIO) -> None:
+        """Export content to DOCX, writing into a binary file-like sink"""
+        self.docx_renderer.render(content, metadata, sink)
 
     def export_to_txt(self, content: str, metadata: Dict[str, str]) -> bytes:
         """Export content to TXT and return bytes"""
-        text_content = f"""TUM {metadata.get('doc_type', 'Document')}
+        return self.export_document(content, metadata, "txt")
+
+    def _txt_bytes(self, prepared: PreparedExport) -> bytes:
+        text_content = f"""{prepared.title}
 {'=' * 50}
 
-Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-Tone: {metadata.get('tone', 'Standard')}
+Generated on: {prepared.generated_on}
+{prepared.tone_line}
 {'=' * 50}
 
-{content}
+{prepared.content}
 """
         return text_content.encode('utf-8')
 
-    def export_document(self, content: str, metadata: Dict[str, str], format: str) -> bytes:
-        """Export document in specified format and return bytes"""
+    def export_prepared(self, prepared: PreparedExport, format: str) -> bytes:
+        """Render already prepared content in one format, recording the render time"""
+        started = time.perf_counter()
         if format == "pdf":
-            return self.export_to_pdf(content, metadata)
+            data = self.pdf_renderer.prepared_bytes(prepared)
         elif format == "docx":
-            return self.export_to_docx(content, metadata)
+            data = self.docx_renderer.prepared_bytes(prepared)
         elif format == "txt":
-            return self.export_to_txt(content, metadata)
+            data = self._txt_bytes(prepared)
         else:
             raise ValueError(f"Unsupported format: {format}")
+        _export_timings.record(format, time.perf_counter() - started)
+        return data
+
+    def export_document(self, content: str, metadata: Dict[str, str], format: str) -> bytes:
+        """Export document in specified format and return bytes"""
+        return self.export_prepared(PreparedExport.from_content(content, metadata), format)
+
+    def export_many(
+        self,
+        content: str,
+        metadata: Dict[str, str],
+        formats: Sequence[str],
+    ) -> Dict[str, bytes]:
+        """Export one document in several formats; returns format -> bytes.
+
+        Paragraph splitting, header text and the timestamp are prepared once and
+        shared by all formats. The renders hold the GIL, so they run one after the
+        other; bulk exports use the process pool through export_all. Per-format
+        render times are recorded in get_export_timings().
+        """
+        formats = list(dict.fromkeys(formats))
+        for fmt in formats:
+            if fmt not in EXPORT_FORMATS:
+                raise ValueError(f"Unsupported format: {fmt}")
+        started = time.perf_counter()
+        prepared = PreparedExport.from_content(content, metadata)
+        _export_timings.record("prepare", time.perf_counter() - started)
+        return {fmt: self.export_prepared(prepared, fmt) for fmt in formats}
+
+    def export_all(
+        self,
+        entries: Iterable[Dict[str, str]],
+        sink: BinaryIO,
+        formats: Sequence[str] = ("pdf",),
+        workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        total: Optional[int] = None,
+        on_progress: Optional[Callable[[int, Optional[int]], None]] = None,
+    ) -> Dict[str, object]:
+        """Render response history entries into one zip written to sink; returns a summary.
+
+        Entries render in a process pool, since fpdf and python-docx are CPU-bound,
+        and each zip member is written as soon as its render finishes. Entries are
+        read lazily and only a bounded number of renders is in flight, so memory does
+        not grow with the history. Entries use the all_responses_history shape (name,
+        type, tone, content, timestamp); exports already in the export cache are not
+        re-rendered. total is the number of entries, if the caller knows it;
+        on_progress, if given, is called with the files written so far and the
+        expected number of files (None without total) after each file; an exception
+        it raises stops the export.
+        """
+        for fmt in formats:
+            if fmt not in EXPORT_FORMATS:
+                raise ValueError(f"Unsupported format: {fmt}")
+        started = time.perf_counter()
+        cache = get_export_cache()
+        errors: List[str] = []
+        written = 0
+        expected = total * len(formats) if total is not None else None
+        # Small or single-core exports render inline; the pool is started on the first render otherwise
+        inline = executor is None and ((workers or os.cpu_count() or 1) == 1 or total == 1)
+        pool = executor
+        in_flight: Dict[Future, Tuple[str, str]] = {}
+        entry_count = 0
+
+        with zipfile.ZipFile(sink, "w") as archive:
+            def add(name: str, fmt: str, data: bytes) -> None:
+                nonlocal written
+                # PDF and DOCX are compressed already; deflating them again only costs time
+                compress_type = zipfile.ZIP_DEFLATED if fmt == "txt" else zipfile.ZIP_STORED
+                archive.writestr(name, data, compress_type=compress_type)
+                written += 1
+                if on_progress is not None:
+                    on_progress(written, expected)
+
+            def failed(name: str, error: Exception) -> None:
+                logging.error(f"Export of {name} failed: {str(error)}")
+                errors.append(f"{name}: {str(error)}")
+
+            def collect() -> None:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, fmt = in_flight.pop(future)
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        failed(name, e)
+                        continue
+                    add(name, fmt, data)
+
+            try:
+                for index, entry in enumerate(entries):
+                    entry_count += 1
+                    content, metadata = entry["content"], _entry_metadata(entry)
+                    for fmt in formats:
+                        name = _member_name(index, entry, fmt)
+                        cached = cache.get(cache.make_key(content, metadata, fmt))
+                        if cached is not None:
+                            add(name, fmt, cached)
+                        elif inline:
+                            try:
+                                data = self.export_document(content, metadata, fmt)
+                            except Exception as e:
+                                failed(name, e)
+                                continue
+                            add(name, fmt, data)
+                        else:
+                            if pool is None:
+                                pool = get_export_pool(workers)
+                            in_flight[pool.submit(_render_export, content, metadata, fmt)] = (name, fmt)
+                            if len(in_flight) >= 2 * (workers or getattr(pool, "_max_workers", 4)):
+                                collect()
+                while in_flight:
+                    collect()
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+            if errors:
+                archive.writestr("export_errors.txt", "\n".join(errors) + "\n")
+
+        return {
+            "entries": entry_count,
+            "files": written,
+            "failed": len(errors),
+            "elapsed_seconds": round(time.perf_counter() - started, 2),
+        }
+
+
+class ExportCache:
+    """Content-addressed LRU cache of rendered exports, bounded by total bytes"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(content: str, metadata: Dict[str, str], format: str) -> str:
+        """Hash content, metadata and format into a cache key"""
+        digest = hashlib.sha256()
+        digest.update(format.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(json.dumps(metadata, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(content.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+            self._entries[key] = data
+            self.current_bytes += len(data)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                self.evictions += 1
+
+    def get_or_render(
+        self,
+        content: str,
+        metadata: Dict[str, str],
+        format: str,
+        render: Callable[[str, Dict[str, str], str], bytes],
+    ) -> bytes:
+        """Return cached bytes for this export, rendering and storing them on a miss"""
+        key = self.make_key(content, metadata, format)
+        data = self.get(key)
+        if data is None:
+            data = render(content, metadata, format)
+            self.put(key, data)
+        return data
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+_export_cache = ExportCache()
+
+
+def get_export_cache() -> ExportCache:
+    return _export_cache
+
+
+def cached_export(content: str, metadata: Dict[str, str], format: str) -> bytes:
+    """Export through the process-wide cache so identical documents render once"""
+    return _export_cache.get_or_render(content, metadata, format, DocumentExporter().export_document)
+
+
+def cached_export_many(content: str, metadata: Dict[str, str], formats: Sequence[str]) -> Dict[str, bytes]:
+    """Export several formats through the cache, rendering the missing ones together"""
+    results = {}
+    keys = {fmt: _export_cache.make_key(content, metadata, fmt) for fmt in formats}
+    for fmt, key in keys.items():
+        data = _export_cache.get(key)
+        if data is not None:
+            results[fmt] = data
+    missing = [fmt for fmt in keys if fmt not in results]
+    if missing:
+        for fmt, data in DocumentExporter().export_many(content, metadata, missing).items():
+            _export_cache.put(keys[fmt], data)
+            results[fmt] = data
+    return results
+
+
+class ExportTimings:
+    """Process-wide render time per export format, plus the shared preprocessing step"""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        milliseconds = seconds * 1000
+        with self._lock:
+            stats = self._stats.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0})
+            stats["count"] += 1
+            stats["total_ms"] += milliseconds
+            stats["max_ms"] = max(stats["max_ms"], milliseconds)
+            stats["last_ms"] = milliseconds
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                name: {
+                    "count": int(stats["count"]),
+                    "mean_ms": round(stats["total_ms"] / stats["count"], 3),
+                    "max_ms": round(stats["max_ms"], 3),
+                    "last_ms": round(stats["last_ms"], 3),
+                }
+                for name, stats in self._stats.items()
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+_export_timings = ExportTimings()
+
+
+def get_export_timings() -> ExportTimings:
+    return _export_timings
+
+
+def _entry_metadata(entry: Dict[str, str]) -> Dict[str, str]:
+    metadata = {"doc_type": entry.get("type", "Document"), "tone": entry.get("tone", "Standard")}
+    if entry.get("timestamp"):
+        metadata["timestamp"] = entry["timestamp"]
+    return metadata
+
+
+def _member_name(index: int, entry: Dict[str, str], fmt: str) -> str:
+    name = re.sub(r"[^\w.-]+", "_", entry.get("name") or f"document_{index + 1}").strip("_")
+    return f"{index + 1:03d}_TUM_{name}.{fmt}"
+
+
+_worker_exporter: Optional[DocumentExporter] = None
+
+
+def _render_export(content: str, metadata: Dict[str, str], format: str) -> bytes:
+    """Render in a pool worker, reusing one exporter (and its fonts and template) per process"""
+    global _worker_exporter
+    if _worker_exporter is None:
+        _worker_exporter = DocumentExporter()
+    return _worker_exporter.export_document(content, metadata, format)
+
+
+_export_pool: Optional[ProcessPoolExecutor] = None
+_export_pool_lock = threading.Lock()
+
+
+def get_export_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Process-wide pool for export rendering, started on first use.
+
+    Workers are spawned rather than forked because the Streamlit server is
+    multi-threaded, and forking a threaded process can copy held locks.
+    """
+    global _export_pool
+    with _export_pool_lock:
+        if _export_pool is None:
+            _export_pool = ProcessPoolExecutor(
+                max_workers=workers or min(4, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _export_pool
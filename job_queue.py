@@ -0,0 +1,660 @@
+"""Background jobs for document generation, refinement and bulk export.
+
+The Streamlit app submits jobs to a SQLite-backed queue and polls them instead
+of calling Gemini inline, so a slow call never blocks the session, several
+documents can be generated at once, and a job keeps running if the browser
+disconnects. Workers store results in the document store and add the chat
+reply to the job's conversation. The app starts TUM_ADMIN_JOB_WORKERS worker
+processes itself; set it to 0 and run them separately to scale them out:
+
+    python job_queue.py --workers 4
+"""
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+from document_models import DocumentType, ToneType
+from document_store import DocumentStore, create_document_store
+from export_service import DocumentExporter
+from resilience import UpstreamUnavailableError
+from text_cleaner import clean_response_text
+
+JOB_KINDS = ("generate", "variants", "refine", "export")
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+# A running job whose worker has not reported for this long is handed to another worker
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+# Finished jobs and their artifacts are kept this long for the UI to pick up
+RETENTION_SECONDS = 7 * 24 * 3600
+POLL_SECONDS = 0.5
+
+_JOB_COLUMNS = (
+    "id, kind, user_id, conversation_id, status, payload, result, error, progress, "
+    "attempts, worker, created_at, started_at, updated_at, finished_at"
+)
+
+
+def _job_from_row(row: sqlite3.Row) -> Dict:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+class SQLiteJobQueue:
+    """Job queue in a single SQLite file, shared by the app and any number of worker processes.
+
+    A job moves from queued to running when a worker claims it, then to succeeded,
+    failed or cancelled. Workers append progress events (streamed deltas, status
+    messages) that the app reads back by sequence number, and can attach artifact
+    files such as an export zip, kept in artifact_dir next to the database. Claims are atomic across processes; a running
+    job whose worker stops reporting for LEASE_SECONDS is queued again, up to
+    MAX_ATTEMPTS times.
+    """
+
+    def __init__(self, path: str, artifact_dir: Optional[str] = None):
+        self.path = path
+        if artifact_dir is None:
+            artifact_dir = tempfile.mkdtemp(prefix="tum_admin_jobs_") if path == ":memory:" else f"{path}.artifacts"
+        self.artifact_dir = artifact_dir
+        os.makedirs(artifact_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode; multi-statement updates open their own transactions
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._transaction():
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, user_id TEXT NOT NULL, conversation_id TEXT, "
+                "status TEXT NOT NULL, payload TEXT NOT NULL, result TEXT, error TEXT, "
+                "progress REAL NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, "
+                "created_at REAL NOT NULL, started_at REAL, updated_at REAL NOT NULL, finished_at REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_events ("
+                "job_id TEXT NOT NULL, seq INTEGER NOT NULL, event TEXT NOT NULL, created_at REAL NOT NULL, "
+                "PRIMARY KEY (job_id, seq))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_artifacts ("
+                "job_id TEXT NOT NULL, name TEXT NOT NULL, size INTEGER NOT NULL, PRIMARY KEY (job_id, name))"
+            )
+            for statement in (
+                "CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, created_at)",
+                "CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user_id, created_at)",
+            ):
+                self._conn.execute(statement)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never claim the same job
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def submit(self, kind: str, user_id: str, payload: Dict, conversation_id: Optional[str] = None) -> str:
+        """Queue a job and return its id"""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unsupported job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, user_id, conversation_id, status, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, user_id, conversation_id, QUEUED, json.dumps(payload, ensure_ascii=False), now, now),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job_from_row(row) if row else None
+
+    def list_jobs(
+        self,
+        user_id: str,
+        conversation_id: Optional[str] = None,
+        kind: Optional[str] = None,
+        statuses: Optional[Sequence[str]] = None,
+        limit: int = 50,
+    ) -> List[Dict]:
+        """The user's jobs, oldest first among the newest limit"""
+        clauses, params = ["user_id = ?"], [user_id]
+        if conversation_id is not None:
+            clauses.append("conversation_id = ?")
+            params.append(conversation_id)
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if statuses:
+            clauses.append(f"status IN ({', '.join('?' for _ in statuses)})")
+            params.extend(statuses)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_JOB_COLUMNS} FROM jobs WHERE {' AND '.join(clauses)} ORDER BY created_at DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [_job_from_row(row) for row in reversed(rows)]
+
+    def claim(self, worker: str, kinds: Sequence[str] = JOB_KINDS) -> Optional[Dict]:
+        """Move the oldest queued job of the given kinds to running for worker; None if there is none"""
+        now = time.time()
+        with self._transaction() as conn:
+            # Jobs of workers that died mid-run go back to the queue, or fail after MAX_ATTEMPTS
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "error = CASE WHEN attempts >= ? THEN 'Worker stopped responding' ELSE error END, "
+                "finished_at = CASE WHEN attempts >= ? THEN ? ELSE finished_at END, updated_at = ? "
+                "WHERE status = ? AND updated_at < ?",
+                (MAX_ATTEMPTS, FAILED, QUEUED, MAX_ATTEMPTS, MAX_ATTEMPTS, now, now, RUNNING, now - LEASE_SECONDS),
+            )
+            row = conn.execute(
+                f"SELECT id FROM jobs WHERE status = ? AND kind IN ({', '.join('?' for _ in kinds)}) "
+                "ORDER BY created_at LIMIT 1",
+                (QUEUED, *kinds),
+            ).fetchone()
+            if row is None:
+                return None
+            row = conn.execute(
+                f"UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, started_at = ?, updated_at = ? "
+                f"WHERE id = ? RETURNING {_JOB_COLUMNS}",
+                (RUNNING, worker, now, now, row["id"]),
+            ).fetchone()
+            # A job taken over from a dead worker streams again from the start
+            conn.execute("DELETE FROM job_events WHERE job_id = ?", (row["id"],))
+        return _job_from_row(row)
+
+    def publish(self, job_id: str, worker: str, event: Dict, progress: Optional[float] = None) -> bool:
+        """Append a progress event and renew the job's lease; False once the job is no longer
+        running for worker (cancelled or taken over), which tells the worker to stop"""
+        now = time.time()
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET updated_at = ?, progress = COALESCE(?, progress) "
+                "WHERE id = ? AND status = ? AND worker = ?",
+                (now, progress, job_id, RUNNING, worker),
+            ).rowcount
+            if not updated:
+                return False
+            conn.execute(
+                "INSERT INTO job_events (job_id, seq, event, created_at) "
+                "SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ? FROM job_events WHERE job_id = ?",
+                (job_id, json.dumps(event, ensure_ascii=False), now, job_id),
+            )
+        return True
+
+    def holds(self, job_id: str, worker: str) -> bool:
+        """Whether the job is still running for worker"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM jobs WHERE id = ? AND status = ? AND worker = ?", (job_id, RUNNING, worker)
+            ).fetchone() is not None
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict]:
+        """Progress events with a sequence number above after, each with its "seq" """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, event FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after),
+            ).fetchall()
+        return [{**json.loads(row["event"]), "seq": row["seq"]} for row in rows]
+
+    def artifact_path(self, job_id: str, name: str) -> str:
+        """Where the artifact file of a job lives"""
+        return os.path.join(self.artifact_dir, f"{job_id}_{os.path.basename(name)}")
+
+    def add_artifact(self, job_id: str, worker: str, name: str, source: str) -> bool:
+        """Move the file at source into place as the job's artifact name; False, leaving source
+        where it is, if the job is no longer running for worker"""
+        path = self.artifact_path(job_id, name)
+        with self._transaction() as conn:
+            if conn.execute(
+                "SELECT 1 FROM jobs WHERE id = ? AND status = ? AND worker = ?", (job_id, RUNNING, worker)
+            ).fetchone() is None:
+                return False
+            os.replace(source, path)
+            conn.execute(
+                "INSERT OR REPLACE INTO job_artifacts (job_id, name, size) VALUES (?, ?, ?)",
+                (job_id, name, os.path.getsize(path)),
+            )
+        return True
+
+    def open_artifact(self, job_id: str, name: str) -> Optional[BinaryIO]:
+        """The artifact as an open binary file, read from disk as it is consumed; None if missing"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM job_artifacts WHERE job_id = ? AND name = ?", (job_id, name)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return open(self.artifact_path(job_id, name), "rb")
+        except FileNotFoundError:
+            return None
+
+    def finish(self, job_id: str, worker: str, result: Optional[Dict] = None, error: Optional[str] = None) -> bool:
+        """Mark a job running for worker succeeded with result, or failed with error; False if it
+        was cancelled or taken over by another worker"""
+        now = time.time()
+        with self._transaction() as conn:
+            return bool(conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, progress = CASE WHEN ? THEN progress ELSE 1 END, "
+                "updated_at = ?, finished_at = ? WHERE id = ? AND status = ? AND worker = ?",
+                (
+                    FAILED if error else SUCCEEDED,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error, bool(error), now, now, job_id, RUNNING, worker,
+                ),
+            ).rowcount)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; a running job stops at its next progress event"""
+        now = time.time()
+        with self._transaction() as conn:
+            return bool(conn.execute(
+                f"UPDATE jobs SET status = ?, updated_at = ?, finished_at = ? "
+                f"WHERE id = ? AND status IN ({', '.join('?' for _ in ACTIVE_STATUSES)})",
+                (CANCELLED, now, now, job_id, *ACTIVE_STATUSES),
+            ).rowcount)
+
+    def purge(self, older_than: float = RETENTION_SECONDS) -> int:
+        """Delete finished jobs, their events and artifacts older than older_than seconds"""
+        cutoff = time.time() - older_than
+        with self._transaction() as conn:
+            expired = [
+                row["id"] for row in conn.execute(
+                    f"SELECT id FROM jobs WHERE status NOT IN ({', '.join('?' for _ in ACTIVE_STATUSES)}) "
+                    "AND finished_at < ?",
+                    (*ACTIVE_STATUSES, cutoff),
+                ).fetchall()
+            ]
+            artifacts = [
+                self.artifact_path(row["job_id"], row["name"]) for job_id in expired
+                for row in conn.execute("SELECT job_id, name FROM job_artifacts WHERE job_id = ?", (job_id,))
+            ]
+            for table, column in (("job_events", "job_id"), ("job_artifacts", "job_id"), ("jobs", "id")):
+                conn.executemany(f"DELETE FROM {table} WHERE {column} = ?", [(job_id,) for job_id in expired])
+        for path in artifacts:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return len(expired)
+
+
+def create_job_queue(spec: str) -> SQLiteJobQueue:
+    """Build a queue from a spec string: "sqlite:<path>" or "memory" (SQLite in memory,
+    usable by worker threads of the same process only)"""
+    spec = (spec or "").strip()
+    kind, _, location = spec.partition(":")
+    if kind == "memory":
+        return SQLiteJobQueue(":memory:")
+    if kind == "sqlite" and location:
+        return SQLiteJobQueue(location)
+    raise ValueError(f"Unsupported job queue spec: {spec}")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job handler once its job was cancelled or taken over"""
+
+
+class JobWorker:
+    """Claims jobs from a queue and runs them against the document store.
+
+    Generation and refinement results are stored as documents and answered in the
+    job's conversation, so the chat shows them even if nobody is polling the job.
+    The LLMService is created by service_factory on the first model job, so
+    export-only workers need no API key.
+    """
+
+    def __init__(
+        self,
+        queue: SQLiteJobQueue,
+        store: DocumentStore,
+        service_factory: Callable,
+        kinds: Sequence[str] = JOB_KINDS,
+        worker_id: Optional[str] = None,
+        poll_interval: float = POLL_SECONDS,
+    ):
+        self.queue = queue
+        self.store = store
+        self.service_factory = service_factory
+        self.kinds = tuple(kinds)
+        self.worker_id = worker_id or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.poll_interval = poll_interval
+        self._service = None
+        self._handlers = {
+            "generate": self._generate, "variants": self._variants, "refine": self._refine, "export": self._export
+        }
+
+    @property
+    def service(self):
+        if self._service is None:
+            self._service = self.service_factory()
+        return self._service
+
+    def run(self, should_stop: Callable[[], bool] = lambda: False) -> None:
+        """Process jobs until should_stop returns True"""
+        last_purge = 0.0
+        while not should_stop():
+            if time.time() - last_purge > 3600:
+                last_purge = time.time()
+                self.queue.purge()
+            if not self.run_once():
+                time.sleep(self.poll_interval)
+
+    def run_once(self) -> bool:
+        """Claim and run one job; False if the queue was empty"""
+        job = self.queue.claim(self.worker_id, self.kinds)
+        if job is None:
+            return False
+        try:
+            result = self._handlers[job["kind"]](job)
+        except JobCancelled:
+            logging.info(f"Job {job['id']} stopped: cancelled or taken over")
+        except Exception as e:
+            logging.error(f"Error running {job['kind']} job {job['id']}: {str(e)}")
+            if self.queue.finish(job["id"], job["worker"], error=str(e)) and job["kind"] != "export":
+                # The chat gets the same apology the inline flow used to show
+                if isinstance(e, UpstreamUnavailableError):
+                    reply = f"Sorry, the document service is busy right now. {str(e)}"
+                else:
+                    reply = f"Sorry, I encountered an error: {str(e)}"
+                self.store.add_message(job["conversation_id"], "assistant", reply, display_content=clean_response_text(reply))
+        else:
+            if not self.queue.finish(job["id"], job["worker"], result=result):
+                logging.info(f"Job {job['id']} finished after it was cancelled or taken over; result dropped")
+        return True
+
+    def _publish(self, job: Dict, event: Dict, progress: Optional[float] = None) -> None:
+        if not self.queue.publish(job["id"], job["worker"], event, progress):
+            raise JobCancelled(job["id"])
+
+    def _answer(self, job: Dict, content: str, **document_fields) -> Dict:
+        """Store the document and its chat reply, unless the job was cancelled or taken over meanwhile"""
+        if not self.queue.holds(job["id"], job["worker"]):
+            raise JobCancelled(job["id"])
+        document = self.store.add_document(
+            job["user_id"], content=content, conversation_id=job["conversation_id"], **document_fields
+        )
+        self.store.add_message(
+            job["conversation_id"], "assistant", content,
+            display_content=clean_response_text(content), document_id=document["id"]
+        )
+        return {"document_id": document["id"], "name": document["name"]}
+
+    def _generate(self, job: Dict) -> Dict:
+        payload = job["payload"]
+        self._publish(job, {"status": "Generating new document..."})
+        final_event = None
+        for event in self.service.generate_document_stream(
+            doc_type=DocumentType(payload["doc_type"]),
+            tone=ToneType(payload["tone"]),
+            prompt=payload["prompt"],
+            sender_name=payload.get("sender_name", ""),
+            sender_profession=payload.get("sender_profession", ""),
+            language=payload.get("language", "English"),
+            force_fresh=payload.get("force_fresh", False),
+        ):
+            if event.get("is_final"):
+                final_event = event
+                break
+            self._publish(job, {"delta": event.get("delta", "")})
+        if final_event is None:
+            raise Exception("Stream ended without a final response")
+        return self._answer(
+            job,
+            clean_response_text(final_event["document"]),
+            doc_type=payload["doc_type"],
+            tone=payload["tone"],
+            sender_name=payload.get("sender_name", ""),
+            sender_profession=payload.get("sender_profession", ""),
+            language=payload.get("language", "English"),
+        )
+
+    def _variants(self, job: Dict) -> Dict:
+        """The prompt in several tones and languages at once; each finished variant is stored and
+        answered on its own, and the first progress event lists the variants for the comparison view"""
+        payload = job["payload"]
+        doc_type = payload["doc_type"]
+        events = self.service.generate_variants(
+            doc_type=DocumentType(doc_type),
+            tones=[ToneType(tone) for tone in payload["tones"]],
+            prompt=payload["prompt"],
+            sender_name=payload.get("sender_name", ""),
+            sender_profession=payload.get("sender_profession", ""),
+            languages=payload.get("languages") or ["English"],
+            force_fresh=payload.get("force_fresh", False),
+        )
+        variants: Dict[int, Dict] = {}
+        for event in events:
+            if "variant" not in event:
+                variants = {tag["variant"]: dict(tag) for tag in event["variants"]}
+                self._publish(job, {"status": f"Generating {len(variants)} variants...", "variants": event["variants"]})
+            elif not event.get("is_final"):
+                self._publish(job, {"variant": event["variant"], "delta": event.get("delta", "")})
+            elif event.get("error"):
+                variants[event["variant"]]["error"] = event["error"]
+            else:
+                variants[event["variant"]].update(self._answer(
+                    job,
+                    clean_response_text(event["document"]),
+                    doc_type=doc_type,
+                    tone=event["tone"],
+                    sender_name=payload.get("sender_name", ""),
+                    sender_profession=payload.get("sender_profession", ""),
+                    language=event["language"],
+                ))
+        results = [variants[index] for index in sorted(variants)]
+        if all("error" in variant for variant in results):
+            raise Exception(results[0]["error"] if results else "No variants were generated")
+        return {"variants": results}
+
+    def _refine(self, job: Dict) -> Dict:
+        payload = job["payload"]
+        last_doc = self.store.get_document(payload["document_id"])
+        if last_doc is None:
+            raise ValueError(f"Document {payload['document_id']} not found")
+        self._publish(job, {"status": f"Refining document: {last_doc['type']}"})
+        # Patch mode returns only the edited spans; the full rewrite it falls back to is streamed
+        final_event = None
+        for event in self.service.refine_document_stream(
+            current_document=last_doc["content"],
+            refinement_prompt=payload["refinement_prompt"],
+            doc_type=DocumentType(last_doc["type"]),
+            tone=ToneType(last_doc["tone"]),
+            history=[],
+            language=last_doc.get("language"),
+            mode="patch",
+        ):
+            if event.get("is_final"):
+                final_event = event
+                break
+            self._publish(job, {"delta": event.get("delta", "")})
+        if final_event is None:
+            raise Exception("Stream ended without a final response")
+        # Stop before storing if the job was cancelled while Gemini was working
+        self._publish(job, {"status": "Saving refined document..."}, progress=0.9)
+        return self._answer(
+            job,
+            clean_response_text(final_event["document"]),
+            doc_type=last_doc["type"],
+            tone=last_doc["tone"],
+            sender_name=payload.get("sender_name") or last_doc["sender_name"],
+            sender_profession=payload.get("sender_profession") or last_doc["sender_profession"],
+            language=last_doc["language"],
+            parent_id=last_doc["id"],
+        )
+
+    def _export(self, job: Dict) -> Dict:
+        """Zip of the user's whole stored history, oldest first, kept as the job's "export.zip" artifact.
+        Documents are read a page at a time and the zip is written straight to its file"""
+        formats = tuple(job["payload"].get("formats") or ("pdf",))
+        total = self.store.count_documents(job["user_id"])
+        self._publish(job, {"status": f"Exporting {total} responses..."})
+
+        def on_progress(done: int, expected: Optional[int]) -> None:
+            # Every file would be one write per render; a few percent steps are plenty
+            if expected and (done == expected or done % max(1, expected // 20) == 0):
+                self._publish(job, {"status": f"Exported {done} of {expected} files"}, progress=done / expected)
+
+        # Named per worker, so a worker whose lease expired never writes into its successor's file
+        partial = f"{self.queue.artifact_path(job['id'], 'export.zip')}.{self.worker_id}.part"
+        try:
+            with open(partial, "wb") as sink:
+                summary = DocumentExporter().export_all(
+                    self.store.iter_documents(job["user_id"], oldest_first=True),
+                    sink, formats=formats, total=total, on_progress=on_progress
+                )
+            if not self.queue.add_artifact(job["id"], job["worker"], "export.zip", partial):
+                raise JobCancelled(job["id"])
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        return summary
+
+
+def _service_from_env(api_key: Optional[str]):
+    from llm_service import llm_options_from_env, warm_up_llm_service
+    return warm_up_llm_service(api_key, **llm_options_from_env())
+
+
+def run_worker_process(
+    queue_spec: str,
+    store_spec: str,
+    api_key: Optional[str] = None,
+    stop_event=None,
+    kinds: Sequence[str] = JOB_KINDS,
+) -> None:
+    """Worker process entry point; exits when stop_event is set or the parent process is gone"""
+    parent = os.getppid()
+    worker = JobWorker(
+        create_job_queue(queue_spec),
+        create_document_store(store_spec),
+        lambda: _service_from_env(api_key),
+        kinds=kinds,
+    )
+    if set(kinds) & {"generate", "refine"}:
+        # Connect to Gemini before the first job rather than during it
+        try:
+            worker.service
+        except Exception as e:
+            logging.warning(f"LLM service warm-up skipped: {str(e)}")
+    worker.run(lambda: (stop_event is not None and stop_event.is_set()) or os.getppid() != parent)
+
+
+def start_worker_processes(
+    queue_spec: str,
+    store_spec: str,
+    count: int,
+    api_key: Optional[str] = None,
+    kinds: Sequence[str] = JOB_KINDS,
+) -> Callable[[], None]:
+    """Start count worker processes and return a function that stops them.
+
+    The processes are not daemonic, so an export job can still render in a process
+    pool. The returned function is also registered with atexit, and each worker exits
+    by itself once its parent is gone.
+    """
+    import atexit
+
+    # Spawned rather than forked: the parent may be a threaded server such as Streamlit
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+    processes = [
+        context.Process(
+            target=run_worker_process,
+            args=(queue_spec, store_spec, api_key, stop_event, tuple(kinds)),
+            name=f"job-worker-{index}",
+        )
+        for index in range(count)
+    ]
+    for process in processes:
+        process.start()
+
+    def stop() -> None:
+        stop_event.set()
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+    atexit.register(stop)
+    return stop
+
+
+def start_worker_threads(
+    queue: SQLiteJobQueue,
+    store: DocumentStore,
+    service_factory: Callable,
+    count: int,
+    kinds: Sequence[str] = JOB_KINDS,
+) -> List[threading.Thread]:
+    """Run workers as daemon threads of this process, for queues and stores that only live in memory"""
+    lock = threading.Lock()
+    shared: Dict = {}
+
+    def factory():
+        with lock:
+            if "service" not in shared:
+                shared["service"] = service_factory()
+            return shared["service"]
+
+    threads = [
+        threading.Thread(
+            target=JobWorker(queue, store, factory, kinds=kinds).run, name=f"job-worker-{index}", daemon=True
+        )
+        for index in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes")
+    parser.add_argument("--kinds", default=",".join(JOB_KINDS), help="Comma-separated job kinds to run")
+    parser.add_argument(
+        "--queue", default=os.getenv("TUM_ADMIN_JOB_QUEUE", "sqlite:tum_admin_jobs.db"), help="Job queue spec"
+    )
+    parser.add_argument(
+        "--store", default=os.getenv("TUM_ADMIN_DOCUMENT_STORE", "sqlite:tum_admin_documents.db"),
+        help="Document store spec"
+    )
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if not args.queue.startswith("sqlite:") or not args.store.startswith("sqlite:"):
+        parser.error("Separate worker processes need a sqlite: job queue and document store")
+    stop = start_worker_processes(
+        args.queue, args.store, args.workers, os.getenv("GOOGLE_API_KEY"), kinds=args.kinds.split(",")
+    )
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+
+# LLMService talks to the model through a ModelClient. GeminiClient is the production
+# backend; FakeModelClient replays recorded responses with simulated latency, streaming
+# and upstream failures, so the whole pipeline can be exercised and benchmarked without
+# an API key or network. Responses follow the google.generativeai shape: a .text
+# attribute and optional .usage_metadata, and an iterable of such chunks when streamed.
+
+
+class ModelClient(ABC):
+    """A text generation backend for LLMService"""
+
+    model_name: str = ""
+
+    @abstractmethod
+    def generate(self, prompt: str, json_output: bool = False, stream: bool = False) -> Any:
+        """The response for prompt; an iterable of chunks when stream is True"""
+
+    @abstractmethod
+    async def agenerate(self, prompt: str, json_output: bool = False, stream: bool = False) -> Any:
+        """Async generate; streamed responses are async-iterable"""
+
+    def warm_up(self) -> None:
+        """Open connections ahead of the first request"""
+
+
+class GeminiClients:
+    """google.generativeai transports bound to one API key.
+
+    genai.configure sets a single key for the whole process, so every transport is
+    created right after configuring this key, under a process-wide lock, and keeps
+    the key afterwards. SDK calls that only use the default clients (creating and
+    deleting cached content) run inside configured() instead.
+    """
+
+    _lock = threading.RLock()
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key
+        self._clients: Dict[str, Any] = {}
+
+    @contextmanager
+    def configured(self) -> Iterator[None]:
+        """Hold the lock with this key configured as the process-wide default"""
+        import google.generativeai as genai
+        with self._lock:
+            genai.configure(api_key=self.api_key)
+            yield
+
+    def get_default_client(self, name: str) -> Any:
+        """This key's transport for a service ("generative", "generative_async" or "cache")"""
+        with self._lock:
+            client = self._clients.get(name)
+            if client is None:
+                from google.generativeai import client as genai_client
+                with self.configured():
+                    client = getattr(genai_client, f"get_default_{name}_client")()
+                self._clients[name] = client
+            return client
+
+
+class GeminiClient(ModelClient):
+    """google.generativeai backend, optionally bound to server-side cached content"""
+
+    def __init__(self, model_name: str, api_key: Optional[str] = None, model: Any = None, clients: Any = None):
+        self.model_name = model_name
+        if model is None:
+            # Imported here rather than at module load: google.generativeai takes most of a second
+            # to import, and the Streamlit page should render before it is needed
+            import google.generativeai as genai
+            clients = clients or GeminiClients(api_key)
+            model = genai.GenerativeModel(model_name)
+        self.model = model
+        # Transports are created from these clients on first use; None leaves the model on
+        # google.generativeai's process-wide default clients
+        self.clients = clients
+
+    @classmethod
+    def from_cached_content(cls, cached: Any, clients: Any = None) -> "GeminiClient":
+        import google.generativeai as genai
+        return cls(
+            getattr(cached, "model", ""),
+            model=genai.GenerativeModel.from_cached_content(cached_content=cached),
+            clients=clients
+        )
+
+    def _attach(self, attribute: str, name: str) -> None:
+        """Give the model its own transport before GenerativeModel falls back to the default one.
+        GenerativeModel binds its transports lazily to these attributes in the 0.8 SDK pinned in
+        requirements.txt"""
+        if self.clients is not None and getattr(self.model, attribute, None) is None:
+            setattr(self.model, attribute, self.clients.get_default_client(name))
+
+    @staticmethod
+    def _generation_config(json_output: bool = False):
+        from google.generativeai.types import GenerationConfig
+        return GenerationConfig(
+            temperature=0.5,
+            top_p=0.5,
+            top_k=40,
+            response_mime_type="application/json" if json_output else None
+        )
+
+    def generate(self, prompt: str, json_output: bool = False, stream: bool = False) -> Any:
+        self._attach("_client", "generative")
+        return self.model.generate_content(prompt, generation_config=self._generation_config(json_output), stream=stream)
+
+    async def agenerate(self, prompt: str, json_output: bool = False, stream: bool = False) -> Any:
+        self._attach("_async_client", "generative_async")
+        return await self.model.generate_content_async(
+            prompt, generation_config=self._generation_config(json_output), stream=stream
+        )
+
+    def warm_up(self) -> None:
+        try:
+            if self.clients is not None:
+                self._attach("_client", "generative")
+            else:
+                from google.generativeai import client as genai_client
+                genai_client.get_default_generative_client()
+        except Exception as e:
+            logging.warning(f"Gemini client warm-up failed: {str(e)}")
+
+
+def _chunk_text(chunk: Any) -> str:
+    try:
+        return chunk.text or ""
+    except ValueError:
+        return ""
+
+
+def prompt_key(prompt: str, json_output: bool = False) -> str:
+    """Identity of a prompt in a recording"""
+    return hashlib.sha256(f"{int(json_output)}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token count: about four characters per token"""
+    return max(1, len(text) // 4) if text else 0
+
+
+class FakeUsage:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.cached_content_token_count = 0
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+    """A response or stream chunk in the google.generativeai shape"""
+
+    def __init__(self, text: str, usage_metadata: Optional[FakeUsage] = None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class FakeUpstreamError(Exception):
+    """Simulated transient Gemini failure; retryable like a real 503"""
+
+    code = 503
+
+
+class FakeModelClient(ModelClient):
+    """Deterministic stand-in for Gemini that replays recorded responses.
+
+    A recording whose prompt key matches is replayed as is; any other prompt gets a
+    recording of the same kind (text or JSON) picked by prompt hash, so a run is
+    repeatable. Latency is a time to first token plus a delay per streamed chunk,
+    with seeded jitter; failure_rate of the calls raise FakeUpstreamError before
+    any output.
+    """
+
+    def __init__(
+        self,
+        recordings: Sequence[Dict],
+        model_name: str = "fake-gemini",
+        first_token_latency: float = 0.0,
+        chunk_latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        chunk_size: int = 80,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        if not recordings:
+            raise ValueError("FakeModelClient needs at least one recorded response")
+        self.model_name = model_name
+        self.first_token_latency = first_token_latency
+        self.chunk_latency = chunk_latency
+        self.latency_jitter = latency_jitter
+        self.chunk_size = max(1, chunk_size)
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self._sleep = sleep
+        self._by_key = {recording["key"]: recording for recording in recordings if recording.get("key")}
+        self._by_kind = {
+            kind: [recording for recording in recordings if bool(recording.get("json_output")) == kind]
+            or list(recordings)
+            for kind in (False, True)
+        }
+        self._calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    @classmethod
+    def from_jsonl(cls, path: str, **options) -> "FakeModelClient":
+        with open(path, encoding="utf-8") as f:
+            return cls([json.loads(line) for line in f if line.strip()], **options)
+
+    def _plan(self, prompt: str, json_output: bool):
+        """Pick the response, the chunk delays and whether this call fails"""
+        key = prompt_key(prompt, json_output)
+        with self._lock:
+            self.calls += 1
+            attempt = self._calls.get(key, 0)
+            self._calls[key] = attempt + 1
+        # Seeded by prompt and repeat count, so concurrent runs replay the same sequence
+        rng = random.Random(f"{self.seed}:{key}:{attempt}")
+        recording = self._by_key.get(key)
+        if recording is None:
+            candidates = self._by_kind[json_output]
+            recording = candidates[int(key[:8], 16) % len(candidates)]
+        text = recording["text"]
+        chunks = [text[start:start + self.chunk_size] for start in range(0, len(text), self.chunk_size)] or [""]
+
+        def jittered(seconds: float) -> float:
+            return max(0.0, seconds * (1 + rng.uniform(-self.latency_jitter, self.latency_jitter)))
+
+        delays = [jittered(self.first_token_latency)] + [jittered(self.chunk_latency) for _ in chunks[1:]]
+        failed = rng.random() < self.failure_rate
+        if failed:
+            with self._lock:
+                self.failures += 1
+        usage = FakeUsage(
+            recording.get("prompt_tokens") or estimate_tokens(prompt),
+            recording.get("response_tokens") or estimate_tokens(text)
+        )
+        return text, chunks, delays, failed, usage
+
+    def generate(self, prompt: str, json_output: bool = False, stream: bool = False) -> Any:
+        text, chunks, delays, failed, usage = self._plan(prompt, json_output)
+        if failed:
+            self._sleep(delays[0])
+            raise FakeUpstreamError("503 The model is overloaded (simulated)")
+        if stream:
+            return self._stream(chunks, delays, usage)
+        self._sleep(sum(delays))
+        return FakeResponse(text, usage)
+
+    def _stream(self, chunks: List[str], delays: List[float], usage: FakeUsage) -> Iterator[FakeResponse]:
+        for index, (chunk, delay) in enumerate(zip(chunks, delays)):
+            self._sleep(delay)
+            yield FakeResponse(chunk, usage if index == len(chunks) - 1 else None)
+
+    async def agenerate(self, prompt: str, json_output: bool = False, stream: bool = False) -> Any:
+        text, chunks, delays, failed, usage = self._plan(prompt, json_output)
+        if failed:
+            await asyncio.sleep(delays[0])
+            raise FakeUpstreamError("503 The model is overloaded (simulated)")
+        if stream:
+            return self._astream(chunks, delays, usage)
+        await asyncio.sleep(sum(delays))
+        return FakeResponse(text, usage)
+
+    async def _astream(self, chunks: List[str], delays: List[float], usage: FakeUsage) -> AsyncIterator[FakeResponse]:
+        for index, (chunk, delay) in enumerate(zip(chunks, delays)):
+            await asyncio.sleep(delay)
+            yield FakeResponse(chunk, usage if index == len(chunks) - 1 else None)
+
+
+class RecordingModelClient(ModelClient):
+    """Passes calls through to another client and appends each response to a JSONL
+    recording that FakeModelClient.from_jsonl can replay"""
+
+    def __init__(self, client: ModelClient, path: str):
+        self.client = client
+        self.model_name = client.model_name
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _record(self, prompt: str, json_output: bool, text: str, usage: Any) -> None:
+        recording = {
+            "key": prompt_key(prompt, json_output),
+            "json_output": json_output,
+            "text": text,
+            "prompt_tokens": getattr(usage, "prompt_token_count", None),
+            "response_tokens": getattr(usage, "candidates_token_count", None),
+        }
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(recording, ensure_ascii=False) + "\n")
+
+    def generate(self, prompt: str, json_output: bool = False, stream: bool = False) -> Any:
+        response = self.client.generate(prompt, json_output, stream)
+        if not stream:
+            self._record(prompt, json_output, response.text, getattr(response, "usage_metadata", None))
+            return response
+        return self._recorded_stream(prompt, json_output, response)
+
+    def _recorded_stream(self, prompt: str, json_output: bool, response: Any) -> Iterator[Any]:
+        parts, usage = [], None
+        for chunk in response:
+            parts.append(_chunk_text(chunk))
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            yield chunk
+        self._record(prompt, json_output, "".join(parts), usage)
+
+    async def agenerate(self, prompt: str, json_output: bool = False, stream: bool = False) -> Any:
+        response = await self.client.agenerate(prompt, json_output, stream)
+        if not stream:
+            self._record(prompt, json_output, response.text, getattr(response, "usage_metadata", None))
+            return response
+        return self._arecorded_stream(prompt, json_output, response)
+
+    async def _arecorded_stream(self, prompt: str, json_output: bool, response: Any) -> AsyncIterator[Any]:
+        parts, usage = [], None
+        async for chunk in response:
+            parts.append(_chunk_text(chunk))
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            yield chunk
+        self._record(prompt, json_output, "".join(parts), usage)
+
+    def warm_up(self) -> None:
+        self.client.warm_up()
@@ -0,0 +1,260 @@
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+from document_models import PreparedExport
+
+TUM_BLUE = (0, 101, 189)  # TUM Corporate Blue
+GREY = (128, 128, 128)
+BLACK = (0, 0, 0)
+
+# (regular, bold, italic) font files tried in order; the first regular face found wins.
+# TUM_ADMIN_PDF_FONT or a font in assets/fonts/ takes precedence over system fonts.
+FONT_CANDIDATES = [
+    ("assets/fonts/TUMSans-Regular.ttf", "assets/fonts/TUMSans-Bold.ttf", "assets/fonts/TUMSans-Italic.ttf"),
+    ("assets/fonts/DejaVuSans.ttf", "assets/fonts/DejaVuSans-Bold.ttf", "assets/fonts/DejaVuSans-Oblique.ttf"),
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+     "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+     "/usr/share/fonts/truetype/dejavu/DejaVuSans-Oblique.ttf"),
+    ("/usr/share/fonts/dejavu/DejaVuSans.ttf",
+     "/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf",
+     "/usr/share/fonts/dejavu/DejaVuSans-Oblique.ttf"),
+    ("/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+     "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+     "/usr/share/fonts/truetype/liberation/LiberationSans-Italic.ttf"),
+    ("/Library/Fonts/Arial.ttf", "/Library/Fonts/Arial Bold.ttf", "/Library/Fonts/Arial Italic.ttf"),
+    ("C:/Windows/Fonts/arial.ttf", "C:/Windows/Fonts/arialbd.ttf", "C:/Windows/Fonts/ariali.ttf"),
+]
+
+# Characters kept in the per-process font subset: Latin incl. Extended-A/B, Greek, punctuation,
+# currency, letterlike symbols and arrows. Documents using anything else embed the full face.
+FAST_UNICODE_RANGES = [
+    (0x20, 0x7E), (0xA0, 0x24F), (0x370, 0x3FF), (0x2000, 0x206F),
+    (0x20A0, 0x20CF), (0x2100, 0x214F), (0x2190, 0x21FF),
+]
+_FAST_CODEPOINTS = frozenset(code for start, end in FAST_UNICODE_RANGES for code in range(start, end + 1))
+
+# Typographic characters the latin-1 core fonts lack, folded to close equivalents
+_LATIN1_FOLD = str.maketrans({
+    "\u2013": "-", "\u2014": "-", "\u2018": "'", "\u2019": "'", "\u201a": ",",
+    "\u201c": '"', "\u201d": '"', "\u201e": '"', "\u2022": "\u00b7", "\u2026": "...",
+    "\u20ac": "EUR", "\u00a0": " ", "\u2009": " ", "\u202f": " ",
+})
+
+
+def _resolve_fonts(base_dir: Path) -> Optional[Tuple[str, str, str]]:
+    """Font files for the regular, bold and italic styles; a missing style reuses the regular face"""
+    configured = os.getenv("TUM_ADMIN_PDF_FONT")
+    candidates = []
+    if configured:
+        stem, suffix = os.path.splitext(configured)
+        candidates.append((configured, f"{stem}-Bold{suffix}", f"{stem}-Italic{suffix}"))
+    candidates.extend(FONT_CANDIDATES)
+    for regular, bold, italic in candidates:
+        paths = [Path(p) if Path(p).is_absolute() else base_dir / p for p in (regular, bold, italic)]
+        if paths[0].is_file():
+            return tuple(str(p if p.is_file() else paths[0]) for p in paths)
+    if configured:
+        logging.warning(f"PDF font {configured} not found, falling back to built-in Helvetica")
+    return None
+
+
+def _subset_font(source: str, cache_dir: Path) -> str:
+    """Path of a copy of source reduced to FAST_UNICODE_RANGES, written once and reused"""
+    from fontTools import subset, ttLib
+
+    stat = os.stat(source)
+    digest = hashlib.sha1(f"{source}|{stat.st_size}|{stat.st_mtime_ns}|{FAST_UNICODE_RANGES}".encode("utf-8"))
+    target = cache_dir / f"{Path(source).stem}-{digest.hexdigest()[:12]}.ttf"
+    if target.is_file():
+        return str(target)
+
+    options = subset.Options()
+    options.notdef_outline = True
+    options.recommended_glyphs = True
+    options.name_IDs = ["*"]
+    options.drop_tables += ["FFTM"]
+    font = ttLib.TTFont(source, recalcTimestamp=False)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=_FAST_CODEPOINTS)
+    subsetter.subset(font)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    partial = target.with_suffix(f".{os.getpid()}.tmp")
+    font.save(str(partial))
+    os.replace(partial, target)
+    return str(target)
+
+
+class PDFLayout:
+    """Fonts, colours and page geometry for TUM PDF exports, resolved once per process.
+
+    With a TrueType font available text is embedded as Unicode; otherwise the
+    built-in Helvetica is used and text is folded to latin-1, which still covers
+    German umlauts and ß. Parsing and subsetting a full Unicode face dominates
+    the cost of a small PDF, so each face is reduced once to the European
+    repertoire and documents within it embed from that copy. Word widths are
+    cached across documents, so wrapping does not re-measure known words.
+    """
+
+    def __init__(
+        self,
+        font_files: Optional[Tuple[str, str, str]] = None,
+        base_dir: Optional[Path] = None,
+        font_cache_dir: Optional[Path] = None,
+    ):
+        self.font_files = font_files or _resolve_fonts(base_dir or Path(__file__).resolve().parent)
+        self.unicode = self.font_files is not None
+        self.family = "TUMSans" if self.unicode else "Helvetica"
+        self.margin = 10
+        self.line_height = 6
+        self.paragraph_gap = 2
+        self.font_cache_dir = font_cache_dir or Path(tempfile.gettempdir()) / "tum_admin_pdf_fonts"
+        self._fast_font_files: Optional[Tuple[str, str, str]] = None
+        self._word_widths: Dict[Tuple[str, float], Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _fast_fonts(self) -> Tuple[str, str, str]:
+        if self._fast_font_files is None:
+            with self._lock:
+                if self._fast_font_files is None:
+                    try:
+                        subsets = {path: _subset_font(path, self.font_cache_dir) for path in set(self.font_files)}
+                        self._fast_font_files = tuple(subsets[path] for path in self.font_files)
+                    except Exception as e:
+                        logging.warning(f"PDF font subsetting failed, embedding full fonts: {str(e)}")
+                        self._fast_font_files = self.font_files
+        return self._fast_font_files
+
+    @staticmethod
+    def covers(text: str) -> bool:
+        """Whether every printable character of text is in the prepared font subset"""
+        return all(ord(char) < 0x20 or ord(char) in _FAST_CODEPOINTS for char in set(text))
+
+    def new_document(self, text: str = ""):
+        """A blank FPDF with margins and fonts set up for a document containing text"""
+        from fpdf import FPDF
+        pdf = FPDF()
+        pdf.set_margins(self.margin, self.margin, self.margin)
+        pdf.set_auto_page_break(True, margin=2 * self.margin)
+        if self.unicode:
+            regular, bold, italic = self._fast_fonts() if self.covers(text) else self.font_files
+            pdf.add_font(self.family, "", regular)
+            pdf.add_font(self.family, "B", bold)
+            pdf.add_font(self.family, "I", italic)
+        return pdf
+
+    def text(self, value: str) -> str:
+        """Text as the selected font can encode it"""
+        if self.unicode:
+            return value
+        return value.translate(_LATIN1_FOLD).encode("latin-1", "replace").decode("latin-1")
+
+    def _width(self, pdf, style: str, size: float, word: str) -> float:
+        key = (style, size)
+        widths = self._word_widths.get(key)
+        if widths is None:
+            with self._lock:
+                widths = self._word_widths.setdefault(key, {})
+        width = widths.get(word)
+        if width is None:
+            width = pdf.get_string_width(word)
+            if len(widths) < 50000:
+                widths[word] = width
+        return width
+
+    def wrap(self, pdf, line: str, style: str, size: float, max_width: float) -> List[str]:
+        """Greedy word wrap using cached word widths; words wider than a line are split"""
+        words = line.split(" ")
+        space = self._width(pdf, style, size, " ")
+        lines = []
+        current: List[str] = []
+        current_width = 0.0
+        for word in words:
+            width = self._width(pdf, style, size, word)
+            if width > max_width:
+                if current:
+                    lines.append(" ".join(current))
+                    current, current_width = [], 0.0
+                piece = ""
+                for char in word:
+                    if piece and pdf.get_string_width(piece + char) > max_width:
+                        lines.append(piece)
+                        piece = ""
+                    piece += char
+                current, current_width = [piece], pdf.get_string_width(piece)
+                continue
+            needed = width if not current else current_width + space + width
+            if current and needed > max_width:
+                lines.append(" ".join(current))
+                current, current_width = [word], width
+            else:
+                current.append(word)
+                current_width = needed
+        lines.append(" ".join(current))
+        return lines
+
+
+class PDFRenderer:
+    """Renders TUM documents onto a shared PDFLayout"""
+
+    def __init__(self, layout: Optional[PDFLayout] = None):
+        self.layout = layout or get_pdf_layout()
+
+    def _build(self, prepared: PreparedExport):
+        layout = self.layout
+        pdf = layout.new_document(prepared.title + prepared.tone_line + prepared.content)
+        pdf.add_page()
+
+        # Header
+        pdf.set_font(layout.family, "B", 16)
+        pdf.set_text_color(*TUM_BLUE)
+        pdf.cell(0, 10, layout.text(prepared.title), align="C", new_x="LMARGIN", new_y="NEXT")
+
+        # Metadata
+        pdf.set_font(layout.family, "I", 10)
+        pdf.set_text_color(*GREY)
+        pdf.cell(0, 10, f"Generated on: {prepared.generated_on}", new_x="LMARGIN", new_y="NEXT")
+        pdf.cell(0, 10, layout.text(prepared.tone_line), new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(5)
+
+        # Content
+        size = 12
+        pdf.set_font(layout.family, "", size)
+        pdf.set_text_color(*BLACK)
+        max_width = pdf.epw - 2 * pdf.c_margin
+        for line in prepared.lines:
+            for wrapped in layout.wrap(pdf, layout.text(line), "", size, max_width):
+                pdf.cell(0, layout.line_height, wrapped, new_x="LMARGIN", new_y="NEXT")
+            pdf.ln(layout.paragraph_gap)
+        return pdf
+
+    def render_prepared(self, prepared: PreparedExport, sink: BinaryIO) -> None:
+        self._build(prepared).output(sink)
+
+    def render(self, content: str, metadata: Dict[str, str], sink: BinaryIO) -> None:
+        """Write the finished PDF to a binary file-like sink"""
+        self.render_prepared(PreparedExport.from_content(content, metadata), sink)
+
+    def render_bytes(self, content: str, metadata: Dict[str, str]) -> bytes:
+        return self.prepared_bytes(PreparedExport.from_content(content, metadata))
+
+    def prepared_bytes(self, prepared: PreparedExport) -> bytes:
+        return bytes(self._build(prepared).output())
+
+
+_pdf_layout: Optional[PDFLayout] = None
+_pdf_layout_lock = threading.Lock()
+
+
+def get_pdf_layout() -> PDFLayout:
+    """Process-wide PDFLayout; fonts are resolved on first use"""
+    global _pdf_layout
+    if _pdf_layout is None:
+        with _pdf_layout_lock:
+            if _pdf_layout is None:
+                _pdf_layout = PDFLayout()
+    return _pdf_layout
@@ -0,0 +1,165 @@
+from collections import OrderedDict
+from string import Formatter
+from typing import Callable, Dict, Iterable, Mapping, Optional, Tuple
+import threading
+
+from document_models import DocumentType, ToneType
+
+
+class CompiledPrompt:
+    """A prompt template with its static fields substituted once.
+
+    The template is split into literal segments and per-request slots, so
+    rendering is a single join instead of a ``str.format`` over the whole
+    multi-kilobyte template. Rendering produces exactly what
+    ``template.format(**static_fields, **request_fields)`` would.
+    """
+
+    def __init__(self, template: str, static_fields: Mapping[str, str]):
+        segments = []
+        pending = []
+        for literal, field_name, format_spec, conversion in Formatter().parse(template):
+            pending.append(literal)
+            if field_name is None:
+                continue
+            if format_spec or conversion:
+                raise ValueError(f"Unsupported format spec in prompt field '{field_name}'")
+            if field_name in static_fields:
+                pending.append(static_fields[field_name])
+            else:
+                segments.append(("".join(pending), field_name))
+                pending = []
+        self.segments: Tuple[Tuple[str, str], ...] = tuple(segments)
+        self.tail = "".join(pending)
+        self.fields = tuple(dict.fromkeys(name for _, name in self.segments))
+
+    @property
+    def prefix(self) -> str:
+        """Static text before the first per-request field"""
+        return self.segments[0][0] if self.segments else self.tail
+
+    @property
+    def prefix_size(self) -> int:
+        return len(self.prefix.encode("utf-8"))
+
+    @property
+    def static_size(self) -> int:
+        """Bytes of static text across the whole prompt"""
+        return sum(len(literal.encode("utf-8")) for literal, _ in self.segments) + len(self.tail.encode("utf-8"))
+
+    def render(self, **fields: str) -> str:
+        """Fill the per-request fields; extra keyword arguments are ignored like str.format"""
+        parts = []
+        for literal, name in self.segments:
+            parts.append(literal)
+            parts.append(fields[name])
+        parts.append(self.tail)
+        return "".join(parts)
+
+    def render_suffix(self, **fields: str) -> str:
+        """Render everything after the static prefix"""
+        if not self.segments:
+            return ""
+        parts = []
+        for index, (literal, name) in enumerate(self.segments):
+            if index:
+                parts.append(literal)
+            parts.append(fields[name])
+        parts.append(self.tail)
+        return "".join(parts)
+
+
+class PromptCache:
+    """Compiles the fixed part of each generation and refinement prompt once per
+    (DocumentType, ToneType, language) combination."""
+
+    def __init__(
+        self,
+        templates: Mapping[DocumentType, str],
+        refinement_template: str,
+        security_instructions: str,
+        tone_instructions: Callable[[ToneType], str],
+        max_entries: int = 256,
+        patch_refinement_template: Optional[str] = None,
+    ):
+        self.templates = templates
+        self.refinement_template = refinement_template
+        self.patch_refinement_template = patch_refinement_template
+        self.security_instructions = security_instructions
+        self.tone_instructions = tone_instructions
+        self.max_entries = max_entries
+        self._compiled: "OrderedDict[Tuple[str, ...], CompiledPrompt]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_or_compile(self, key: Tuple[str, ...], template: str, static_fields: Dict[str, str]) -> CompiledPrompt:
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is not None:
+                self._compiled.move_to_end(key)
+                return compiled
+        compiled = CompiledPrompt(template, static_fields)
+        with self._lock:
+            self._compiled[key] = compiled
+            while len(self._compiled) > self.max_entries:
+                self._compiled.popitem(last=False)
+        return compiled
+
+    def generation_prompt(self, doc_type: DocumentType, tone: ToneType, language: Optional[str]) -> CompiledPrompt:
+        language = language or "English"
+        return self._get_or_compile(
+            ("generate", doc_type.value, tone.value, language),
+            self.templates[doc_type],
+            {
+                "security_instructions": self.security_instructions,
+                "tone": self.tone_instructions(tone),
+                "language": language,
+            },
+        )
+
+    def refinement_prompt(self, doc_type: DocumentType, tone: ToneType) -> CompiledPrompt:
+        return self._get_or_compile(
+            ("refine", doc_type.value, tone.value),
+            self.refinement_template,
+            {
+                "security_instructions": self.security_instructions,
+                "doc_type": doc_type.value,
+                "tone": self.tone_instructions(tone),
+            },
+        )
+
+    def patch_refinement_prompt(self, doc_type: DocumentType, tone: ToneType) -> CompiledPrompt:
+        if self.patch_refinement_template is None:
+            raise ValueError("No patch refinement template configured")
+        return self._get_or_compile(
+            ("patch", doc_type.value, tone.value),
+            self.patch_refinement_template,
+            {
+                "security_instructions": self.security_instructions,
+                "doc_type": doc_type.value,
+                "tone": self.tone_instructions(tone),
+            },
+        )
+
+    def precompile(self, languages: Iterable[str] = ("English", "German")) -> int:
+        """Compile every combination up front; returns the number of compiled prompts"""
+        count = 0
+        for doc_type in DocumentType:
+            for tone in ToneType:
+                for language in languages:
+                    self.generation_prompt(doc_type, tone, language)
+                    count += 1
+                self.refinement_prompt(doc_type, tone)
+                count += 1
+                if self.patch_refinement_template is not None:
+                    self.patch_refinement_prompt(doc_type, tone)
+                    count += 1
+        return count
+
+    def prefix_sizes(self) -> Dict[str, Dict[str, int]]:
+        """Prefix and total static sizes in bytes, keyed by compiled combination"""
+        with self._lock:
+            items = list(self._compiled.items())
+        return {
+            "|".join(key): {"prefix_bytes": compiled.prefix_size, "static_bytes": compiled.static_size}
+            for key, compiled in items
+        }
@@ -0,0 +1,305 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+
+
+class UpstreamUnavailableError(Exception):
+    """Gemini is rate limiting or degraded; the request may succeed later"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    """Raised without calling upstream while the circuit breaker is open"""
+
+
+# HTTP status codes worth retrying: rate limited, server errors, gateway timeouts
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# google.api_core exception class names for the same conditions, matched by name so the
+# module does not need to import google.api_core
+RETRYABLE_ERROR_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "BadGateway", "GatewayTimeout", "DeadlineExceeded", "Aborted",
+}
+
+_RETRY_HINT_PATTERNS = (
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)"),
+    re.compile(r"retry in\s+(\d+(?:\.\d+)?)\s*s", re.IGNORECASE),
+)
+
+
+def status_code_of(error: BaseException) -> Optional[int]:
+    for attr in ("code", "status_code"):
+        value = getattr(error, attr, None)
+        value = value() if callable(value) else value
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    return status_code_of(error) in RETRYABLE_STATUS_CODES
+
+
+def retry_after_hint(error: BaseException) -> Optional[float]:
+    """Seconds the upstream asked us to wait, from an attribute, header, RetryInfo or message"""
+    value = getattr(error, "retry_after", None)
+    if value is not None:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            pass
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers:
+        try:
+            return float(headers.get("retry-after") or headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            pass
+    for detail in getattr(error, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return getattr(delay, "seconds", 0) + getattr(delay, "nanos", 0) / 1e9
+    message = str(error)
+    for pattern in _RETRY_HINT_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class TokenBucket:
+    """Thread-safe token-bucket rate limiter usable from sync and async code"""
+
+    def __init__(self, rate_per_second: float, capacity: Optional[float] = None):
+        if rate_per_second <= 0:
+            raise ValueError("Rate must be positive")
+        self.rate = rate_per_second
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_second)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: float, burst: Optional[float] = None) -> "TokenBucket":
+        return cls(requests_per_minute / 60.0, burst)
+
+    def _reserve(self) -> float:
+        """Take a token, possibly going into debt; returns how long the caller must wait"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self) -> float:
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self) -> float:
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter; upstream retry-after hints take precedence"""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, error: BaseException) -> float:
+        hint = retry_after_hint(error)
+        if hint is not None:
+            return min(hint, self.max_delay) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """Opens after consecutive upstream failures and fails fast until recovery_timeout
+    has passed; then lets a single probe through (half-open) before closing again."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = self.opened_at + self.recovery_timeout - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            raise CircuitOpenError(
+                "Gemini is temporarily unavailable. Please try again in a few seconds.",
+                retry_after=max(remaining, 0.0),
+            )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logging.warning("Circuit breaker opened for Gemini calls")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """End a half-open probe that failed for a reason unrelated to upstream health"""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+class ResilientCaller:
+    """Runs upstream calls through a rate limiter, retry policy and circuit breaker"""
+
+    def __init__(
+        self,
+        rate_limiter: Optional[TokenBucket] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._metrics = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "rejected_by_circuit": 0,
+            "rate_limit_wait_seconds": 0.0,
+            "backoff_seconds": 0.0,
+        }
+
+    def _count(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._metrics[name] += amount
+
+    def _before_attempt(self) -> None:
+        try:
+            self.circuit_breaker.before_call()
+        except CircuitOpenError:
+            self._count("rejected_by_circuit")
+            raise
+
+    def _after_failure(self, error: Exception, attempt: int) -> Optional[float]:
+        """Record a failed attempt; returns the backoff delay, or None to give up"""
+        if not is_retryable(error):
+            self.circuit_breaker.release_probe()
+            self._count("failures")
+            return None
+        self.circuit_breaker.record_failure()
+        if attempt > self.retry_policy.max_retries:
+            self._count("failures")
+            return None
+        self._count("retries")
+        delay = self.retry_policy.delay(attempt, error)
+        self._count("backoff_seconds", delay)
+        return delay
+
+    @staticmethod
+    def _give_up(error: Exception) -> Exception:
+        if is_retryable(error):
+            return UpstreamUnavailableError(
+                f"Gemini is busy or unavailable, please try again shortly ({str(error)})",
+                retry_after=retry_after_hint(error),
+            )
+        return error
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        self._count("calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            self._before_attempt()
+            if self.rate_limiter is not None:
+                self._count("rate_limit_wait_seconds", self.rate_limiter.acquire())
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._after_failure(e, attempt)
+                if delay is None:
+                    given_up = self._give_up(e)
+                    if given_up is e:
+                        raise
+                    raise given_up from e
+                logging.warning(f"Retrying Gemini call in {delay:.1f}s after: {str(e)}")
+                self._sleep(delay)
+                continue
+            self.circuit_breaker.record_success()
+            self._count("successes")
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self._count("calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            self._before_attempt()
+            if self.rate_limiter is not None:
+                self._count("rate_limit_wait_seconds", await self.rate_limiter.aacquire())
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                self.circuit_breaker.release_probe()
+                raise
+            except Exception as e:
+                delay = self._after_failure(e, attempt)
+                if delay is None:
+                    given_up = self._give_up(e)
+                    if given_up is e:
+                        raise
+                    raise given_up from e
+                logging.warning(f"Retrying Gemini call in {delay:.1f}s after: {str(e)}")
+                await asyncio.sleep(delay)
+                continue
+            self.circuit_breaker.record_success()
+            self._count("successes")
+            return result
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics["circuit_state"] = self.circuit_breaker.state
+        metrics["consecutive_failures"] = self.circuit_breaker.consecutive_failures
+        return metrics
@@ -0,0 +1,277 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from document_models import DocumentRequest
+
+
+class CacheBackend(ABC):
+    """Storage for cached responses. Values are JSON-serializable dicts."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Tuple[Dict, float]]:
+        """Return (value, stored_at) and mark the entry as recently used, or None"""
+
+    @abstractmethod
+    def set(self, key: str, value: Dict, stored_at: float) -> None:
+        """Store a value, evicting least recently used entries beyond the size bound"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU backend"""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Dict, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Dict, stored_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """On-disk backend in a single SQLite file, shared safely between processes on one host"""
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_response_cache_accessed ON response_cache (accessed_at)"
+            )
+
+    def get(self, key: str) -> Optional[Tuple[Dict, float]]:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE response_cache SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Dict, stored_at: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), stored_at, time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM response_cache WHERE key IN ("
+                "SELECT key FROM response_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM response_cache")
+
+
+class DirectoryCacheBackend(CacheBackend):
+    """One JSON file per entry in a shared directory (e.g. a network volume used by several
+    replicas). Writes are atomic renames; file mtimes track recency for LRU eviction.
+
+    Eviction scans the whole directory, so it runs every ``evict_every`` writes rather than
+    on each one; in between, the directory may hold up to that many entries over the bound."""
+
+    def __init__(self, directory: str, max_entries: int = 10000, evict_every: int = 100):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.evict_every = max(1, min(evict_every, max_entries))
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Tuple[Dict, float]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path, None)
+        except (OSError, ValueError):
+            return None
+        return entry["value"], entry["stored_at"]
+
+    def set(self, key: str, value: Dict, stored_at: float) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"value": value, "stored_at": stored_at}, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._writes += 1
+            due = self._writes >= self.evict_every
+            if due:
+                self._writes = 0
+        if due:
+            self._evict()
+
+    def _evict(self) -> None:
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        except OSError:
+            return
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+
+def _normalize_text(value: Optional[str]) -> str:
+    return " ".join(value.split()) if value else ""
+
+
+class ResponseCache:
+    """Opt-in cache of generated documents keyed on a normalized DocumentRequest"""
+
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl_seconds: int = 24 * 3600):
+        self.backend = backend or MemoryCacheBackend()
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    @staticmethod
+    def normalize_request(request: DocumentRequest) -> Dict[str, str]:
+        """Whitespace-insensitive view of the request fields that affect the output"""
+        return {
+            "prompt": _normalize_text(request.prompt),
+            "doc_type": request.doc_type.value,
+            "tone": request.tone.value,
+            "additional_context": _normalize_text(request.additional_context),
+            "sender_name": _normalize_text(request.sender_name),
+            "sender_profession": _normalize_text(request.sender_profession),
+            "language": _normalize_text(request.language) or "English",
+        }
+
+    def make_key(self, request: DocumentRequest, namespace: str = "") -> str:
+        payload = json.dumps(
+            {"namespace": namespace, "request": self.normalize_request(request)}, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, request: DocumentRequest, namespace: str = "") -> Optional[Dict]:
+        key = self.make_key(request, namespace)
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            logging.warning(f"Response cache read failed: {str(e)}")
+            entry = None
+        if entry is not None and time.time() - entry[1] > self.ttl_seconds:
+            self.backend.delete(key)
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry[0]
+
+    def set(self, request: DocumentRequest, value: Dict, namespace: str = "") -> None:
+        try:
+            self.backend.set(self.make_key(request, namespace), value, time.time())
+        except Exception as e:
+            logging.warning(f"Response cache write failed: {str(e)}")
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self.bypasses += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bypasses": self.bypasses}
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+def create_response_cache(spec: str, ttl_seconds: int = 24 * 3600, max_entries: int = 1000) -> Optional[ResponseCache]:
+    """Build a cache from a spec string: "memory", "sqlite:<path>" or "dir:<path>".
+    An empty spec disables caching and returns None."""
+    spec = (spec or "").strip()
+    if not spec:
+        return None
+    kind, _, location = spec.partition(":")
+    if kind == "memory":
+        backend = MemoryCacheBackend(max_entries)
+    elif kind == "sqlite" and location:
+        backend = SQLiteCacheBackend(location, max_entries)
+    elif kind == "dir" and location:
+        backend = DirectoryCacheBackend(location, max_entries)
+    else:
+        raise ValueError(f"Unsupported response cache spec: {spec}")
+    return ResponseCache(backend, ttl_seconds)
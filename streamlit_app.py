@@ -3,16 +3,34 @@ import os
 from datetime import datetime
 from dotenv import load_dotenv
 from document_models import DocumentType, ToneType
-from llm_service import LLMService
-from export_service import DocumentExporter
+from llm_service import llm_options_from_env, warm_up_llm_service
+from export_service import cached_export_many, get_export_cache
+from text_cleaner import clean_response_text
+from chat_fragments import CHAT_CSS, with_fragment
+from document_store import create_document_store
+from job_queue import (
+    ACTIVE_STATUSES, FAILED, QUEUED, SUCCEEDED, create_job_queue, start_worker_processes, start_worker_threads
+)
 import asyncio
+import functools
+import logging
 import time
+import uuid
+import zlib
 
 # Load environment variables for local dev
 load_dotenv()
 GOOGLE_API_KEY = st.secrets.get("GOOGLE_API_KEY", os.getenv("GOOGLE_API_KEY"))
 
 # --- Constants ---
+HISTORY_PAGE_SIZE = 50  # Responses added to the sidebar index per "load more"
+HISTORY_INDEX_HEIGHT = 300  # Pixels; the index scrolls within this window
+HISTORY_SEARCH_LIMIT = 20  # Best-ranked search results listed in the sidebar
+JOB_POLL_SECONDS = 1  # How often running jobs are refreshed on the page
+JOB_LABELS = {
+    "generate": "📝 New document", "variants": "🎭 Variants", "refine": "🔄 Refinement", "export": "📦 Export all"
+}
+LANGUAGES = ["English", "German"]
 SUGGESTED_PROMPTS = {
     "Announcement": [
         "Please write an announcement about a change in lecture schedule for the GenAI course.",
@@ -31,16 +49,61 @@ SUGGESTED_PROMPTS = {
     ]
 }
 
+# --- Shared Services ---
+@st.cache_resource(show_spinner=False)
+def get_document_store():
+    """Persistent document history configured via TUM_ADMIN_DOCUMENT_STORE ("sqlite:<path>", "memory")"""
+    try:
+        return create_document_store(os.getenv("TUM_ADMIN_DOCUMENT_STORE", "sqlite:tum_admin_documents.db"))
+    except Exception as e:
+        logging.warning(f"Document store unavailable, keeping history in memory: {str(e)}")
+        return create_document_store("memory")
+
+@st.cache_resource(show_spinner=False)
+def get_llm_options():
+    """Constructor options for the shared LLMService, read once per process from the TUM_ADMIN_* environment
+    (the response cache is opt-in via TUM_ADMIN_RESPONSE_CACHE: "memory", "sqlite:<path>", "dir:<path>")"""
+    return llm_options_from_env()
+
+@st.cache_resource(show_spinner=False)
+def get_job_queue():
+    """Background job queue configured via TUM_ADMIN_JOB_QUEUE ("sqlite:<path>", "memory")"""
+    try:
+        return create_job_queue(os.getenv("TUM_ADMIN_JOB_QUEUE", "sqlite:tum_admin_jobs.db"))
+    except Exception as e:
+        logging.warning(f"Job queue unavailable, keeping jobs in memory: {str(e)}")
+        return create_job_queue("memory")
+
+@st.cache_resource(show_spinner=False)
+def start_job_workers():
+    """Start TUM_ADMIN_JOB_WORKERS (default 2) background workers once per process; they run in
+    separate processes when the queue and the document store are SQLite files, as threads otherwise"""
+    count = int(os.getenv("TUM_ADMIN_JOB_WORKERS", "2"))
+    if count <= 0:
+        return None
+    queue, store = get_job_queue(), get_document_store()
+    if queue.path != ":memory:" and store.path != ":memory:":
+        return start_worker_processes(f"sqlite:{queue.path}", f"sqlite:{store.path}", count, GOOGLE_API_KEY)
+    options = get_llm_options()
+    return start_worker_threads(queue, store, lambda: warm_up_llm_service(GOOGLE_API_KEY, **options), count)
+
 # --- Session State Initialization ---
+def get_user_id():
+    """Stable id for this browser's history, carried in the ?user= query parameter"""
+    user_id = st.query_params.get("user")
+    if not user_id:
+        user_id = uuid.uuid4().hex
+        st.query_params["user"] = user_id
+    return user_id
+
 def init_session_state():
     defaults = {
         "messages": [],
-        "current_document": None,
-        "document_history": [],
-        "all_responses_history": [],  # Store all responses with proper naming
-        "is_generating": False,
+        "current_document": None,  # Latest stored version of the document being refined
+        "pending_jobs": [],  # Ids of this user's jobs that were running at the last refresh
         "show_preview": False,
-        "preview_doc_idx": None,
+        "preview_doc_id": None,
+        "history_limit": HISTORY_PAGE_SIZE,
         "show_suggestions": True,
         "selected_suggestion": None,
         "last_doc_type": None,
@@ -51,108 +114,218 @@ def init_session_state():
         "refinement_mode": False,
         "current_prompt": "",
         "form_key": 0,
-        "response_counters": {},  # Track response numbers per doc_type + tone combination
         "prompt_just_sent": False,  # Flag to track prompt submission
         "clear_input": False        # Flag to clear input field
     }
     for k, v in defaults.items():
         if k not in st.session_state:
             st.session_state[k] = v
+    
+    # Resume the user's latest conversation from the document store on a new session
+    if "conversation_id" not in st.session_state:
+        store = get_document_store()
+        st.session_state.user_id = get_user_id()
+        conversation_id = store.latest_conversation(st.session_state.user_id)
+        if conversation_id is None:
+            conversation_id = store.start_conversation(st.session_state.user_id)
+        st.session_state.conversation_id = conversation_id
+        reload_conversation()
+        st.session_state.show_suggestions = st.session_state.current_document is None
+
+def reload_conversation():
+    """Load the conversation's messages and latest document from the store, where workers add their replies"""
+    store = get_document_store()
+    conversation_id = st.session_state.conversation_id
+    st.session_state.messages = [with_fragment(message) for message in store.list_messages(conversation_id)]
+    latest = store.list_documents(st.session_state.user_id, conversation_id=conversation_id, limit=1)
+    st.session_state.current_document = latest[0] if latest else None
+
+def start_new_conversation():
+    st.session_state.conversation_id = get_document_store().start_conversation(st.session_state.user_id)
+    st.session_state.messages = []
+    st.session_state.current_document = None
 
 # --- Utility Functions ---
-def open_preview(idx):
+def open_preview(document_id):
     st.session_state.show_preview = True
-    st.session_state.preview_doc_idx = idx
+    st.session_state.preview_doc_id = document_id
 
 def close_preview():
     st.session_state.show_preview = False
-    st.session_state.preview_doc_idx = None
+    st.session_state.preview_doc_id = None
 
-def clean_response_text(text):
-    """Comprehensive cleaning to remove all markdown and formatting issues"""
-    import re
-    
-    # Remove HTML tags
-    text = re.sub(r'<[^>]+>', '', text)
-    
-    # Remove HTML entities
-    text = text.replace('&nbsp;', ' ').replace('&amp;', '&').replace('&lt;', '<').replace('&gt;', '>')
-    
-    # Remove all markdown formatting
-    # Bold and italic
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # **bold**
-    text = re.sub(r'\*(.*?)\*', r'\1', text)      # *italic*
-    text = re.sub(r'__(.*?)__', r'\1', text)      # __bold__
-    text = re.sub(r'_(.*?)_', r'\1', text)        # _italic_
-    
-    # Headers
-    text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
-    
-    # Lists (remove markers but keep content)
-    text = re.sub(r'^\s*[-*+]\s+', '', text, flags=re.MULTILINE)  # Bullet lists
-    text = re.sub(r'^\s*\d+\.\s+', '', text, flags=re.MULTILINE)  # Numbered lists
-    
-    # Remove horizontal rules
-    text = re.sub(r'^-{3,}$', '', text, flags=re.MULTILINE)
-    text = re.sub(r'^\*{3,}$', '', text, flags=re.MULTILINE)
-    
-    # Remove code blocks
-    text = re.sub(r'``````', '', text, flags=re.DOTALL)
-    text = re.sub(r'`([^`]+)`', r'\1', text)  # Inline code
-    
-    # Remove links but keep text
-    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
-    
-    # Remove extra dashes and special characters
-    text = re.sub(r'^-+\s*', '', text, flags=re.MULTILINE)
-    text = re.sub(r'\s*-+$', '', text, flags=re.MULTILINE)
-    
-    # Clean up lines
-    lines = text.split('\n')
-    cleaned_lines = []
-    
-    for line in lines:
-        cleaned_line = line.strip()
-        # Skip empty dashes or formatting lines
-        if cleaned_line and not re.match(r'^[-=*_]+$', cleaned_line):
-            cleaned_lines.append(cleaned_line)
-        elif not cleaned_line:  # Keep empty lines for paragraph breaks
-            cleaned_lines.append('')
-    
-    # Join and clean up
-    result = '\n'.join(cleaned_lines)
-    result = re.sub(r'\n{3,}', '\n\n', result)  # Max 2 consecutive newlines
-    result = result.strip()
-    
-    return result
+def append_message(role, content, document_id=None):
+    """Persist a chat message with its cleaned display form; its HTML fragment is built once here for render_chat()"""
+    message = get_document_store().add_message(
+        st.session_state.conversation_id,
+        role,
+        content,
+        display_content=clean_response_text(content),
+        document_id=document_id
+    )
+    st.session_state.messages.append(with_fragment(message))
 
-def get_response_name(doc_type, tone):
-    """Generate a unique response name following the pattern: doctype_tone_response_number"""
-    key = f"{doc_type}_{tone}"
-    
-    if key not in st.session_state.response_counters:
-        st.session_state.response_counters[key] = 0
-    
-    st.session_state.response_counters[key] += 1
-    return f"{doc_type}_{tone}_response_{st.session_state.response_counters[key]}"
+def export_for_download(content, metadata, format):
+    """Bytes for one sidebar download; the first click renders PDF and DOCX together"""
+    return cached_export_many(content, metadata, ("pdf", "docx"))[format]
 
-def add_to_all_responses_history(doc_type, tone, content, sender_name="", sender_profession=""):
-    """Add response to the complete history with proper naming"""
-    response_name = get_response_name(doc_type, tone)
-    
-    response_entry = {
-        "name": response_name,
-        "type": doc_type,
-        "tone": tone,
-        "content": content,
-        "sender_name": sender_name,
-        "sender_profession": sender_profession,
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def export_stored_document(document_id, format):
+    """Download bytes for a stored document; its content is only loaded once a download is requested"""
+    document = get_document_store().get_document(document_id)
+    metadata = {"doc_type": document['type'], "tone": document['tone'], "timestamp": document['timestamp']}
+    return export_for_download(document['content'], metadata, format)
+
+def submit_job(kind, payload):
+    """Queue a background job for this user and conversation"""
+    job_id = get_job_queue().submit(
+        kind, st.session_state.user_id, payload, conversation_id=st.session_state.conversation_id
+    )
+    st.session_state.pending_jobs.append(job_id)
+    return job_id
+
+def cancel_job(job):
+    """Cancel a queued or running job; a cancelled generation is noted in its conversation"""
+    if get_job_queue().cancel(job["id"]) and job["kind"] != "export":
+        get_document_store().add_message(
+            job["conversation_id"], "assistant", "Generation cancelled.", display_content="Generation cancelled."
+        )
+
+# --- Sidebar UI ---
+def load_more_history():
+    st.session_state.history_limit += HISTORY_PAGE_SIZE
+
+def render_history():
+    """Compact index of the loaded history window or of ranked search results; preview and exports
+    render for the selected entry only.
+    
+    The index is a single dataframe over name, type, tone and timestamp that the browser scrolls
+    virtually, and rows come from the store without their content, so a rerun costs the same
+    whether the user has ten responses or ten thousand.
+    """
+    store = get_document_store()
+    total = store.count_documents(st.session_state.user_id)
+    if not total:
+        st.info("No responses generated yet.")
+        return
+    
+    query = st.text_input(
+        "🔎 Search responses", placeholder="e.g. GenAI lecture change", key="history_search"
+    ).strip()
+    col_type, col_tone = st.columns(2)
+    filter_type = col_type.selectbox("Type", ["All"] + [dt.value for dt in DocumentType], key="history_filter_type")
+    filter_tone = col_tone.selectbox("Tone", ["All"] + [t.value for t in ToneType], key="history_filter_tone")
+    filters = {
+        "doc_type": None if filter_type == "All" else filter_type,
+        "tone": None if filter_tone == "All" else filter_tone,
     }
     
-    st.session_state.all_responses_history.append(response_entry)
+    if query:
+        # Ranked full-text matches; the best HISTORY_SEARCH_LIMIT are listed, without paging
+        history = store.search_documents(st.session_state.user_id, query, limit=HISTORY_SEARCH_LIMIT, **filters)
+        matching = len(history)
+    else:
+        history = store.list_documents(
+            st.session_state.user_id, limit=st.session_state.history_limit, include_content=False, **filters
+        )
+        matching = store.count_documents(st.session_state.user_id, **filters) if any(filters.values()) else total
+    
+    # A new key whenever the listed rows change drops a row selection that would now point elsewhere
+    view = zlib.crc32(repr((query, filter_type, filter_tone, total, len(history))).encode("utf-8"))
+    index = st.dataframe(
+        [
+            {"Name": response['name'], "Type": response['type'], "Tone": response['tone'], "Created": response['timestamp']}
+            for response in history
+        ],
+        hide_index=True,
+        height=HISTORY_INDEX_HEIGHT,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"history_index_{view}"
+    )
+    if query:
+        st.caption(f"Best {matching} match{'es' if matching != 1 else ''}" if matching else "No responses match this search.")
+    else:
+        st.caption(f"Showing {len(history)} of {matching} responses")
+        if len(history) < matching:
+            st.button(
+                f"⬇️ Load {min(HISTORY_PAGE_SIZE, matching - len(history))} more",
+                on_click=load_more_history,
+                key="history_load_more"
+            )
+    
+    rows = index.selection.rows
+    if rows and rows[0] < len(history):
+        response = history[rows[0]]
+        with st.container(border=True):
+            st.markdown(f"**{response['name']}**")
+            st.caption(f"{response['type']} · {response['tone']} · {response['timestamp']}")
+            st.text_area(
+                "Content Preview:",
+                value=response['preview'],
+                height=100,
+                disabled=True,
+                key=f"history_preview_{response['id']}"
+            )
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                if st.button("👁️ View Full", key="history_view_full"):
+                    open_preview(response['id'])
+            
+            # Exports render only when a download is requested, through the shared cache
+            with col2:
+                try:
+                    st.download_button(
+                        label="📑 PDF",
+                        data=functools.partial(export_stored_document, response['id'], "pdf"),
+                        file_name=f"TUM_{response['name']}.pdf",
+                        mime="application/pdf",
+                        key="history_download_pdf"
+                    )
+                except Exception as e:
+                    st.error(f"PDF export error: {str(e)}")
+            
+            with col3:
+                try:
+                    st.download_button(
+                        label="📘 DOCX",
+                        data=functools.partial(export_stored_document, response['id'], "docx"),
+                        file_name=f"TUM_{response['name']}.docx",
+                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                        key="history_download_docx"
+                    )
+                except Exception as e:
+                    st.error(f"DOCX export error: {str(e)}")
+    else:
+        st.caption("Select a response to preview and export it.")
+    
+    st.markdown("---")
+    export_formats = st.multiselect(
+        "Export all as", options=["pdf", "docx", "txt"], default=["pdf"], key="export_all_formats"
+    )
+    # The zip is built by a background worker; its progress shows with the other running jobs
+    queue = get_job_queue()
+    exports = queue.list_jobs(st.session_state.user_id, kind="export", limit=1)
+    last_export = exports[0] if exports else None
+    exporting = last_export is not None and last_export['status'] in ACTIVE_STATUSES
+    if export_formats and st.button(f"📦 Export all ({total})", disabled=exporting, key="export_all"):
+        submit_job("export", {"formats": list(export_formats)})
+        st.rerun()
+    if last_export is not None and last_export['status'] == SUCCEEDED:
+        finished = datetime.fromtimestamp(last_export['finished_at'])
+        st.download_button(
+            label=f"⬇️ Download export ({last_export['result']['files']} files, {finished.strftime('%H:%M')})",
+            data=functools.partial(queue.open_artifact, last_export['id'], "export.zip"),
+            file_name=f"TUM_responses_{finished.strftime('%Y%m%d_%H%M%S')}.zip",
+            mime="application/zip",
+            key="export_all_zip"
+        )
+    elif last_export is not None and last_export['status'] == FAILED:
+        st.error(f"Bulk export error: {last_export['error']}")
+    
+    cache_stats = get_export_cache().stats()
+    st.caption(f"Export cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · {cache_stats['bytes'] // 1024} KB")
 
-# --- Sidebar UI ---
 def render_sidebar():
     with st.sidebar:
         
@@ -192,136 +365,99 @@ def render_sidebar():
         )
         
 
-        language = st.selectbox("Language", options=["English", "German"], index=0)
+        language = st.selectbox("Language", options=LANGUAGES, index=0)
         
         st.markdown("---")
         st.markdown("### 📜 All Responses History")
         
-        if st.session_state.all_responses_history:
-            for idx, response in enumerate(reversed(st.session_state.all_responses_history)):
-                with st.expander(f"📄 {response['name']}", expanded=False):
-                    st.markdown(f"**Type:** {response['type']}")
-                    st.markdown(f"**Tone:** {response['tone']}")
-                    st.markdown(f"**Created:** {response['timestamp']}")
-                    st.markdown("---")
-                    
-                    st.text_area(
-                        "Content Preview:",
-                        value=response['content'][:300] + "..." if len(response['content']) > 300 else response['content'],
-                        height=100,
-                        disabled=True,
-                        key=f"all_preview_text_{idx}"
-                    )
-                    
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        if st.button("👁️ View Full", key=f"all_preview_btn_{idx}"):
-                            st.session_state.show_preview = True
-                            st.session_state.preview_doc_idx = len(st.session_state.all_responses_history) - 1 - idx
-                    
-                    with col2:
-                        try:
-                            exporter = DocumentExporter()
-                            pdf_bytes = exporter.export_to_pdf(response['content'], {"doc_type": response['type'], "tone": response['tone']})
-                            st.download_button(
-                                label="📑 PDF",
-                                data=pdf_bytes,
-                                file_name=f"TUM_{response['name']}.pdf",
-                                mime="application/pdf",
-                                key=f"all_download_pdf_{idx}"
-                            )
-                        except Exception as e:
-                            st.error(f"PDF export error: {str(e)}")
-                    
-                    with col3:
-                        try:
-                            exporter = DocumentExporter()
-                            docx_bytes = exporter.export_to_docx(response['content'], {"doc_type": response['type'], "tone": response['tone']})
-                            st.download_button(
-                                label="📘 DOCX",
-                                data=docx_bytes,
-                                file_name=f"TUM_{response['name']}.docx",
-                                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                                key=f"all_download_docx_{idx}"
-                            )
-                        except Exception as e:
-                            st.error(f"DOCX export error: {str(e)}")
-        else:
-            st.info("No responses generated yet.")
+        render_history()
         
         return doc_type, tone, sender_name, sender_profession, language
 
 # --- Chat UI ---
 def render_chat():
-    if st.session_state.messages:
-        for i, message in enumerate(st.session_state.messages):
-            role = message['role']
-            # Clean the content properly for better alignment and markdown removal
-            content = clean_response_text(message['content'])
-            
-            if role == 'user':
-                # User message - aligned right with human icon
-                st.markdown(f"""
-                <div style="display: flex; justify-content: flex-end; margin: 15px 0; align-items: flex-start;">
-                    <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                                color: white; 
-                                padding: 15px 18px; 
-                                border-radius: 18px 18px 4px 18px; 
-                                max-width: 70%; 
-                                margin-right: 10px;
-                                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-                                font-size: 14px;
-                                line-height: 1.5;
-                                white-space: pre-line;
-                                word-wrap: break-word;">
-                        {content}
-                    </div>
-                    <div style="background: #667eea; 
-                                color: white; 
-                                border-radius: 50%; 
-                                width: 35px; 
-                                height: 35px; 
-                                display: flex; 
-                                align-items: center; 
-                                justify-content: center;
-                                font-size: 16px;
-                                flex-shrink: 0;">
-                        👤
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+    # Each message carries its bubble HTML, built once when it was appended or loaded
+    for message in st.session_state.messages:
+        st.markdown(message.get('html') or with_fragment(message)['html'], unsafe_allow_html=True)
+
+def refresh_pending_jobs():
+    """The user's queued and running jobs; when one finished since the last refresh, the
+    conversation is reloaded to show its reply. Returns the jobs and whether one finished"""
+    seen = set(st.session_state.pending_jobs)
+    active = get_job_queue().list_jobs(st.session_state.user_id, statuses=ACTIVE_STATUSES)
+    st.session_state.pending_jobs = [job['id'] for job in active]
+    finished = bool(seen - set(st.session_state.pending_jobs))
+    if finished:
+        reload_conversation()
+    return active, finished
+
+def render_job(job):
+    """One running job: its latest status, the text streamed so far and a cancel button"""
+    events = get_job_queue().events(job['id'])
+    status = next((event['status'] for event in reversed(events) if "status" in event), None)
+    if job['status'] == QUEUED or status is None:
+        status = "Waiting for a free worker..."
+    variants = next((event['variants'] for event in events if "variants" in event), [])
+    with st.container(border=True):
+        col_status, col_cancel = st.columns([5, 1])
+        col_status.caption(f"{JOB_LABELS[job['kind']]} · {status}")
+        col_cancel.button("✖️ Cancel", key=f"cancel_job_{job['id']}", on_click=cancel_job, args=(job,))
+        if variants:
+            # One column per tone and language, each streaming its own text
+            for variant, column in zip(variants, st.columns(len(variants))):
+                streamed = "".join(
+                    event.get("delta", "") for event in events if event.get("variant") == variant['variant']
+                )
+                column.markdown(f"**{variant['tone']} · {variant['language']}**")
+                column.text(streamed + " ▌")
+            return
+        streamed = "".join(event.get("delta", "") for event in events)
+        if streamed:
+            st.text(streamed + " ▌")
+        elif job['kind'] == "export":
+            st.progress(job['progress'])
+
+def continue_with(document_id):
+    st.session_state.current_document = get_document_store().get_document(document_id)
+
+def render_variant_comparison():
+    """Side-by-side view of the latest variants generated in this conversation, until the next job"""
+    jobs = get_job_queue().list_jobs(
+        st.session_state.user_id, conversation_id=st.session_state.conversation_id, limit=1
+    )
+    if not jobs or jobs[0]['kind'] != "variants" or jobs[0]['status'] != SUCCEEDED:
+        return
+    store = get_document_store()
+    variants = jobs[0]['result']['variants']
+    st.markdown("**🎭 Compare variants**")
+    for variant, column in zip(variants, st.columns(len(variants))):
+        with column:
+            st.markdown(f"**{variant['tone']} · {variant['language']}**")
+            if "error" in variant:
+                st.error(variant['error'])
+                continue
+            document = store.get_document(variant['document_id'])
+            st.text(document['content'])
+            current = st.session_state.current_document
+            if current is not None and current['id'] == document['id']:
+                st.caption("✅ Refinements continue from this version")
             else:
-                # Assistant message - aligned left with robot icon
-                st.markdown(f"""
-                <div style="display: flex; justify-content: flex-start; margin: 15px 0; align-items: flex-start;">
-                    <div style="background: #28a745; 
-                                color: white; 
-                                border-radius: 50%; 
-                                width: 35px; 
-                                height: 35px; 
-                                display: flex; 
-                                align-items: center; 
-                                justify-content: center;
-                                font-size: 16px;
-                                flex-shrink: 0;
-                                margin-right: 10px;">
-                        <img src="assets/robot-icon.svg" width="24" />
-                    </div>
-                    <div style="background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%); 
-                                color: #333; 
-                                padding: 15px 18px; 
-                                border-radius: 18px 18px 18px 4px; 
-                                max-width: 70%; 
-                                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-                                font-size: 14px;
-                                line-height: 1.5;
-                                border: 1px solid #dee2e6;
-                                white-space: pre-line;
-                                word-wrap: break-word;">
-                        {content}
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+                st.button(
+                    "Continue with this", key=f"continue_with_{document['id']}",
+                    on_click=continue_with, args=(document['id'],)
+                )
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_jobs():
+    """Progress of the user's running jobs, refreshed in place without rerunning the page; once a
+    job finishes the whole page reruns to show its reply and the updated history"""
+    active, finished = refresh_pending_jobs()
+    if finished:
+        st.rerun()
+    for job in active:
+        # Replies to other conversations (e.g. before "Clear Chat") land there; exports show everywhere
+        if job['kind'] == "export" or job['conversation_id'] == st.session_state.conversation_id:
+            render_job(job)
 
 # --- Input UI ---
 def render_input(doc_type, sender_name="", sender_profession=""):
@@ -340,7 +476,7 @@ def render_input(doc_type, sender_name="", sender_profession=""):
     
     # Show suggested prompts only for new documents
     suggested = SUGGESTED_PROMPTS.get(doc_type, [])
-    if st.session_state.show_suggestions and suggested and not st.session_state.document_history:
+    if st.session_state.show_suggestions and suggested and st.session_state.current_document is None:
         st.markdown("**💡 Suggested prompts:**")
         cols = st.columns(len(suggested))
         for i, suggestion in enumerate(suggested):
@@ -357,9 +493,7 @@ def render_input(doc_type, sender_name="", sender_profession=""):
     col_clear, col_spacer = st.columns([1, 4])
     with col_clear:
         if st.button("🗑️ Clear Chat", key="clear_chat"):
-            st.session_state.messages = []
-            st.session_state.document_history = []
-            st.session_state.current_document = None
+            start_new_conversation()
             st.session_state.show_suggestions = True
             st.session_state.current_prompt = ""
             st.session_state.form_key += 1
@@ -367,7 +501,7 @@ def render_input(doc_type, sender_name="", sender_profession=""):
     
     # Input form with dynamic key to handle suggestions properly
     with st.form(key=f"message_form_{st.session_state.form_key}"):
-        if st.session_state.document_history:
+        if st.session_state.current_document is not None:
             placeholder_text = "Enter your refinement request (e.g., 'change course name to C++', 'make it more formal', etc.)"
         else:
             placeholder_text = "Enter your prompt to generate a new document..."
@@ -383,6 +517,33 @@ def render_input(doc_type, sender_name="", sender_profession=""):
             key=f"prompt_input_{st.session_state.form_key}"  # Add unique key
         )
         
+        # Only offered for new documents when the response cache is enabled
+        force_fresh = False
+        if get_llm_options()["response_cache"] is not None and st.session_state.current_document is None:
+            force_fresh = st.checkbox(
+                "🔁 Force fresh generation",
+                value=False,
+                help="Skip the response cache and always ask the model",
+                key=f"force_fresh_{st.session_state.form_key}"
+            )
+        
+        # Several tones or languages generate side-by-side variants of a new document in one job
+        compare_tones, compare_languages = [], []
+        if st.session_state.current_document is None:
+            col_tones, col_languages = st.columns(2)
+            compare_tones = col_tones.multiselect(
+                "🎭 Compare tones",
+                options=[t.value for t in ToneType],
+                help="Generate the document in each selected tone at once, instead of the sidebar tone",
+                key=f"compare_tones_{st.session_state.form_key}"
+            )
+            compare_languages = col_languages.multiselect(
+                "🌐 Compare languages",
+                options=LANGUAGES,
+                help="Generate the document in each selected language at once, instead of the sidebar language",
+                key=f"compare_languages_{st.session_state.form_key}"
+            )
+        
         # Dynamic button state with helpful messaging
         if not fields_valid:
             st.warning("💡 Complete the required fields in the sidebar to enable document generation.")
@@ -390,21 +551,22 @@ def render_input(doc_type, sender_name="", sender_profession=""):
         else:
             button_label = "Send ✉️"
         
+        # Jobs run in the background, so the next prompt can be sent while earlier ones are generating
         send_clicked = st.form_submit_button(
             button_label,
-            disabled=st.session_state.is_generating or not fields_valid,
+            disabled=not fields_valid,
             use_container_width=True
         )
         
-        if st.session_state.is_generating:
-            st.info("🔄 Generating response...")
+        if st.session_state.pending_jobs:
+            st.info(f"🔄 {len(st.session_state.pending_jobs)} job(s) running in the background...")
     
     # Set flag when prompt is sent and clear current_prompt
     if send_clicked:
         st.session_state.prompt_just_sent = True
         st.session_state.current_prompt = ""
     
-    return send_clicked, prompt
+    return send_clicked, prompt, force_fresh, compare_tones, compare_languages
 
 # --- Main App Logic ---
 def main():
@@ -457,11 +619,18 @@ def main():
     }
     </style>
     """, unsafe_allow_html=True)
-    
+
+    # Chat bubble styles, shared by every message fragment
+    st.markdown(f"<style>{CHAT_CSS}</style>", unsafe_allow_html=True)
+
     st.title("📄 TUM Admin Document Generator")
     
+    # Background workers generate and export; they warm their own LLM clients
+    start_job_workers()
+    
     # Initialize session state
     init_session_state()
+    refresh_pending_jobs()
     
     # Render sidebar and get settings
     doc_type, tone, sender_name, sender_profession, language = render_sidebar()
@@ -478,12 +647,20 @@ def main():
         # Chat interface with custom container
         st.markdown('<div class="chat-container">', unsafe_allow_html=True)
         render_chat()
+        # Jobs in progress stream here; polling stops once none are left
+        if st.session_state.pending_jobs:
+            render_jobs()
         st.markdown('</div>', unsafe_allow_html=True)
         
+        # Variants of the last prompt, side by side, to pick the one to refine
+        render_variant_comparison()
+        
         # Input interface
-        send_clicked, prompt = render_input(doc_type, sender_name, sender_profession)
+        send_clicked, prompt, force_fresh, compare_tones, compare_languages = render_input(
+            doc_type, sender_name, sender_profession
+        )
         
-        # Process message - ENHANCED MARKDOWN CLEANING FOR REFINEMENT
+        # Queue the message; a background worker answers it and render_jobs() picks up the reply
         if send_clicked and prompt.strip():
             # Double-check validation (safety net)
             if not sender_name.strip() or not sender_profession.strip():
@@ -493,143 +670,51 @@ def main():
             st.session_state.message_counter += 1
             
             # Add user message
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            st.session_state.is_generating = True
+            append_message("user", prompt)
             st.session_state.show_suggestions = False
             
-            # Generate response
-            try:
-                with st.spinner("🤖 Generating response..."):
-                    llm = LLMService()
-                    
-                    if st.session_state.document_history:
-                        # REFINEMENT MODE
-                        last_doc = st.session_state.document_history[-1]
-                        
-                        st.info(f"🔄 Refining document: {last_doc.get('type', 'Unknown')}")
-                        
-                        # Call refinement with correct parameters
-                        result = llm.refine_document(
-                            current_document=last_doc["content"],
-                            refinement_prompt=prompt,
-                            doc_type=DocumentType(last_doc.get("type", doc_type)),
-                            tone=ToneType(last_doc.get("tone", tone)),
-                            history=[]
-                        )
-                        
-                        # Handle different response types from LLM
-                        if isinstance(result, dict):
-                            if "document" in result:
-                                refined_content = result["document"]
-                            elif "content" in result:
-                                refined_content = result["content"]
-                            else:
-                                refined_content = str(result)
-                        elif isinstance(result, str):
-                            refined_content = result
-                        elif hasattr(result, '__iter__'):
-                            # Handle streaming response
-                            refined_content = ""
-                            for chunk in result:
-                                if isinstance(chunk, dict):
-                                    refined_content += chunk.get("document", chunk.get("content", str(chunk)))
-                                else:
-                                    refined_content += str(chunk)
-                        else:
-                            refined_content = str(result)
-                        
-                        # Enhanced cleaning with markdown removal
-                        final_content = clean_response_text(refined_content)
-                        
-                        # Update the existing document instead of creating a new one
-                        st.session_state.document_history[-1]["content"] = final_content
-                        st.session_state.document_history[-1]["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        
-                        # Add to complete history (this creates a new entry for refinement)
-                        add_to_all_responses_history(
-                            last_doc.get("type", doc_type), 
-                            last_doc.get("tone", tone), 
-                            final_content, 
-                            sender_name, 
-                            sender_profession
-                        )
-                        
-                        # Update current document
-                        st.session_state.current_document = final_content
-                        
-                        # Add assistant response
-                        st.session_state.messages.append({"role": "assistant", "content": final_content})
-                        
-                        st.success("✅ Document refined successfully!")
-                        
-                        # Force form reset for next input
-                        st.session_state.form_key += 1
-                        st.session_state.current_prompt = ""
-                        st.session_state.clear_input = True
-                        
-                    else:
-                        # NEW DOCUMENT GENERATION
-                        st.info("📝 Generating new document...")
-                        
-                        result = llm.generate_document(
-                            doc_type=DocumentType(doc_type),
-                            tone=ToneType(tone),
-                            prompt=prompt,
-                            sender_name=sender_name,
-                            sender_profession=sender_profession,
-                            language=language
-                        )
-                        
-                        # Handle response
-                        if isinstance(result, dict) and "document" in result:
-                            full_response = result["document"]
-                        else:
-                            full_response = str(result)
-                        
-                        # Enhanced cleaning with markdown removal
-                        final_content = clean_response_text(full_response)
-                        
-                        # Add new document to history
-                        st.session_state.document_history.append({
-                            "type": doc_type,
-                            "tone": tone,
-                            "content": final_content,
-                            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        })
-                        
-                        # Add to complete history
-                        add_to_all_responses_history(doc_type, tone, final_content, sender_name, sender_profession)
-                        
-                        # Update current document
-                        st.session_state.current_document = final_content
-                        
-                        # Add assistant response
-                        st.session_state.messages.append({"role": "assistant", "content": final_content})
-                        
-                        st.success("✅ New document generated successfully!")
-                        
-                        # Force form reset for next input
-                        st.session_state.form_key += 1
-                        st.session_state.current_prompt = ""
-                        st.session_state.clear_input = True
-                    
-            except Exception as e:
-                st.error(f"❌ Error: {str(e)}")
-                st.session_state.messages.append({
-                    "role": "assistant", 
-                    "content": f"Sorry, I encountered an error: {str(e)}"
+            if st.session_state.current_document is not None:
+                # REFINEMENT MODE: the worker refines the latest stored version into the next one
+                submit_job("refine", {
+                    "document_id": st.session_state.current_document["id"],
+                    "refinement_prompt": prompt,
+                    "sender_name": sender_name,
+                    "sender_profession": sender_profession,
+                })
+            elif len(compare_tones or [tone]) * len(compare_languages or [language]) > 1:
+                # VARIANTS: every selected tone and language generated at once, streamed side by side
+                submit_job("variants", {
+                    "doc_type": doc_type,
+                    "tones": compare_tones or [tone],
+                    "languages": compare_languages or [language],
+                    "prompt": prompt,
+                    "sender_name": sender_name,
+                    "sender_profession": sender_profession,
+                    "force_fresh": force_fresh,
+                })
+            else:
+                # NEW DOCUMENT GENERATION, streamed into the job's progress
+                submit_job("generate", {
+                    "doc_type": doc_type,
+                    "tone": compare_tones[0] if compare_tones else tone,
+                    "prompt": prompt,
+                    "sender_name": sender_name,
+                    "sender_profession": sender_profession,
+                    "language": compare_languages[0] if compare_languages else language,
+                    "force_fresh": force_fresh,
                 })
             
-            finally:
-                st.session_state.is_generating = False
-                st.rerun()
+            # Force form reset for next input
+            st.session_state.form_key += 1
+            st.session_state.current_prompt = ""
+            st.session_state.clear_input = True
+            st.rerun()
     
     with col2:
         # Document preview for all responses history
-        if st.session_state.show_preview and st.session_state.preview_doc_idx is not None:
-            if st.session_state.preview_doc_idx < len(st.session_state.all_responses_history):
-                response = st.session_state.all_responses_history[st.session_state.preview_doc_idx]
-                
+        if st.session_state.show_preview and st.session_state.preview_doc_id is not None:
+            response = get_document_store().get_document(st.session_state.preview_doc_id)
+            if response is not None:
                 st.markdown("### 📖 Response Preview")
                 st.markdown("---")
                 
@@ -637,6 +722,8 @@ def main():
                 st.markdown(f"**Type:** {response['type']}")
                 st.markdown(f"**Tone:** {response['tone']}")
                 st.markdown(f"**Created:** {response['timestamp']}")
+                if response['version'] > 1:
+                    st.markdown(f"**Version:** {response['version']} (refinement)")
                 st.markdown("---")
                 
                 st.markdown("**Content:**")
@@ -0,0 +1,384 @@
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+
+# Every model call is traced: prompt bytes split into the static template text and the
+# per-request fields, prompt and response tokens from Gemini's usage metadata, time to
+# first token, total latency, retries and cache hits. Finished traces update
+# Prometheus-style counters and summaries labelled by operation, document type, tone and
+# language, and are appended to an optional JSONL trace log.
+
+TRACE_LOG_ENV = "TUM_ADMIN_TRACE_LOG"
+METRICS_FILE_ENV = "TUM_ADMIN_METRICS_FILE"
+METRIC_PREFIX = "tum_admin_llm_"
+LABEL_NAMES = ("operation", "doc_type", "tone", "language")
+QUANTILES = (0.5, 0.95, 0.99)
+# Percentiles cover the most recent calls per label set; _sum and _count cover all of them
+DEFAULT_WINDOW = 1024
+
+_COUNTERS = {
+    "requests_total": "Model calls and response cache hits by outcome",
+    "prompt_bytes_total": "Prompt bytes sent, split into static template text and user input",
+    "prompt_tokens_total": "Prompt tokens billed, split into static template text and user input",
+    "response_tokens_total": "Response tokens generated",
+    "retries_total": "Retried attempts after a retryable upstream error",
+    "cache_hits_total": "Requests served from the response cache or a cached prompt prefix",
+}
+_SUMMARIES = {
+    "latency_seconds": "Total model call latency",
+    "time_to_first_token_seconds": "Time until the first response text; equals latency when not streamed",
+    "prompt_tokens": "Prompt tokens per call",
+    "response_tokens": "Response tokens per call",
+}
+
+
+def _label_value(value) -> str:
+    value = getattr(value, "value", value)
+    return str(value) if value else "unknown"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def quantile(sorted_samples: List[float], q: float) -> float:
+    """Nearest-rank quantile of an already sorted, non-empty list"""
+    index = max(0, min(len(sorted_samples) - 1, math.ceil(q * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+class CallTrace:
+    """Measurements for one model call, filled in while the call runs"""
+
+    def __init__(self, operation: str, doc_type, tone, language):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.labels = (operation, _label_value(doc_type), _label_value(tone), _label_value(language))
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.attempts = 0
+        self.static_bytes = 0
+        self.user_bytes = 0
+        self.context_cache_hit = False
+        self.context_cache_fallback = False
+        self.response_cache_hit = False
+        self.prompt_tokens: Optional[int] = None
+        self.cached_tokens: Optional[int] = None
+        self.response_tokens: Optional[int] = None
+        self.ttft: Optional[float] = None
+        self.latency: Optional[float] = None
+        self._consumer_seconds = 0.0
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+    def record_prompt(self, compiled, fields: Dict[str, str], context_cached: bool) -> None:
+        """Count an attempt and the prompt it sends; compiled is the CompiledPrompt being rendered"""
+        self.attempts += 1
+        self.static_bytes = compiled.static_size
+        self.user_bytes = sum(len(fields[name].encode("utf-8")) for _, name in compiled.segments)
+        self.context_cache_hit = context_cached
+
+    def record_usage(self, response) -> None:
+        """Token counts from a response or stream chunk; later chunks carry the running totals"""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        for attribute, count_name in (
+            ("prompt_tokens", "prompt_token_count"),
+            ("cached_tokens", "cached_content_token_count"),
+            ("response_tokens", "candidates_token_count"),
+        ):
+            count = getattr(usage, count_name, None)
+            if count:
+                setattr(self, attribute, int(count))
+
+    def first_token(self) -> None:
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self._started
+
+    def handed_over(self, seconds: float) -> None:
+        """Time a streamed chunk spent with the consumer; it is not part of the call's latency"""
+        self._consumer_seconds += seconds
+
+    def end(self) -> None:
+        """The model has sent its last chunk; whatever happens after is not latency"""
+        if self.latency is None:
+            self.latency = time.perf_counter() - self._started - self._consumer_seconds
+
+    def finish(self) -> None:
+        self.end()
+        if self.ttft is None and self.status == "ok":
+            self.ttft = self.latency
+
+    @property
+    def static_tokens(self) -> Optional[int]:
+        """Prompt tokens of the static text: exact when the prefix was served from the context
+        cache, otherwise apportioned by bytes"""
+        if self.cached_tokens:
+            return self.cached_tokens
+        if self.prompt_tokens is None:
+            return None
+        total_bytes = self.static_bytes + self.user_bytes
+        return round(self.prompt_tokens * self.static_bytes / total_bytes) if total_bytes else 0
+
+    @property
+    def user_tokens(self) -> Optional[int]:
+        static_tokens = self.static_tokens
+        if self.prompt_tokens is None or static_tokens is None:
+            return None
+        return max(0, self.prompt_tokens - static_tokens)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "timestamp": round(self.started_at, 3),
+            **dict(zip(LABEL_NAMES, self.labels)),
+            "status": self.status,
+            "error": self.error,
+            "prompt_bytes": {"static": self.static_bytes, "user": self.user_bytes},
+            "prompt_tokens": {"total": self.prompt_tokens, "static": self.static_tokens, "user": self.user_tokens},
+            "static_tokens_exact": bool(self.cached_tokens),
+            "response_tokens": self.response_tokens,
+            "ttft_ms": round(self.ttft * 1000, 1) if self.ttft is not None else None,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "response_cache_hit": self.response_cache_hit,
+            "context_cache_hit": self.context_cache_hit,
+            "context_cache_fallback": self.context_cache_fallback,
+        }
+
+
+class _Summary:
+    def __init__(self, window: int):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+
+class Telemetry:
+    """Thread-safe recorder of CallTraces with Prometheus text export and a JSONL trace log"""
+
+    def __init__(
+        self,
+        trace_path: Optional[str] = None,
+        metrics_path: Optional[str] = None,
+        window: int = DEFAULT_WINDOW,
+        metrics_interval: float = 10.0
+    ):
+        self.trace_path = trace_path
+        # Rewritten at most every metrics_interval seconds, e.g. for a node_exporter textfile collector
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self.window = window
+        self._counters: Dict[Tuple[str, Tuple[str, ...], Tuple[str, ...]], float] = {}
+        self._summaries: Dict[Tuple[str, Tuple[str, ...]], _Summary] = {}
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._metrics_written = 0.0
+
+    @classmethod
+    def from_env(cls) -> "Telemetry":
+        return cls(trace_path=os.getenv(TRACE_LOG_ENV) or None, metrics_path=os.getenv(METRICS_FILE_ENV) or None)
+
+    @contextmanager
+    def trace(self, operation: str, doc_type, tone, language) -> Iterator[CallTrace]:
+        """Trace the model call made inside the block; errors and cancellations are recorded too"""
+        trace = CallTrace(operation, doc_type, tone, language)
+        try:
+            yield trace
+        except (GeneratorExit, asyncio.CancelledError):
+            trace.status = "cancelled"
+            raise
+        except BaseException as e:
+            trace.status = "error"
+            trace.error = type(e).__name__
+            raise
+        finally:
+            self.record(trace)
+
+    @asynccontextmanager
+    async def atrace(self, operation: str, doc_type, tone, language) -> AsyncIterator[CallTrace]:
+        """trace for coroutines; the trace log and metrics file are written in a worker thread"""
+        trace = CallTrace(operation, doc_type, tone, language)
+        try:
+            yield trace
+        except (GeneratorExit, asyncio.CancelledError):
+            trace.status = "cancelled"
+            raise
+        except BaseException as e:
+            trace.status = "error"
+            trace.error = type(e).__name__
+            raise
+        finally:
+            self._aggregate(trace)
+            if self.trace_path or self.metrics_path:
+                await asyncio.to_thread(self._persist, trace)
+
+    def record_cache_hit(self, operation: str, doc_type, tone, language) -> None:
+        trace = CallTrace(operation, doc_type, tone, language)
+        trace.response_cache_hit = True
+        trace.status = "cache_hit"
+        self.record(trace)
+
+    def _count(self, name: str, labels: Tuple[str, ...], extra: Tuple[str, ...] = (), amount: float = 1) -> None:
+        key = (name, labels, extra)
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def _observe(self, name: str, labels: Tuple[str, ...], value: float) -> None:
+        summary = self._summaries.get((name, labels))
+        if summary is None:
+            summary = self._summaries[(name, labels)] = _Summary(self.window)
+        summary.observe(value)
+
+    def record(self, trace: CallTrace) -> None:
+        self._aggregate(trace)
+        self._persist(trace)
+
+    def _aggregate(self, trace: CallTrace) -> None:
+        """Update the in-memory counters and summaries"""
+        trace.finish()
+        labels = trace.labels
+        with self._lock:
+            self._count("requests_total", labels, (trace.status,))
+            if trace.response_cache_hit:
+                self._count("cache_hits_total", labels, ("response",))
+            if trace.attempts:
+                self._count("prompt_bytes_total", labels, ("static",), trace.static_bytes)
+                self._count("prompt_bytes_total", labels, ("user",), trace.user_bytes)
+                self._count("retries_total", labels, amount=trace.retries)
+                if trace.context_cache_hit:
+                    self._count("cache_hits_total", labels, ("context",))
+            if trace.prompt_tokens is not None:
+                self._count("prompt_tokens_total", labels, ("static",), trace.static_tokens)
+                self._count("prompt_tokens_total", labels, ("user",), trace.user_tokens)
+                self._observe("prompt_tokens", labels, trace.prompt_tokens)
+            if trace.response_tokens is not None:
+                self._count("response_tokens_total", labels, amount=trace.response_tokens)
+                self._observe("response_tokens", labels, trace.response_tokens)
+            # Only completed model calls enter the latency summaries; cache hits and failures
+            # would otherwise pull the percentiles towards zero
+            if trace.status == "ok":
+                self._observe("latency_seconds", labels, trace.latency)
+                self._observe("time_to_first_token_seconds", labels, trace.ttft)
+
+    def _persist(self, trace: CallTrace) -> None:
+        """Append to the trace log and refresh the metrics file; blocking file I/O"""
+        self._write_trace(trace)
+        self._maybe_write_metrics()
+
+    def _write_trace(self, trace: CallTrace) -> None:
+        if not self.trace_path:
+            return
+        line = json.dumps(trace.to_dict(), ensure_ascii=False)
+        try:
+            with self._log_lock, open(self.trace_path, "a", encoding="utf-8") as log:
+                log.write(line + "\n")
+        except OSError as e:
+            logging.warning(f"Could not write trace log: {str(e)}")
+
+    def _maybe_write_metrics(self) -> None:
+        if not self.metrics_path:
+            return
+        now = time.monotonic()
+        with self._log_lock:
+            if now - self._metrics_written < self.metrics_interval:
+                return
+            self._metrics_written = now
+        self.write_prometheus(self.metrics_path)
+
+    def write_prometheus(self, path: str) -> None:
+        """Atomically replace path with the current exposition text"""
+        temporary = f"{path}.tmp"
+        try:
+            with open(temporary, "w", encoding="utf-8") as metrics_file:
+                metrics_file.write(self.render_prometheus())
+            os.replace(temporary, path)
+        except OSError as e:
+            logging.warning(f"Could not write metrics file: {str(e)}")
+
+    def percentiles(self, metric: str = "latency_seconds") -> List[Dict]:
+        """p50/p95/p99 of a summary metric per operation, document type, tone and language"""
+        with self._lock:
+            series = [
+                (labels, sorted(summary.samples), summary.count)
+                for (name, labels), summary in self._summaries.items()
+                if name == metric and summary.samples
+            ]
+        rows = []
+        for labels, samples, count in sorted(series):
+            row = dict(zip(LABEL_NAMES, labels))
+            for q in QUANTILES:
+                row[f"p{int(q * 100)}"] = quantile(samples, q)
+            row["count"] = count
+            rows.append(row)
+        return rows
+
+    def render_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            summaries = sorted(
+                (name, labels, sorted(summary.samples), summary.count, summary.total)
+                for (name, labels), summary in self._summaries.items()
+            )
+        extra_label = {
+            "requests_total": ("status",),
+            "prompt_bytes_total": ("part",),
+            "prompt_tokens_total": ("part",),
+            "cache_hits_total": ("cache",),
+        }
+        lines = []
+        for name, description in _COUNTERS.items():
+            lines.append(f"# HELP {METRIC_PREFIX}{name} {description}")
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} counter")
+            names = LABEL_NAMES + extra_label.get(name, ())
+            for (counter, labels, extra), value in counters:
+                if counter == name:
+                    lines.append(f"{METRIC_PREFIX}{name}{_format_labels(names, labels + extra)} {value:g}")
+        for name, description in _SUMMARIES.items():
+            lines.append(f"# HELP {METRIC_PREFIX}{name} {description}")
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} summary")
+            for summary, labels, samples, count, total in summaries:
+                if summary != name:
+                    continue
+                for q in QUANTILES:
+                    label_text = _format_labels(LABEL_NAMES + ("quantile",), labels + (f"{q:g}",))
+                    lines.append(f"{METRIC_PREFIX}{name}{label_text} {quantile(samples, q):.6g}")
+                label_text = _format_labels(LABEL_NAMES, labels)
+                lines.append(f"{METRIC_PREFIX}{name}_sum{label_text} {total:.6g}")
+                lines.append(f"{METRIC_PREFIX}{name}_count{label_text} {count}")
+        return "\n".join(lines) + "\n"
+
+
+_default_telemetry: Optional[Telemetry] = None
+_default_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """Process-wide Telemetry shared by pooled services, configured from the environment"""
+    global _default_telemetry
+    with _default_lock:
+        if _default_telemetry is None:
+            _default_telemetry = Telemetry.from_env()
+        return _default_telemetry
@@ -0,0 +1,5 @@
+from pathlib import Path
+import sys
+
+# The modules live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,142 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+from api_server import create_app
+from llm_service import LLMService
+from model_client import FakeModelClient
+from resilience import UpstreamUnavailableError
+from telemetry import Telemetry
+
+RECORDINGS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "recorded_responses.jsonl")
+# Contains every span the recorded patches edit, so whichever patch is replayed applies
+DOCUMENT = "Dear Students,\n\nLiebe Studierende,\n\nThe lecture moves to Tuesday.\n\nBest regards,\nThe Dean's Office"
+REFINEMENT = {
+    "current_document": DOCUMENT,
+    "refinement_prompt": "Make the greeting warmer",
+    "doc_type": "Announcement",
+    "tone": "Friendly",
+    "mode": "patch",
+}
+
+
+@pytest.fixture
+def client():
+    service = LLMService(client=FakeModelClient.from_jsonl(RECORDINGS), telemetry=Telemetry())
+    return TestClient(create_app(service))
+
+
+def stream_events(response):
+    return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+
+def test_refinement_endpoints_honour_patch_mode(client):
+    response = client.post("/v1/refinements", json=REFINEMENT)
+    assert response.status_code == 200
+    assert response.json()["metadata"]["refinement_mode"] == "patch"
+
+    response = client.post("/v1/refinements/stream", json=REFINEMENT)
+    assert response.status_code == 200
+    final = stream_events(response)[-1]
+    assert final["is_final"] and final["metadata"]["refinement_mode"] == "patch"
+    assert final["document"] != DOCUMENT and final["document"].endswith("The Dean's Office")
+
+
+@pytest.mark.parametrize("doc_type, filename", [
+    ("Student Communication", "TUM_student_communication.txt"),
+    ("Ankündigung", "TUM_document.txt"),
+    ('x"; filename="evil.exe', "TUM_document.txt"),
+    ("x\r\nSet-Cookie: a=b", "TUM_document.txt"),
+])
+def test_export_filename_only_uses_known_document_types(client, doc_type, filename):
+    response = client.post("/v1/exports", json={
+        "format": "txt", "document_content": "Dear Students,\n\nHello.", "metadata": {"doc_type": doc_type},
+    })
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == f'attachment; filename="{filename}"'
+    assert "set-cookie" not in response.headers
+
+
+GENERATION = {
+    "doc_type": "Announcement", "tone": "Formal", "prompt": "Lecture moved",
+    "sender_name": "A", "sender_profession": "Prof",
+}
+
+
+class UnavailableService:
+    """Stands in for an LLMService whose upstream is rate limited"""
+
+    async def agenerate_document(self, *args, **kwargs):
+        raise UpstreamUnavailableError("Gemini is rate limiting", retry_after=2.4)
+
+    async def agenerate_document_stream(self, *args, **kwargs):
+        raise UpstreamUnavailableError("Gemini is rate limiting")
+        yield
+
+
+def test_health_reports_the_circuit_and_concurrency(client):
+    body = client.get("/healthz").json()
+    assert body["status"] == "ok" and body["circuit"] == "closed" and "concurrency" in body
+    assert TestClient(create_app()).get("/healthz").json() == {"status": "ok"}
+
+
+def test_generate_and_stream_return_the_same_document(client):
+    response = client.post("/v1/documents", json=GENERATION)
+    assert response.status_code == 200
+    document = response.json()["document"]
+    assert document
+
+    response = client.post("/v1/documents/stream", json=GENERATION)
+    assert response.status_code == 200 and response.headers["content-type"] == "application/x-ndjson"
+    events = stream_events(response)
+    assert events[-1]["is_final"] and events[-1]["document"] == document
+    assert all(not event["is_final"] for event in events[:-1])
+
+    metrics = client.get("/metrics").text
+    assert "requests_total" in metrics
+
+
+def test_variants_stream_lists_then_completes_every_variant(client):
+    response = client.post("/v1/documents/variants/stream", json={
+        **{key: value for key, value in GENERATION.items() if key != "tone"},
+        "tones": ["Formal", "Friendly"], "languages": ["English", "German"],
+    })
+    assert response.status_code == 200
+    events = stream_events(response)
+    assert [(tag["tone"], tag["language"]) for tag in events[0]["variants"]] == [
+        ("Formal", "English"), ("Formal", "German"), ("Friendly", "English"), ("Friendly", "German"),
+    ]
+    finals = {event["variant"]: event for event in events if event.get("is_final")}
+    assert sorted(finals) == [0, 1, 2, 3] and all(event["document"] for event in finals.values())
+
+
+def test_invalid_requests_are_rejected(client):
+    assert client.post("/v1/documents", json={**GENERATION, "tone": "Loud"}).status_code == 422
+    assert client.post("/v1/documents/variants/stream", json={**GENERATION, "tones": []}).status_code == 422
+    assert client.post("/v1/exports", json={"format": "odt", "document_content": "x", "metadata": {}}).status_code == 422
+
+
+def test_upstream_outages_map_to_503():
+    client = TestClient(create_app(UnavailableService()))
+    response = client.post("/v1/documents", json=GENERATION)
+    assert response.status_code == 503 and response.headers["retry-after"] == "2"
+    response = client.post("/v1/documents/stream", json=GENERATION)
+    assert response.status_code == 503 and "retry-after" not in response.headers
+
+
+@pytest.mark.parametrize("fmt, media_type, magic", [
+    ("pdf", "application/pdf", b"%PDF"),
+    ("docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document", b"PK"),
+    ("txt", "text/plain; charset=utf-8", b"TUM"),
+])
+def test_exports_return_the_rendered_file(client, fmt, media_type, magic):
+    response = client.post("/v1/exports", json={
+        "format": fmt, "document_content": DOCUMENT, "metadata": {"doc_type": "Announcement", "tone": "Formal"},
+    })
+    assert response.status_code == 200
+    assert response.headers["content-type"] == media_type
+    assert response.content.startswith(magic)
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import threading
+
+from document_models import DocumentType, ToneType
+from llm_service import LLMService
+from model_client import FakeModelClient
+from response_cache import MemoryCacheBackend, ResponseCache
+from telemetry import Telemetry
+
+RECORDINGS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "recorded_responses.jsonl")
+
+
+class ThreadRecordingBackend(MemoryCacheBackend):
+    """Memory backend that notes which thread each read and write ran on"""
+
+    def __init__(self):
+        super().__init__()
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(threading.get_ident())
+        return super().get(key)
+
+    def set(self, key, value, stored_at):
+        self.threads.append(threading.get_ident())
+        super().set(key, value, stored_at)
+
+
+def test_async_generation_keeps_cache_and_trace_io_off_the_event_loop(tmp_path):
+    backend = ThreadRecordingBackend()
+    telemetry = Telemetry(trace_path=str(tmp_path / "traces.jsonl"))
+    written = []
+    write_trace = telemetry._write_trace
+    telemetry._write_trace = lambda trace: (written.append(threading.get_ident()), write_trace(trace))
+    service = LLMService(
+        client=FakeModelClient.from_jsonl(RECORDINGS),
+        response_cache=ResponseCache(backend),
+        telemetry=telemetry,
+    )
+
+    async def main():
+        kwargs = dict(sender_name="A", sender_profession="B")
+        first = await service.agenerate_document(DocumentType.ANNOUNCEMENT, ToneType.FORMAL, "Lecture moved", **kwargs)
+        second = await service.agenerate_document(DocumentType.ANNOUNCEMENT, ToneType.FORMAL, "Lecture moved", **kwargs)
+        return threading.get_ident(), first, second
+
+    loop_thread, first, second = asyncio.run(main())
+    assert second["metadata"]["cached"] == "true" and second["document"] == first["document"]
+    # Miss, store, hit
+    assert len(backend.threads) == 3 and loop_thread not in backend.threads
+    # The model call and the cache hit are both traced
+    assert len(written) == 2 and loop_thread not in written
+    assert len((tmp_path / "traces.jsonl").read_text().splitlines()) == 2
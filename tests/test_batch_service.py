@@ -0,0 +1,81 @@
+import json
+
+from batch_service import BatchGenerator, InvalidRequestRow, load_requests
+from document_models import DocumentRequest, DocumentType, ToneType
+
+
+class Unavailable(Exception):
+    code = 503
+
+
+class FailingService:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_document(self, **kwargs):
+        self.calls += 1
+        raise Unavailable("upstream down")
+
+
+def test_failed_item_calls_the_service_once(tmp_path):
+    # Retries belong to the service's ResilientCaller; the batch must not multiply them
+    service = FailingService()
+    request = DocumentRequest(doc_type=DocumentType.ANNOUNCEMENT, tone=ToneType.FORMAL, prompt="Lecture moved")
+    report = BatchGenerator(service, workers=1).run([request], str(tmp_path / "out.jsonl"))
+    assert report["failed"] == 1
+    assert service.calls == 1
+
+
+class RecordingService:
+    def __init__(self):
+        self.prompts = []
+
+    def generate_document(self, **kwargs):
+        self.prompts.append(kwargs["prompt"])
+        return {"document": f"Dear Students,\n\n{kwargs['prompt']}", "metadata": {"retries": "0"}}
+
+
+def read_results(path):
+    with open(path, encoding="utf-8") as f:
+        return sorted((json.loads(line) for line in f), key=lambda item: item["index"])
+
+
+def test_malformed_jsonl_rows_fail_alone(tmp_path):
+    source = tmp_path / "requests.jsonl"
+    source.write_text("\n".join([
+        json.dumps({"doc_type": "Announcement", "tone": "Formal", "prompt": "Lecture moved"}),
+        "",
+        json.dumps({"doc_type": "Poster", "tone": "Formal", "prompt": "Unknown type"}),
+        "{not json",
+        json.dumps(["Announcement"]),
+        json.dumps({"doc_type": "Announcement", "tone": "Friendly", "prompt": "Office hours"}),
+    ]) + "\n", encoding="utf-8")
+    requests = load_requests(str(source))
+    assert [getattr(request, "line", None) for request in requests] == [None, 3, 4, 5, None]
+
+    service = RecordingService()
+    output = tmp_path / "out.jsonl"
+    report = BatchGenerator(service, workers=2).run(requests, str(output))
+    assert report["items"] == 5 and report["succeeded"] == 2 and report["failed"] == 3
+    assert sorted(service.prompts) == ["Lecture moved", "Office hours"]
+    results = read_results(output)
+    assert [item["status"] for item in results] == ["ok", "error", "error", "error", "ok"]
+    assert [item.get("line") for item in results] == [None, 3, 4, 5, None]
+    assert results[1]["error"].startswith("Line 3: ") and "doc_type" in results[1]["error"]
+    assert results[2]["error"].startswith("Line 4: Invalid JSON")
+
+
+def test_malformed_csv_rows_report_their_line(tmp_path):
+    source = tmp_path / "requests.csv"
+    source.write_text(
+        "doc_type,tone,prompt\n"
+        "Announcement,Formal,Lecture moved\n"
+        "Announcement,Loud,Too loud\n"
+        "Meeting Summary,Neutral,Minutes\n",
+        encoding="utf-8",
+    )
+    requests = load_requests(str(source))
+    assert isinstance(requests[1], InvalidRequestRow) and requests[1].line == 3
+    assert requests[2].doc_type == DocumentType.MEETING_SUMMARY
+    report = BatchGenerator(RecordingService(), workers=1).run(requests, str(tmp_path / "out.jsonl"))
+    assert report["succeeded"] == 2 and report["failed"] == 1
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from concurrency import GlobalAsyncSemaphore, SingleFlight
+
+
+def test_semaphore_limits_concurrency():
+    semaphore = GlobalAsyncSemaphore(2)
+    peak = 0
+
+    async def job():
+        nonlocal peak
+        async with semaphore:
+            peak = max(peak, semaphore.in_use)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(job() for _ in range(6)))
+
+    asyncio.run(main())
+    assert peak == 2
+    assert semaphore.stats() == {"limit": 2, "in_use": 0, "waiting": 0}
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    semaphore = GlobalAsyncSemaphore(1)
+
+    async def main():
+        await semaphore.acquire()
+        waiter = asyncio.create_task(semaphore.acquire())
+        await asyncio.sleep(0)
+        assert semaphore.stats()["waiting"] == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert semaphore.stats()["waiting"] == 0
+        semaphore.release()
+        await asyncio.wait_for(semaphore.acquire(), 1)
+        semaphore.release()
+
+    asyncio.run(main())
+    assert semaphore.in_use == 0
+
+
+def test_waiter_cancelled_right_after_release_returns_the_slot():
+    semaphore = GlobalAsyncSemaphore(1)
+
+    async def main():
+        await semaphore.acquire()
+        waiter = asyncio.create_task(semaphore.acquire())
+        await asyncio.sleep(0)
+        semaphore.release()
+        # Let _grant resolve the waiter's future, then cancel before the waiter resumes
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert semaphore.in_use == 0
+        await asyncio.wait_for(semaphore.acquire(), 1)
+        semaphore.release()
+
+    asyncio.run(main())
+    assert semaphore.stats() == {"limit": 1, "in_use": 0, "waiting": 0}
+
+
+def test_single_flight_coalesces_identical_calls():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["done"] * 5
+    assert calls == 1
+    assert flight.stats() == {"started": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_single_flight_keeps_running_while_a_caller_waits():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.create_task(flight.do("key", work))
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_single_flight_cancels_the_call_when_the_last_caller_leaves():
+    flight = SingleFlight()
+    cancelled = False
+
+    async def work():
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    async def main():
+        caller = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+        assert flight.stats()["in_flight"] == 0
+
+    asyncio.run(main())
+    assert cancelled
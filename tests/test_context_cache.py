@@ -0,0 +1,127 @@
+import asyncio
+import os
+import threading
+import time
+
+from context_cache import ContextCacheManager
+from document_models import DocumentType, ToneType
+from llm_service import LLMService
+from model_client import FakeModelClient, ModelClient
+from telemetry import Telemetry
+
+RECORDINGS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "recorded_responses.jsonl")
+
+
+class InvalidArgument(Exception):
+    code = 400
+
+
+class NotFound(Exception):
+    code = 404
+
+
+class StubBackend:
+    """Cache backend whose uploads fail with create_error, or hand out `model`"""
+
+    def __init__(self, model=None, create_error=None, delay=0.0):
+        self.model = model
+        self.create_error = create_error
+        self.delay = delay
+        self.created = 0
+
+    def create(self, model_name, prefix, ttl_seconds):
+        self.created += 1
+        time.sleep(self.delay)
+        if self.create_error is not None:
+            raise self.create_error
+        return object()
+
+    def model_for(self, cached):
+        return self.model
+
+    def delete(self, cached):
+        pass
+
+
+class ExpiredCacheClient(ModelClient):
+    """A client bound to a cached prefix that the server has already dropped"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt, json_output=False, stream=False):
+        self.calls += 1
+        raise NotFound("404 CachedContent not found (or permission denied)")
+
+    async def agenerate(self, prompt, json_output=False, stream=False):
+        return self.generate(prompt, json_output, stream)
+
+
+def make_service(backend):
+    client = FakeModelClient.from_jsonl(RECORDINGS)
+    service = LLMService(
+        client=client, use_context_cache=True, context_cache_backend=backend, telemetry=Telemetry()
+    )
+    return service, client
+
+
+def generate(service):
+    return service.generate_document(
+        DocumentType.ANNOUNCEMENT, ToneType.FORMAL, "Lecture moved", sender_name="A", sender_profession="B"
+    )
+
+
+def test_prefix_too_small_falls_back_and_cools_down():
+    backend = StubBackend(create_error=InvalidArgument("400 Cached content is too small. total_token_count=900"))
+    manager = ContextCacheManager("fake-gemini", backend=backend)
+    assert manager.model_for_prefix("short prefix") is None
+    assert manager.model_for_prefix("short prefix") is None
+    assert backend.created == 1
+    assert manager.stats()["failures"] == 1 and manager.stats()["fallbacks"] == 2
+
+
+def test_service_sends_the_full_prompt_when_caching_is_unavailable():
+    backend = StubBackend(create_error=InvalidArgument("400 Cached content is too small"))
+    service, client = make_service(backend)
+    result = generate(service)
+    assert result["document"]
+    assert client.calls == 1
+
+
+def test_concurrent_callers_upload_a_prefix_once():
+    backend = StubBackend(model="bound model", delay=0.05)
+    manager = ContextCacheManager("fake-gemini", backend=backend)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(manager.model_for_prefix("prefix"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["bound model"] * 4
+    assert backend.created == 1
+    assert manager.cached_model("prefix") == "bound model"
+
+
+def test_expired_cache_falls_back_to_the_full_prompt():
+    expired = ExpiredCacheClient()
+    service, client = make_service(StubBackend(model=expired))
+    assert generate(service)["document"]
+    assert expired.calls == 1 and client.calls == 1
+    # The dead prefix was forgotten, so the next call uploads it again
+    assert service.context_cache.stats()["cached_prefixes"] == 0
+
+
+def test_expired_cache_falls_back_on_the_async_path():
+    expired = ExpiredCacheClient()
+    service, client = make_service(StubBackend(model=expired))
+    result = asyncio.run(service.agenerate_document(
+        DocumentType.ANNOUNCEMENT, ToneType.FORMAL, "Lecture moved", sender_name="A", sender_profession="B"
+    ))
+    assert result["document"]
+    assert expired.calls == 1 and client.calls == 1
+
+
+def test_only_missing_or_expired_caches_count_as_misses():
+    assert not LLMService._is_cache_miss(NotFound("404 models/gemini-9 is not found"))
+    assert not LLMService._is_cache_miss(InvalidArgument("400 Please mention the cached syllabus"))
+    assert LLMService._is_cache_miss(InvalidArgument("400 Cache content 1234 is expired."))
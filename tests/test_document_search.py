@@ -0,0 +1,77 @@
+import pytest
+
+from document_models import DocumentType, ToneType
+from document_search import index_terms, match_expression, stem
+from document_store import create_document_store
+
+
+@pytest.fixture
+def store():
+    store = create_document_store("memory")
+    store.add_document("u", DocumentType.ANNOUNCEMENT, ToneType.FORMAL, "The exam moves to room 1801.")
+    store.add_document(
+        "u", DocumentType.STUDENT_COMMUNICATION, ToneType.FRIENDLY, "Die Prüfungen finden im Hörsaal statt.",
+        language="German",
+    )
+    store.add_document(
+        "u", DocumentType.ANNOUNCEMENT, ToneType.FRIENDLY, "Office hours are cancelled this week.",
+        sender_name="Dr. Müller", sender_profession="Lecturer",
+    )
+    store.add_document("v", DocumentType.ANNOUNCEMENT, ToneType.FORMAL, "The exam is on Monday.")
+    return store
+
+
+def names(results):
+    return [document["name"] for document in results]
+
+
+def test_german_words_match_across_umlaut_spellings():
+    assert stem("prüfungen", "German") == stem("pruefung", "German") == stem("prufung", "German")
+    assert index_terms("Prüfungen", "German") == index_terms("PRUEFUNG", "German")
+
+
+def test_english_stemming_folds_common_suffixes():
+    assert stem("meeting", "English") == stem("meets", "English") == "meet"
+    assert stem("lectures", "English") == stem("lecture", "English")
+    assert stem("studies", "English") == "study"
+    assert stem("2024", "English") == "2024"
+
+
+def test_match_expression_scopes_to_the_user_and_filters():
+    expression = match_expression("the exam", "u", doc_type="Announcement", tone="Formal")
+    assert expression.count("tags :") == 3
+    # Stopwords are dropped and the last word also matches as a prefix
+    assert '"the"' not in expression and '"exam"*' in expression
+    assert match_expression("   ", "u") is None
+    # A query of only stopwords still searches for its last word
+    assert match_expression("where", "u") is not None
+
+
+def test_search_only_returns_the_users_documents(store):
+    results = store.search_documents("u", "exam")
+    assert names(results) == ["Announcement_Formal_response_1"]
+    assert "content" not in results[0] and isinstance(results[0]["score"], float)
+    assert names(store.search_documents("v", "exam")) == ["Announcement_Formal_response_1"]
+    assert store.search_documents("nobody", "exam") == []
+
+
+def test_search_finds_german_documents_with_an_ascii_query(store):
+    assert names(store.search_documents("u", "pruefung")) == ["Student Communication_Friendly_response_1"]
+    assert names(store.search_documents("u", "Hörs")) == ["Student Communication_Friendly_response_1"]
+
+
+def test_search_matches_sender_and_type(store):
+    assert names(store.search_documents("u", "announcement from Müller")) == ["Announcement_Friendly_response_1"]
+
+
+def test_filters_narrow_the_search(store):
+    assert names(store.search_documents("u", "exam", tone=ToneType.FRIENDLY)) == []
+    assert len(store.search_documents("u", "announcement")) == 2
+    assert names(store.search_documents("u", "announcement", tone="Friendly")) == ["Announcement_Friendly_response_1"]
+    assert store.search_documents("u", "Prüfung", language="English") == []
+
+
+def test_partial_matches_are_a_fallback(store):
+    # No document has both words, so documents with either are ranked instead
+    results = store.search_documents("u", "exam hours")
+    assert sorted(names(results)) == ["Announcement_Formal_response_1", "Announcement_Friendly_response_1"]
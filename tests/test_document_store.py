@@ -0,0 +1,94 @@
+import pytest
+
+from document_models import DocumentType, ToneType
+from document_store import PREVIEW_CHARS, create_document_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    return create_document_store(f"sqlite:{tmp_path / 'documents.db'}")
+
+
+def add(store, user_id="u", doc_type=DocumentType.ANNOUNCEMENT, tone=ToneType.FORMAL, content="Dear Students,", **kwargs):
+    return store.add_document(user_id, doc_type, tone, content, **kwargs)
+
+
+def test_documents_are_named_per_user_type_and_tone(store):
+    first = add(store, sender_name="A", sender_profession="Prof")
+    second = add(store)
+    other_user = add(store, user_id="v")
+    assert first["name"] == "Announcement_Formal_response_1"
+    assert second["name"] == "Announcement_Formal_response_2"
+    assert other_user["name"] == "Announcement_Formal_response_1"
+    assert first["type"] == "Announcement" and first["tone"] == "Formal" and first["sender_name"] == "A"
+    assert store.get_document(first["id"])["content"] == "Dear Students,"
+    assert store.get_document(10_000) is None
+
+
+def test_preview_is_truncated_once_on_add(store):
+    document = add(store, content="x" * (PREVIEW_CHARS + 10))
+    assert document["preview"] == "x" * PREVIEW_CHARS + "..."
+    assert add(store, content="short")["preview"] == "short"
+
+
+def test_list_documents_pages_with_filters(store):
+    ids = [add(store, tone=ToneType.FORMAL if i % 2 else ToneType.FRIENDLY)["id"] for i in range(7)]
+    add(store, user_id="v")
+    first = store.list_documents("u", limit=3)
+    assert [document["id"] for document in first] == ids[::-1][:3]
+    second = store.list_documents("u", limit=3, before_id=first[-1]["id"])
+    assert [document["id"] for document in second] == ids[::-1][3:6]
+    oldest = store.list_documents("u", limit=3, after_id=ids[1], oldest_first=True)
+    assert [document["id"] for document in oldest] == ids[2:5]
+    formal = store.list_documents("u", tone=ToneType.FORMAL)
+    assert [document["id"] for document in formal] == [ids[5], ids[3], ids[1]]
+    assert store.count_documents("u") == 7 and store.count_documents("u", tone="Formal") == 3
+    summaries = store.list_documents("u", include_content=False, limit=1)
+    assert "content" not in summaries[0] and summaries[0]["preview"]
+
+
+def test_iter_documents_walks_every_page(store):
+    ids = [add(store)["id"] for _ in range(5)]
+    assert [document["id"] for document in store.iter_documents("u", page_size=2)] == ids[::-1]
+    assert [document["id"] for document in store.iter_documents("u", page_size=2, oldest_first=True)] == ids
+    assert list(store.iter_documents("nobody")) == []
+
+
+def test_refinements_form_a_versioned_chain(store):
+    original = add(store)
+    refined = add(store, content="Hello again", parent_id=original["id"])
+    again = add(store, content="Hello once more", parent_id=refined["id"])
+    assert (refined["version"], again["version"]) == (2, 3)
+    assert again["root_id"] == original["id"] and again["parent_id"] == refined["id"]
+    chain = store.refinement_chain(refined["id"])
+    assert [document["id"] for document in chain] == [original["id"], refined["id"], again["id"]]
+    with pytest.raises(ValueError):
+        add(store, user_id="v", parent_id=original["id"])
+
+
+def test_conversations_keep_their_messages_in_order(store):
+    first = store.start_conversation("u")
+    second = store.start_conversation("u")
+    assert store.latest_conversation("u") == second
+    assert store.latest_conversation("nobody") is None
+    document = add(store, conversation_id=first)
+    store.add_message(first, "user", "Write an announcement")
+    store.add_message(first, "assistant", document["content"], display_content="Done", document_id=document["id"])
+    messages = store.list_messages(first)
+    assert [message["role"] for message in messages] == ["user", "assistant"]
+    assert messages[1]["document_id"] == document["id"] and messages[1]["display_content"] == "Done"
+    assert store.list_messages(second) == []
+    assert [d["id"] for d in store.list_documents("u", conversation_id=first)] == [document["id"]]
+
+
+def test_store_survives_reopening(tmp_path):
+    path = f"sqlite:{tmp_path / 'documents.db'}"
+    document = add(create_document_store(path), content="Kept across restarts")
+    reopened = create_document_store(path)
+    assert reopened.get_document(document["id"])["content"] == "Kept across restarts"
+    assert [d["id"] for d in reopened.search_documents("u", "restarts")] == [document["id"]]
+
+
+def test_unknown_store_spec_is_rejected():
+    with pytest.raises(ValueError):
+        create_document_store("postgres://db")
@@ -0,0 +1,155 @@
+import io
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from export_service import DocumentExporter, ExportCache, get_export_cache, get_export_timings
+
+CONTENT = "Dear Students,\n\nThe lecture moves to Tuesday.\n\nBest regards,\nThe Dean's Office"
+# A fixed timestamp keeps the rendered bytes identical between calls
+METADATA = {"doc_type": "Announcement", "tone": "Formal", "timestamp": "2024-05-01 10:00:00"}
+
+
+def without_creation_stamp(data):
+    """fpdf stamps each PDF with the second it was written, and derives the file ID from it"""
+    return re.sub(rb"/CreationDate \(D:\d+Z?\)|/ID \[[^\]]*\]", b"", data)
+
+
+def test_export_many_matches_single_exports():
+    exporter = DocumentExporter()
+    exports = exporter.export_many(CONTENT, METADATA, ["pdf", "docx", "txt", "pdf"])
+    assert list(exports) == ["pdf", "docx", "txt"]
+    for fmt, data in exports.items():
+        single = exporter.export_document(CONTENT, METADATA, fmt)
+        assert without_creation_stamp(data) == without_creation_stamp(single)
+
+
+def test_export_many_records_per_format_timings():
+    timings = get_export_timings()
+    timings.clear()
+    DocumentExporter().export_many(CONTENT, METADATA, ["pdf", "txt"])
+    stats = timings.stats()
+    assert set(stats) == {"prepare", "pdf", "txt"}
+    assert all(stats[name]["count"] == 1 for name in stats)
+    assert stats["pdf"]["max_ms"] >= stats["pdf"]["mean_ms"] > 0
+
+
+def test_export_many_rejects_unknown_formats_before_rendering():
+    timings = get_export_timings()
+    timings.clear()
+    with pytest.raises(ValueError):
+        DocumentExporter().export_many(CONTENT, METADATA, ["pdf", "odt"])
+    assert timings.stats() == {}
+
+
+class FailingExecutor(ThreadPoolExecutor):
+    """Thread pool whose renders of `broken` content raise"""
+
+    def __init__(self, broken):
+        super().__init__(max_workers=2)
+        self.broken = broken
+        self.submitted = 0
+
+    def submit(self, fn, content, *args):
+        self.submitted += 1
+        if content == self.broken:
+            return super().submit(lambda: 1 / 0)
+        return super().submit(fn, content, *args)
+
+
+def history(count):
+    return [
+        {"name": f"Announcement_Formal_response_{i}", "type": "Announcement", "tone": "Formal",
+         "content": f"{CONTENT}\n\nUpdate {i}", "timestamp": "2024-05-01 10:00:00"}
+        for i in range(1, count + 1)
+    ]
+
+
+def test_export_all_zips_every_entry_and_format():
+    get_export_cache().clear()
+    sink = io.BytesIO()
+    progress = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        summary = DocumentExporter().export_all(
+            iter(history(3)), sink, formats=("txt", "docx"), executor=executor, total=3,
+            on_progress=lambda written, expected: progress.append((written, expected)),
+        )
+    assert summary["entries"] == 3 and summary["files"] == 6 and summary["failed"] == 0
+    assert progress[-1] == (6, 6) and len(progress) == 6
+    with zipfile.ZipFile(sink) as archive:
+        names = sorted(archive.namelist())
+        assert names[0] == "001_TUM_Announcement_Formal_response_1.docx"
+        assert len(names) == 6
+        txt = archive.read("002_TUM_Announcement_Formal_response_2.txt")
+        assert txt == DocumentExporter().export_document(history(2)[1]["content"], METADATA, "txt")
+
+
+def test_export_all_reports_failed_renders_and_keeps_the_rest():
+    entries = history(3)
+    sink = io.BytesIO()
+    with FailingExecutor(broken=entries[1]["content"]) as executor:
+        summary = DocumentExporter().export_all(entries, sink, formats=("txt",), executor=executor)
+    assert summary["files"] == 2 and summary["failed"] == 1
+    with zipfile.ZipFile(sink) as archive:
+        assert "002_TUM_Announcement_Formal_response_2.txt" not in archive.namelist()
+        assert "division by zero" in archive.read("export_errors.txt").decode()
+
+
+def test_export_all_uses_cached_renders():
+    entries = history(2)
+    cache = get_export_cache()
+    cache.clear()
+    cache.put(cache.make_key(entries[0]["content"], METADATA, "txt"), b"cached")
+    sink = io.BytesIO()
+    with FailingExecutor(broken=None) as executor:
+        DocumentExporter().export_all(entries, sink, formats=("txt",), executor=executor)
+    assert executor.submitted == 1
+    with zipfile.ZipFile(sink) as archive:
+        assert archive.read("001_TUM_Announcement_Formal_response_1.txt") == b"cached"
+
+
+def test_export_all_renders_inline_with_one_worker():
+    sink = io.BytesIO()
+    summary = DocumentExporter().export_all(history(2), sink, formats=("txt",), workers=1)
+    assert summary["files"] == 2
+
+
+def test_export_all_rejects_unknown_formats():
+    with pytest.raises(ValueError):
+        DocumentExporter().export_all(history(1), io.BytesIO(), formats=("odt",))
+
+
+def test_export_cache_evicts_least_recently_used_by_size():
+    cache = ExportCache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") == b"1234"
+    cache.put("c", b"1234")
+    assert cache.get("b") is None and cache.get("a") == b"1234"
+    cache.put("huge", b"x" * 11)
+    assert cache.get("huge") is None
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["bytes"] == 8 and stats["evictions"] == 1
+
+
+def test_export_cache_key_covers_content_metadata_and_format():
+    key = ExportCache.make_key(CONTENT, METADATA, "pdf")
+    assert key == ExportCache.make_key(CONTENT, dict(reversed(list(METADATA.items()))), "pdf")
+    assert key != ExportCache.make_key(CONTENT, METADATA, "docx")
+    assert key != ExportCache.make_key(CONTENT + " ", METADATA, "pdf")
+    assert key != ExportCache.make_key(CONTENT, {**METADATA, "tone": "Friendly"}, "pdf")
+
+
+def test_get_or_render_renders_once():
+    cache = ExportCache()
+    renders = []
+
+    def render(content, metadata, fmt):
+        renders.append(fmt)
+        return content.encode()
+
+    assert cache.get_or_render(CONTENT, METADATA, "txt", render) == CONTENT.encode()
+    assert cache.get_or_render(CONTENT, METADATA, "txt", render) == CONTENT.encode()
+    assert renders == ["txt"]
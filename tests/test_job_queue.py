@@ -0,0 +1,152 @@
+import os
+import time
+import zipfile
+
+import pytest
+
+from document_store import create_document_store
+from job_queue import (
+    CANCELLED, FAILED, LEASE_SECONDS, MAX_ATTEMPTS, QUEUED, RUNNING, SUCCEEDED, JobCancelled, JobWorker, create_job_queue
+)
+from llm_service import LLMService
+from model_client import FakeModelClient
+from telemetry import Telemetry
+
+RECORDINGS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "recorded_responses.jsonl")
+GENERATE = {
+    "doc_type": "Announcement", "tone": "Formal", "prompt": "Lecture moved",
+    "sender_name": "A", "sender_profession": "Prof", "language": "English",
+}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return create_job_queue(f"sqlite:{tmp_path / 'jobs.db'}")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return create_document_store(f"sqlite:{tmp_path / 'documents.db'}")
+
+
+def make_worker(queue, store, worker_id):
+    service = LLMService(client=FakeModelClient.from_jsonl(RECORDINGS), telemetry=Telemetry())
+    return JobWorker(queue, store, lambda: service, worker_id=worker_id)
+
+
+def expire_lease(queue, job_id):
+    queue._conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time() - LEASE_SECONDS - 1, job_id))
+
+
+def test_claim_publish_and_finish(queue):
+    job_id = queue.submit("generate", "u", GENERATE)
+    assert queue.get(job_id)["status"] == QUEUED
+    job = queue.claim("worker-a")
+    assert job["id"] == job_id and job["status"] == RUNNING and job["worker"] == "worker-a"
+    assert queue.claim("worker-b") is None
+    assert queue.publish(job_id, "worker-a", {"delta": "Hello"}, progress=0.5)
+    assert queue.publish(job_id, "worker-a", {"delta": " world"})
+    assert [event["delta"] for event in queue.events(job_id)] == ["Hello", " world"]
+    assert [event["seq"] for event in queue.events(job_id, after=1)] == [2]
+    assert queue.finish(job_id, "worker-a", result={"document_id": 1})
+    job = queue.get(job_id)
+    assert job["status"] == SUCCEEDED and job["result"] == {"document_id": 1} and job["progress"] == 1
+
+
+def test_claim_only_takes_requested_kinds(queue):
+    queue.submit("export", "u", {})
+    assert queue.claim("worker-a", kinds=("generate",)) is None
+    assert queue.claim("worker-a", kinds=("export",))["kind"] == "export"
+
+
+def test_cancel_stops_a_running_job(queue):
+    job_id = queue.submit("generate", "u", GENERATE)
+    queue.claim("worker-a")
+    assert queue.cancel(job_id)
+    assert not queue.publish(job_id, "worker-a", {"delta": "late"})
+    assert not queue.finish(job_id, "worker-a", result={})
+    assert queue.get(job_id)["status"] == CANCELLED
+    assert not queue.cancel(job_id)
+
+
+def test_takeover_after_lease_expiry_fences_the_stale_worker(queue):
+    job_id = queue.submit("generate", "u", GENERATE)
+    queue.claim("worker-a")
+    queue.publish(job_id, "worker-a", {"delta": "from a"})
+    expire_lease(queue, job_id)
+    job = queue.claim("worker-b")
+    assert job["id"] == job_id and job["worker"] == "worker-b" and job["attempts"] == 2
+    # The new attempt streams from the start, and the stale worker can no longer write
+    assert queue.events(job_id) == []
+    assert not queue.publish(job_id, "worker-a", {"delta": "from a again"})
+    assert not queue.finish(job_id, "worker-a", result={"by": "a"})
+    assert not queue.holds(job_id, "worker-a")
+    assert queue.publish(job_id, "worker-b", {"delta": "from b"})
+    assert queue.finish(job_id, "worker-b", result={"by": "b"})
+    assert [event["delta"] for event in queue.events(job_id)] == ["from b"]
+    assert queue.get(job_id)["result"] == {"by": "b"}
+
+
+def test_job_fails_after_max_attempts(queue):
+    job_id = queue.submit("generate", "u", GENERATE)
+    for attempt in range(MAX_ATTEMPTS):
+        assert queue.claim(f"worker-{attempt}")["id"] == job_id
+        expire_lease(queue, job_id)
+    assert queue.claim("worker-last") is None
+    job = queue.get(job_id)
+    assert job["status"] == FAILED and job["error"] == "Worker stopped responding"
+
+
+def test_stale_worker_does_not_store_its_answer(queue, store):
+    conversation = store.start_conversation("u")
+    job_id = queue.submit("generate", "u", GENERATE, conversation_id=conversation)
+    stale = make_worker(queue, store, "worker-a")
+    job = queue.claim("worker-a")
+    expire_lease(queue, job_id)
+    queue.claim("worker-b")
+    # worker-a's handler notices the takeover before it stores anything
+    with pytest.raises(JobCancelled):
+        stale._handlers["generate"](job)
+    assert store.list_messages(conversation) == []
+
+
+def test_worker_generates_refines_and_exports(queue, store):
+    conversation = store.start_conversation("u")
+    worker = make_worker(queue, store, "worker-a")
+    generate_id = queue.submit("generate", "u", GENERATE, conversation_id=conversation)
+    assert worker.run_once()
+    job = queue.get(generate_id)
+    assert job["status"] == SUCCEEDED
+    streamed = "".join(event.get("delta", "") for event in queue.events(generate_id))
+    document = store.get_document(job["result"]["document_id"])
+    assert streamed.strip() and document["content"]
+
+    refine_id = queue.submit(
+        "refine", "u", {"document_id": document["id"], "refinement_prompt": "Shorter"}, conversation_id=conversation
+    )
+    assert worker.run_once()
+    refined = store.get_document(queue.get(refine_id)["result"]["document_id"])
+    assert refined["parent_id"] == document["id"]
+    assert [message["role"] for message in store.list_messages(conversation)] == ["assistant", "assistant"]
+
+    export_id = queue.submit("export", "u", {"formats": ["txt"]})
+    assert worker.run_once()
+    assert queue.get(export_id)["result"]["files"] == 2
+    with queue.open_artifact(export_id, "export.zip") as artifact:
+        assert len(zipfile.ZipFile(artifact).namelist()) == 2
+    assert not worker.run_once()
+
+
+def test_purge_removes_finished_jobs_and_artifacts(queue, tmp_path):
+    job_id = queue.submit("export", "u", {})
+    queue.claim("worker-a")
+    source = tmp_path / "export.zip"
+    source.write_bytes(b"zip")
+    assert queue.add_artifact(job_id, "worker-a", "export.zip", str(source))
+    assert queue.finish(job_id, "worker-a", result={})
+    path = queue.artifact_path(job_id, "export.zip")
+    assert os.path.exists(path)
+    assert queue.purge(older_than=3600) == 0
+    assert queue.purge(older_than=-1) == 1
+    assert queue.get(job_id) is None and not os.path.exists(path)
+    assert queue.open_artifact(job_id, "export.zip") is None
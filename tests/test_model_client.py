@@ -0,0 +1,53 @@
+import warnings
+from types import SimpleNamespace
+
+import pytest
+
+from context_cache import GenaiCacheBackend
+from model_client import GeminiClient, GeminiClients
+
+warnings.filterwarnings("ignore", category=FutureWarning)
+pytest.importorskip("google.generativeai")
+
+
+def test_gemini_clients_keep_their_own_api_keys():
+    first = GeminiClient("gemini-2.0-flash", api_key="key-a")
+    second = GeminiClient("gemini-2.0-flash", api_key="key-b")
+    first.warm_up()
+    second.warm_up()
+    assert first.model._client is not second.model._client
+    assert first.model._client._transport._credentials.token == "key-a"
+    assert second.model._client._transport._credentials.token == "key-b"
+
+
+def token(transport_client):
+    return transport_client._transport._credentials.token
+
+
+def test_transports_keep_their_key_after_another_key_is_configured():
+    first, second = GeminiClients("key-a"), GeminiClients("key-b")
+    generative = first.get_default_client("generative")
+    assert token(second.get_default_client("generative")) == "key-b"
+    assert first.get_default_client("generative") is generative and token(generative) == "key-a"
+    assert token(first.get_default_client("cache")) == "key-a"
+
+
+def test_cached_contents_are_created_and_deleted_with_the_clients_key(monkeypatch):
+    from google.generativeai import caching
+    from google.generativeai import client as genai_client
+
+    calls = []
+
+    def create(model, display_name=None, contents=None, ttl=None):
+        calls.append(("create", token(genai_client.get_default_cache_client()), model, contents))
+        return SimpleNamespace(name="cachedContents/1", delete=lambda: calls.append(
+            ("delete", token(genai_client.get_default_cache_client()))
+        ))
+
+    monkeypatch.setattr(caching.CachedContent, "create", create)
+    GeminiClients("key-other").get_default_client("cache")
+    backend = GenaiCacheBackend(GeminiClients("key-a"))
+    cached = backend.create("models/gemini-1.5-flash-001", "prefix", 600)
+    GeminiClients("key-other").get_default_client("cache")
+    backend.delete(cached)
+    assert calls == [("create", "key-a", "models/gemini-1.5-flash-001", ["prefix"]), ("delete", "key-a")]
@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+from document_models import DocumentType, ToneType
+from llm_service import LLMService
+from model_client import FakeResponse, ModelClient
+from telemetry import Telemetry
+
+DOCUMENT = "Dear students,\n\nThe lecture moves to Tuesday.\n\nBest regards"
+REWRITE = ["Dear all,\n\n", "The lecture moves ", "to Wednesday.\n\n", "Best regards"]
+
+
+class ScriptedClient(ModelClient):
+    """Answers patch calls with `patch` and streams REWRITE for full rewrites"""
+
+    model_name = "scripted"
+
+    def __init__(self, patch):
+        self.patch = patch
+        self.calls = []
+
+    def generate(self, prompt, json_output=False, stream=False):
+        self.calls.append("patch" if json_output else "rewrite")
+        if json_output:
+            return FakeResponse(json.dumps(self.patch))
+        if not stream:
+            return FakeResponse("".join(REWRITE))
+        return iter([FakeResponse(text) for text in REWRITE])
+
+    async def agenerate(self, prompt, json_output=False, stream=False):
+        response = self.generate(prompt, json_output, stream)
+        if not stream:
+            return response
+
+        async def chunks():
+            for chunk in response:
+                yield chunk
+
+        return chunks()
+
+
+def refine(service, **kwargs):
+    return list(service.refine_document_stream(
+        DOCUMENT, "Move it to Wednesday", DocumentType.ANNOUNCEMENT, ToneType.NEUTRAL, mode="patch", **kwargs
+    ))
+
+
+def test_patch_refinement_yields_the_patched_document():
+    client = ScriptedClient({"edits": [{"find": "Tuesday", "replace": "Wednesday"}]})
+    events = refine(LLMService(client=client, telemetry=Telemetry()))
+    assert client.calls == ["patch"]
+    assert events[-1]["document"] == DOCUMENT.replace("Tuesday", "Wednesday")
+    assert events[-1]["metadata"]["refinement_mode"] == "patch"
+
+
+def test_failed_patch_streams_the_full_rewrite():
+    client = ScriptedClient({"edits": [{"find": "Thursday", "replace": "Wednesday"}]})
+    events = refine(LLMService(client=client, telemetry=Telemetry()))
+    assert client.calls == ["patch", "rewrite"]
+    assert [event["delta"] for event in events[:-1]] == REWRITE
+    assert events[-1]["document"] == "".join(REWRITE).strip()
+    assert events[-1]["metadata"]["refinement_mode"] == "patch_fallback"
+
+
+def test_failed_patch_streams_the_full_rewrite_async():
+    client = ScriptedClient({"rewrite": True})
+    service = LLMService(client=client, telemetry=Telemetry())
+
+    async def main():
+        return [event async for event in service.arefine_document_stream(
+            DOCUMENT, "Move it to Wednesday", DocumentType.ANNOUNCEMENT, ToneType.NEUTRAL, mode="patch"
+        )]
+
+    events = asyncio.run(main())
+    assert client.calls == ["patch", "rewrite"]
+    assert [event["delta"] for event in events[:-1]] == REWRITE
+    assert events[-1]["metadata"]["refinement_mode"] == "patch_fallback"
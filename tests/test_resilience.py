@@ -0,0 +1,105 @@
+import pytest
+
+from resilience import CircuitBreaker, CircuitOpenError, ResilientCaller, RetryPolicy, UpstreamUnavailableError
+
+
+class Unavailable(Exception):
+    code = 503
+
+
+def flaky(failures, error=Unavailable):
+    """A call that raises error for the first `failures` attempts, then returns the attempt count"""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error("upstream down")
+        return len(calls)
+
+    return fn, calls
+
+
+def make_caller(max_retries=3, failure_threshold=5, recovery_timeout=30.0):
+    sleeps = []
+    caller = ResilientCaller(
+        retry_policy=RetryPolicy(max_retries=max_retries, base_delay=0.01),
+        circuit_breaker=CircuitBreaker(failure_threshold, recovery_timeout),
+        sleep=sleeps.append,
+    )
+    return caller, sleeps
+
+
+def test_retries_transient_errors_then_succeeds():
+    caller, sleeps = make_caller()
+    fn, calls = flaky(2)
+    assert caller.call(fn) == 3
+    assert len(sleeps) == 2
+    metrics = caller.metrics()
+    assert metrics["retries"] == 2 and metrics["successes"] == 1 and metrics["failures"] == 0
+    assert metrics["circuit_state"] == CircuitBreaker.CLOSED and metrics["consecutive_failures"] == 0
+
+
+def test_gives_up_after_max_retries():
+    caller, sleeps = make_caller(max_retries=2)
+    fn, calls = flaky(10)
+    with pytest.raises(UpstreamUnavailableError):
+        caller.call(fn)
+    assert len(calls) == 3
+    assert len(sleeps) == 2
+    assert caller.metrics()["failures"] == 1
+
+
+def test_permanent_errors_are_not_retried():
+    caller, sleeps = make_caller()
+    fn, calls = flaky(1, error=ValueError)
+    with pytest.raises(ValueError):
+        caller.call(fn)
+    assert len(calls) == 1 and sleeps == []
+    assert caller.circuit_breaker.consecutive_failures == 0
+
+
+def test_circuit_opens_then_fails_fast():
+    caller, _ = make_caller(max_retries=0, failure_threshold=2)
+    fn, calls = flaky(10)
+    for _ in range(2):
+        with pytest.raises(UpstreamUnavailableError):
+            caller.call(fn)
+    assert caller.circuit_breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        caller.call(fn)
+    assert len(calls) == 2
+    assert caller.metrics()["rejected_by_circuit"] == 1
+
+
+def test_half_open_probe_closes_the_circuit_on_success():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one probe goes through while half-open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_failed_half_open_probe_reopens_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=0.0)
+    for _ in range(3):
+        breaker.record_failure()
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_released_probe_lets_the_next_caller_probe():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.0)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.release_probe()
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
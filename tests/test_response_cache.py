@@ -0,0 +1,21 @@
+import os
+
+from response_cache import DirectoryCacheBackend
+
+
+def entries(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+
+
+def test_directory_backend_evicts_every_few_writes(tmp_path):
+    backend = DirectoryCacheBackend(str(tmp_path), max_entries=10, evict_every=5)
+    for index in range(12):
+        backend.set(f"key{index:02d}", {"document": str(index)}, 0.0)
+        os.utime(backend._path(f"key{index:02d}"), (index, index))
+    # Sweeps ran at the 5th and 10th writes, both within the bound
+    assert len(entries(tmp_path)) == 12
+    for index in range(12, 15):
+        backend.set(f"key{index:02d}", {"document": str(index)}, 0.0)
+        os.utime(backend._path(f"key{index:02d}"), (index, index))
+    # The 15th write swept the least recently used entries
+    assert entries(tmp_path) == [f"key{index:02d}.json" for index in range(5, 15)]
@@ -0,0 +1,38 @@
+import asyncio
+import os
+import time
+
+from document_models import DocumentType, ToneType
+from llm_service import LLMService
+from model_client import FakeModelClient
+from telemetry import Telemetry
+
+RECORDINGS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "recorded_responses.jsonl")
+ARGS = (DocumentType.ANNOUNCEMENT, ToneType.FORMAL, "Lecture moved")
+KWARGS = dict(sender_name="A", sender_profession="B")
+
+
+def make_service():
+    return LLMService(client=FakeModelClient.from_jsonl(RECORDINGS, chunk_size=40), telemetry=Telemetry())
+
+
+def test_stream_latency_leaves_out_consumer_time():
+    events = []
+    for event in make_service().generate_document_stream(*ARGS, **KWARGS):
+        events.append(event)
+        time.sleep(0.02)
+    assert len(events) > 3
+    assert float(events[-1]["metadata"]["latency_ms"]) < 20
+
+
+def test_async_stream_latency_leaves_out_consumer_time():
+    async def main():
+        events = []
+        async for event in make_service().agenerate_document_stream(*ARGS, **KWARGS):
+            events.append(event)
+            await asyncio.sleep(0.02)
+        return events
+
+    events = asyncio.run(main())
+    assert len(events) > 3
+    assert float(events[-1]["metadata"]["latency_ms"]) < 20
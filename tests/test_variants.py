@@ -0,0 +1,138 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from document_models import DocumentType, ToneType
+from document_store import create_document_store
+from job_queue import SUCCEEDED, JobWorker, create_job_queue
+from llm_service import LLMService
+from model_client import FakeModelClient
+from telemetry import Telemetry
+
+RECORDINGS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "recorded_responses.jsonl")
+TONES = [ToneType.FORMAL, ToneType.FRIENDLY, ToneType.FORMAL]
+LANGUAGES = ["English", "German"]
+
+
+class GermanOutageClient(FakeModelClient):
+    """Replays recordings, except that prompts for German documents fail"""
+
+    def generate(self, prompt, json_output=False, stream=False):
+        if "Language: German" in prompt:
+            raise ValueError("German model unavailable")
+        return super().generate(prompt, json_output, stream)
+
+    async def agenerate(self, prompt, json_output=False, stream=False):
+        if "Language: German" in prompt:
+            raise ValueError("German model unavailable")
+        return await super().agenerate(prompt, json_output, stream)
+
+
+def make_service(client_class=FakeModelClient, **options):
+    return LLMService(client=client_class.from_jsonl(RECORDINGS, **options), telemetry=Telemetry())
+
+
+def variants(service, **kwargs):
+    return service.generate_variants(
+        DocumentType.ANNOUNCEMENT, TONES, "Lecture moved", sender_name="A", sender_profession="B",
+        languages=LANGUAGES, **kwargs
+    )
+
+
+def finals(events):
+    return {event["variant"]: event for event in events if event.get("is_final")}
+
+
+def test_every_distinct_combination_is_generated_once():
+    service = make_service()
+    events = list(variants(service))
+    tags = events[0]["variants"]
+    assert [(tag["tone"], tag["language"]) for tag in tags] == [
+        ("Formal", "English"), ("Formal", "German"), ("Friendly", "English"), ("Friendly", "German"),
+    ]
+    done = finals(events)
+    assert sorted(done) == [0, 1, 2, 3]
+    for tag in tags:
+        final = done[tag["variant"]]
+        assert final["tone"] == tag["tone"] and final["language"] == tag["language"]
+        assert final["document"] and "error" not in final
+    # Every streamed chunk carries its variant's tag
+    assert all("variant" in event for event in events[1:])
+    assert service.client.calls == 4
+
+
+def test_variant_matches_a_single_generation():
+    events = list(variants(make_service()))
+    single = make_service().generate_document(
+        DocumentType.ANNOUNCEMENT, ToneType.FRIENDLY, "Lecture moved", sender_name="A", sender_profession="B",
+        language="German",
+    )
+    assert finals(events)[3]["document"] == single["document"]
+
+
+def test_a_failed_variant_does_not_stop_the_others():
+    done = finals(variants(make_service(GermanOutageClient)))
+    assert sorted(done) == [0, 1, 2, 3]
+    assert "German model unavailable" in done[1]["error"] and "German model unavailable" in done[3]["error"]
+    assert done[0]["document"] and done[2]["document"]
+
+
+def test_closing_the_stream_stops_the_remaining_variants():
+    service = make_service(chunk_latency=0.01, chunk_size=10)
+    stream = variants(service)
+    next(stream)
+    next(stream)
+    stream.close()
+    # The variant threads notice the close at their next chunk and end their model calls
+    for thread in threading.enumerate():
+        if thread.name.startswith("variant"):
+            thread.join(timeout=5)
+            assert not thread.is_alive()
+
+
+def test_async_variants_match_the_sync_ones():
+    async def collect():
+        return [event async for event in make_service().agenerate_variants(
+            DocumentType.ANNOUNCEMENT, TONES, "Lecture moved", sender_name="A", sender_profession="B",
+            languages=LANGUAGES,
+        )]
+
+    events = asyncio.run(collect())
+    sync_done = finals(variants(make_service()))
+    assert events[0]["variants"] == next(variants(make_service()))["variants"]
+    assert {index: event["document"] for index, event in finals(events).items()} == {
+        index: event["document"] for index, event in sync_done.items()
+    }
+
+
+def test_at_least_one_tone_is_required():
+    with pytest.raises(ValueError):
+        next(make_service().generate_variants(
+            DocumentType.ANNOUNCEMENT, [], "Lecture moved", sender_name="A", sender_profession="B"
+        ))
+
+
+def test_variants_job_stores_each_variant():
+    store = create_document_store("memory")
+    queue = create_job_queue("memory")
+    service = make_service(GermanOutageClient)
+    worker = JobWorker(queue, store, lambda: service, worker_id="worker-a")
+    conversation = store.start_conversation("u")
+    job_id = queue.submit("variants", "u", {
+        "doc_type": "Announcement", "tones": ["Formal", "Friendly"], "prompt": "Lecture moved",
+        "sender_name": "A", "sender_profession": "B", "languages": LANGUAGES,
+    }, conversation_id=conversation)
+    assert worker.run_once()
+    job = queue.get(job_id)
+    assert job["status"] == SUCCEEDED
+    results = job["result"]["variants"]
+    assert [("error" in variant) for variant in results] == [False, True, False, True]
+    stored = [store.get_document(variant["document_id"]) for variant in results if "document_id" in variant]
+    assert [(document["tone"], document["language"]) for document in stored] == [
+        ("Formal", "English"), ("Friendly", "English"),
+    ]
+    assert queue.events(job_id)[0]["variants"] == [
+        {key: variant[key] for key in ("variant", "tone", "language")} for variant in results
+    ]
@@ -0,0 +1,85 @@
+import re
+from functools import lru_cache
+
+# Patterns are compiled once at import. The order matches the original cleaning
+# sequence exactly; several patterns use \s, which can cross line boundaries, so
+# they stay whole-text passes rather than being folded into the per-line loop.
+_HTML_TAG = re.compile(r'<[^>]+>')
+_BOLD_STARS = re.compile(r'\*\*(.*?)\*\*')
+_ITALIC_STAR = re.compile(r'\*(.*?)\*')
+_BOLD_UNDERSCORES = re.compile(r'__(.*?)__')
+_ITALIC_UNDERSCORE = re.compile(r'_(.*?)_')
+_HEADER = re.compile(r'^#{1,6}\s+', re.MULTILINE)
+_BULLET = re.compile(r'^\s*[-*+]\s+', re.MULTILINE)
+_NUMBERED = re.compile(r'^\s*\d+\.\s+', re.MULTILINE)
+# Both horizontal-rule passes only ever blank a whole line, so one alternation is equivalent
+_HORIZONTAL_RULE = re.compile(r'^(?:-{3,}|\*{3,})$', re.MULTILINE)
+_INLINE_CODE = re.compile(r'`([^`]+)`')
+_LINK = re.compile(r'\[([^\]]+)\]\([^\)]+\)')
+_LEADING_DASHES = re.compile(r'^-+\s*', re.MULTILINE)
+_TRAILING_DASHES = re.compile(r'\s*-+$', re.MULTILINE)
+_FORMATTING_LINE = re.compile(r'^[-=*_]+$')
+_EXCESS_NEWLINES = re.compile(r'\n{3,}')
+
+_HTML_ENTITIES = (('&nbsp;', ' '), ('&amp;', '&'), ('&lt;', '<'), ('&gt;', '>'))
+
+
+def _clean(text: str) -> str:
+    # Each pass is skipped when its trigger character is absent; the substring
+    # checks are far cheaper than a regex scan that cannot match anyway.
+    if '<' in text:
+        text = _HTML_TAG.sub('', text)
+
+    if '&' in text:
+        for entity, replacement in _HTML_ENTITIES:
+            text = text.replace(entity, replacement)
+
+    if '*' in text:
+        text = _BOLD_STARS.sub(r'\1', text)
+        text = _ITALIC_STAR.sub(r'\1', text)
+    if '_' in text:
+        text = _BOLD_UNDERSCORES.sub(r'\1', text)
+        text = _ITALIC_UNDERSCORE.sub(r'\1', text)
+
+    if '#' in text:
+        text = _HEADER.sub('', text)
+
+    has_dash = '-' in text
+    if has_dash or '*' in text or '+' in text:
+        text = _BULLET.sub('', text)
+    if '.' in text:
+        text = _NUMBERED.sub('', text)
+
+    if has_dash or '*' in text:
+        text = _HORIZONTAL_RULE.sub('', text)
+
+    if '`' in text:
+        text = text.replace('``````', '')
+        text = _INLINE_CODE.sub(r'\1', text)
+
+    if '](' in text:
+        text = _LINK.sub(r'\1', text)
+
+    if '-' in text:
+        text = _LEADING_DASHES.sub('', text)
+        text = _TRAILING_DASHES.sub('', text)
+
+    # Single line-oriented pass: strip lines and drop pure formatting lines
+    cleaned_lines = []
+    for line in text.split('\n'):
+        cleaned_line = line.strip()
+        if not cleaned_line:
+            cleaned_lines.append('')
+        elif not _FORMATTING_LINE.match(cleaned_line):
+            cleaned_lines.append(cleaned_line)
+
+    result = '\n'.join(cleaned_lines)
+    if '\n\n\n' in result:
+        result = _EXCESS_NEWLINES.sub('\n\n', result)  # Max 2 consecutive newlines
+    return result.strip()
+
+
+@lru_cache(maxsize=2048)
+def clean_response_text(text: str) -> str:
+    """Comprehensive cleaning to remove all markdown and formatting issues"""
+    return _clean(text)